@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+
+from config import (
+    attraction_selection_algorithm,
+    score_distance_scale_km,
+    subcategory_scores,
+)
+
+TIME_STEP_MINUTES = 5  # Resolution of the time axis of the DP
+MAX_COST_STEPS = 400  # Resolution of the cost axis of the DP
+
+
+def score_attractions(places_df, distances_km):
+    """
+    Score attractions by how worth a visit their kind of place is, halved
+    at `score_distance_scale_km` from the centre.
+
+    Parameters:
+        places_df (pd.DataFrame): Places with a Category column.
+        distances_km (array-like): Distance of each place from the centre.
+
+    Returns:
+        np.ndarray: The score of each place.
+    """
+    codes, uniques = pd.factorize(places_df["Category"].to_numpy(dtype=object))
+    scores = np.array(
+        [subcategory_scores.get(str(value).casefold(), 1.0) for value in uniques]
+        + [1.0],  # factorize gives -1 for missing values
+        dtype=np.float64,
+    )[codes]
+    return scores / (1 + np.asarray(distances_km) / score_distance_scale_km)
+
+
+def _greedy(scores, weights, costs, time_budget, cost_budget):
+    """
+    Take items by score per share of the scarcer resource while they fit,
+    and keep the single best item instead if that scores more, which bounds
+    the result below by half the optimum of the time knapsack.
+    """
+    fits = (weights <= time_budget) & (costs <= cost_budget)
+    if not fits.any():
+        return np.empty(0, dtype=np.intp)
+    load = np.maximum(weights / max(time_budget, 1), costs / max(cost_budget, 1))
+    density = scores / np.maximum(load, 1e-9)
+
+    chosen = []
+    time_left, cost_left = time_budget, cost_budget
+    for i in np.argsort(-density, kind="stable"):
+        if weights[i] <= time_left and costs[i] <= cost_left:
+            chosen.append(i)
+            time_left -= weights[i]
+            cost_left -= costs[i]
+
+    best_single = np.flatnonzero(fits)[np.argmax(scores[fits])]
+    if scores[best_single] > scores[chosen].sum():
+        chosen = [best_single]
+    return np.sort(np.array(chosen, dtype=np.intp))
+
+
+def _dynamic_programming(scores, weights, costs, time_budget, cost_budget):
+    """
+    0/1 knapsack with two capacities, time and cost, solved on a grid of
+    TIME_STEP_MINUTES by at most MAX_COST_STEPS cost steps. Item sizes are
+    rounded up to whole steps, so the chosen set always fits the real
+    budgets but can miss a better set that only fits unrounded: the result
+    is optimal on the grid, an approximation of the true optimum. Each item
+    updates the whole table with one vectorized max, so hundreds of items
+    take a few milliseconds.
+    """
+    time_steps = int(time_budget // TIME_STEP_MINUTES)
+    # Tier prices share a large common divisor, a cost step of (a multiple
+    # of) it keeps the cost axis exact
+    paid = np.round(costs[costs > 0]).astype(np.int64)
+    divisor = int(np.gcd.reduce(paid)) if len(paid) else 1
+    cost_unit = divisor * max(1, int(np.ceil(cost_budget / divisor / MAX_COST_STEPS)))
+    cost_steps = int(cost_budget // cost_unit)
+    # Round item sizes up so a chosen set never exceeds the real budgets
+    item_times = np.ceil(weights / TIME_STEP_MINUTES).astype(np.intp)
+    item_costs = np.ceil(costs / cost_unit).astype(np.intp)
+    items = np.flatnonzero((item_times <= time_steps) & (item_costs <= cost_steps))
+
+    # best[t, c]: best score within t time steps and c cost steps
+    best = np.zeros((time_steps + 1, cost_steps + 1))
+    taken = np.zeros((len(items), time_steps + 1, cost_steps + 1), dtype=bool)
+    for n, i in enumerate(items):
+        t, c = item_times[i], item_costs[i]
+        candidate = best[: time_steps + 1 - t, : cost_steps + 1 - c] + scores[i]
+        better = candidate > best[t:, c:]
+        taken[n, t:, c:] = better
+        best[t:, c:] = np.where(better, candidate, best[t:, c:])
+
+    chosen = []
+    t, c = time_steps, cost_steps
+    for n in range(len(items) - 1, -1, -1):
+        if taken[n, t, c]:
+            i = items[n]
+            chosen.append(i)
+            t -= item_times[i]
+            c -= item_costs[i]
+    return np.sort(np.array(chosen, dtype=np.intp))
+
+
+ALGORITHMS = {"dp": _dynamic_programming, "greedy": _greedy}
+
+
+def select_attractions(
+    scores,
+    minutes,
+    costs,
+    time_budget,
+    cost_budget,
+    algorithm=attraction_selection_algorithm,
+):
+    """
+    Choose the attractions of a day that maximise the total score while
+    their visits and travel fit the time of the day and their entry costs
+    fit the budget.
+
+    Parameters:
+        scores (array-like): The score of each candidate.
+        minutes (array-like): Visit plus travel minutes of each candidate.
+        costs (array-like): The entry cost of each candidate in Rupees.
+        time_budget (float): The minutes available.
+        cost_budget (float): The Rupees available.
+        algorithm (str): "dp" for the dynamic programme, optimal on its
+            grid of TIME_STEP_MINUTES, or "greedy" for a faster, coarser
+            approximation.
+
+    Returns:
+        np.ndarray: Positions of the chosen candidates, in input order.
+
+    Raises:
+        ValueError: If the algorithm is unknown.
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(
+            f"Unknown selection algorithm {algorithm!r}, "
+            f"expected one of {sorted(ALGORITHMS)}"
+        )
+    scores = np.asarray(scores, dtype=np.float64)
+    if len(scores) == 0:
+        return np.empty(0, dtype=np.intp)
+    return ALGORITHMS[algorithm](
+        scores,
+        np.asarray(minutes, dtype=np.float64),
+        np.asarray(costs, dtype=np.float64),
+        float(time_budget),
+        max(0.0, float(cost_budget)),
+    )
@@ -0,0 +1,356 @@
+"""
+Plan itineraries offline for many trip requests at once.
+
+Reads a JSONL or CSV file of trip requests, fetches every distinct location
+once, plans the trips across a process pool and writes one result per trip
+as JSONL or Parquet.
+
+Each request has the fields:
+    source, destination: Location queries, e.g. "New York" and "Paris".
+    start_date, end_date: ISO dates of the trip.
+    budget: The budget of the trip in Rupees.
+    radius_km: Optional POI search radius at the destination, 1 to 20,
+        default 1.
+    source_radius_km: Optional POI search radius at the source, 1 to 20,
+        default 10.
+    subcategories: Optional list of subcategories to plan with (";"
+        separated in CSV), defaults to all.
+    seed: Optional seed of the estimated times and costs, default 0.
+    id: Optional request id, defaults to the line number.
+
+Usage:
+    python batch_planner.py trips.jsonl -o itineraries.jsonl --workers 8
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import pandas as pd
+
+from config import max_search_radius_km, min_search_radius_km
+from estimators import DEFAULT_SEED
+from fetch_pipeline import run_fetch_pipeline
+from geocode_cache import normalise_query
+from trip_planner import plan_itinerary
+
+DEFAULT_RADIUS_KM = 1
+DEFAULT_SOURCE_RADIUS_KM = 10
+DEFAULT_FETCH_CONCURRENCY = 4
+REQUIRED_FIELDS = ["source", "destination", "start_date", "end_date", "budget"]
+
+# Places of every fetched location, set once per worker process
+_worker_places = {}
+
+
+def read_trip_requests(path):
+    """
+    Read trip requests from a JSONL or CSV file.
+
+    Parameters:
+        path (str): Path of a .jsonl/.json or .csv file.
+
+    Returns:
+        list: Trip request dicts, with an "id" for every request.
+    """
+    if path.endswith(".csv"):
+        trips = pd.read_csv(path, dtype=str, keep_default_na=False).to_dict("records")
+        for trip in trips:
+            subcategories = trip.get("subcategories", "")
+            trip["subcategories"] = (
+                [s.strip() for s in subcategories.split(";") if s.strip()]
+                if subcategories
+                else None
+            )
+    else:
+        with open(path, encoding="utf-8") as f:
+            trips = [json.loads(line) for line in f if line.strip()]
+    for i, trip in enumerate(trips):
+        if trip.get("id") in (None, ""):
+            trip["id"] = i
+    return trips
+
+
+def _location_key(query, radius_km):
+    return normalise_query(query), int(radius_km * 1000)
+
+
+def _number(trip, field, default=None):
+    """A finite number field of a trip request, `default` if it is unset."""
+    value = trip.get(field)
+    if value in (None, ""):
+        return default
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = math.nan
+    if not math.isfinite(number):
+        raise ValueError(f"Invalid {field}: {value!r}")
+    return number
+
+
+def parse_trip_request(trip):
+    """
+    Check a trip request and convert its fields for planning.
+
+    Parameters:
+        trip (dict): A trip request, see read_trip_requests.
+
+    Returns:
+        dict: The id, the destination and source location keys, the dates,
+        budget, subcategories and seed of the trip.
+
+    Raises:
+        ValueError: If a field is missing or invalid.
+    """
+    missing = [field for field in REQUIRED_FIELDS if trip.get(field) in (None, "")]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+    try:
+        dates = (
+            date.fromisoformat(str(trip["start_date"])),
+            date.fromisoformat(str(trip["end_date"])),
+        )
+    except ValueError as e:
+        raise ValueError(f"Invalid dates: {e}") from e
+    budget = _number(trip, "budget")
+    if budget < 0:
+        raise ValueError(f"Invalid budget: {trip['budget']!r}")
+    radius_km = _number(trip, "radius_km", DEFAULT_RADIUS_KM)
+    source_radius_km = _number(trip, "source_radius_km", DEFAULT_SOURCE_RADIUS_KM)
+    for field, value in [
+        ("radius_km", radius_km),
+        ("source_radius_km", source_radius_km),
+    ]:
+        if not min_search_radius_km <= value <= max_search_radius_km:
+            raise ValueError(
+                f"{field} must be between {min_search_radius_km} and "
+                f"{max_search_radius_km}: {trip[field]!r}"
+            )
+    seed = _number(trip, "seed", DEFAULT_SEED)
+    if seed != int(seed):
+        raise ValueError(f"Invalid seed: {trip['seed']!r}")
+    subcategories = trip.get("subcategories")
+    if subcategories is not None and not isinstance(subcategories, list):
+        raise ValueError(f"Invalid subcategories: {subcategories!r}")
+    return {
+        "id": trip["id"],
+        "destination": _location_key(str(trip["destination"]), radius_km),
+        "source": _location_key(str(trip["source"]), source_radius_km),
+        "dates": dates,
+        "budget": budget,
+        "subcategories": subcategories,
+        "seed": int(seed),
+    }
+
+
+def fetch_locations(keys, concurrency=DEFAULT_FETCH_CONCURRENCY):
+    """
+    Geocode and fetch the places of every distinct location once, a few
+    locations at a time to stay polite to Nominatim and Overpass.
+
+    All subcategories are fetched, so one fetch serves every trip to the
+    location whatever its filters.
+
+    Parameters:
+        keys (list): Distinct (normalised query, radius in meters) pairs.
+        concurrency (int): The number of locations fetched in parallel.
+
+    Returns:
+        dict: Location key -> ChainResult.
+    """
+    results = {}
+    for start in range(0, len(keys), concurrency):
+        batch = keys[start : start + concurrency]
+        chains = {i: key for i, key in enumerate(batch)}
+        for i, result in run_fetch_pipeline(chains).items():
+            results[batch[i]] = result
+    return results
+
+
+def _init_worker(places):
+    _worker_places.update(places)
+
+
+def _plan_trip(trip):
+    destination, destination_places = _worker_places[trip["destination"]]
+    source, source_places = _worker_places[trip["source"]]
+    try:
+        plan = plan_itinerary(
+            destination_places,
+            source_places,
+            (destination["lat"], destination["lon"]),
+            (source["lat"], source["lon"]),
+            trip["dates"],
+            trip["budget"],
+            filters=trip["subcategories"],
+            seed=trip["seed"],
+        )
+    except Exception as e:
+        return _error_result(trip["id"], str(e))
+    return {"id": trip["id"], "status": "ok", "error": None, "plan": plan}
+
+
+def _error_result(trip_id, error):
+    return {"id": trip_id, "status": "error", "error": error, "plan": None}
+
+
+def _fetch_error(result):
+    if result.error is not None:
+        return f"Fetching {result.query} failed at {result.stage}: {result.error}"
+    if result.location is None:
+        return f"Location not found: {result.query}"
+    return None
+
+
+def plan_trips(trips, workers=None, fetch_concurrency=DEFAULT_FETCH_CONCURRENCY):
+    """
+    Plan many trips: fetch each distinct location once, then plan the trips
+    across a process pool. The fetched places are sent to every worker once
+    instead of with every trip. An invalid request gets an error result,
+    the other trips are still planned.
+
+    Parameters:
+        trips (list): Trip request dicts, see read_trip_requests.
+        workers (int): The number of planning processes, defaults to the
+            number of CPUs.
+        fetch_concurrency (int): The number of locations fetched in parallel.
+
+    Returns:
+        tuple: (results, stats) where results holds one dict per trip, in
+        input order, with id, status, error and plan, and stats holds the
+        counts and timings of the run.
+    """
+    start = time.perf_counter()
+    results = [None] * len(trips)
+    requests = {}
+    for i, trip in enumerate(trips):
+        try:
+            requests[i] = parse_trip_request(trip)
+        except ValueError as e:
+            results[i] = _error_result(trip["id"], f"Invalid trip request: {e}")
+    keys = list(
+        dict.fromkeys(
+            key
+            for request in requests.values()
+            for key in (request["destination"], request["source"])
+        )
+    )
+    fetched = fetch_locations(keys, concurrency=fetch_concurrency)
+    fetch_seconds = time.perf_counter() - start
+
+    places = {
+        key: (result.location, result.places)
+        for key, result in fetched.items()
+        if _fetch_error(result) is None
+    }
+    plannable = []
+    for i, request in requests.items():
+        errors = [
+            _fetch_error(fetched[key])
+            for key in (request["destination"], request["source"])
+            if key not in places
+        ]
+        if errors:
+            results[i] = _error_result(request["id"], "; ".join(errors))
+        else:
+            plannable.append(i)
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(plannable) // (workers * 4))
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(places,)
+    ) as executor:
+        planned = executor.map(
+            _plan_trip, [requests[i] for i in plannable], chunksize=chunksize
+        )
+        for i, result in zip(plannable, planned):
+            results[i] = result
+
+    elapsed = time.perf_counter() - start
+    planned_trips = sum(result["status"] == "ok" for result in results)
+    stats = {
+        "trips": len(trips),
+        "planned": planned_trips,
+        "invalid": len(trips) - len(requests),
+        "failed": len(requests) - planned_trips,
+        "locations": len(keys),
+        "fetch_seconds": fetch_seconds,
+        "plan_seconds": elapsed - fetch_seconds,
+        "seconds": elapsed,
+        # Only planned trips count, rejected ones would inflate it
+        "trips_per_second": planned_trips / elapsed if elapsed else 0.0,
+    }
+    return results, stats
+
+
+def write_results(results, path):
+    """
+    Write trip results as JSONL, or as Parquet with the plan as a JSON
+    string column if `path` ends with .parquet.
+
+    Parameters:
+        results (list): Result dicts from plan_trips.
+        path (str): The output path.
+    """
+    if path.endswith(".parquet"):
+        pd.DataFrame(
+            {
+                "id": [str(result["id"]) for result in results],
+                "status": [result["status"] for result in results],
+                "error": [result["error"] for result in results],
+                "plan": [
+                    None if result["plan"] is None else json.dumps(result["plan"])
+                    for result in results
+                ],
+            }
+        ).to_parquet(path, index=False)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Plan itineraries for a JSONL or CSV file of trip requests."
+    )
+    parser.add_argument("requests", help="Trip requests, .jsonl or .csv")
+    parser.add_argument(
+        "-o", "--output", required=True, help="Output file, .jsonl or .parquet"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Planning processes (CPUs)"
+    )
+    parser.add_argument(
+        "--fetch-concurrency",
+        type=int,
+        default=DEFAULT_FETCH_CONCURRENCY,
+        help="Locations fetched in parallel",
+    )
+    args = parser.parse_args(argv)
+
+    trips = read_trip_requests(args.requests)
+    results, stats = plan_trips(
+        trips, workers=args.workers, fetch_concurrency=args.fetch_concurrency
+    )
+    write_results(results, args.output)
+
+    print(
+        f"Planned {stats['planned']}/{stats['trips']} trips "
+        f"({stats['invalid']} invalid, {stats['failed']} failed) from "
+        f"{stats['locations']} distinct locations in {stats['seconds']:.2f} s "
+        f"(fetch {stats['fetch_seconds']:.2f} s, plan {stats['plan_seconds']:.2f} s): "
+        f"{stats['trips_per_second']:.1f} planned trips/sec",
+        file=sys.stderr,
+    )
+    return 0 if stats["planned"] == stats["trips"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Benchmark of the shared SQLite cache backend in cache_backend.py.
+
+N worker processes look up random keys of a prefilled cache while one more
+process keeps writing batches, as Streamlit workers behind a load balancer
+would. Reports the hit latency percentiles and the lookups per second of
+all readers for each N.
+
+Run from the repository root:
+    python benchmarks/bench_cache_backend.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import Event, Pool, Process
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_backend import SQLiteBackend  # noqa: E402
+
+ENTRIES = 20000
+LOOKUPS = 2000
+VALUE = b"x" * 2048  # About the size of a pickled POI tile of a few places
+TTL = 3600
+
+
+def prefill(path):
+    backend = SQLiteBackend(path, "bench")
+    for start in range(0, ENTRIES, 1000):
+        backend.set_many({f"key-{i}": VALUE for i in range(start, start + 1000)}, TTL)
+
+
+def read(args):
+    path, seed = args
+    backend = SQLiteBackend(path, "bench")
+    rng = np.random.default_rng(seed)
+    latencies = np.empty(LOOKUPS)
+    for n, i in enumerate(rng.integers(ENTRIES, size=LOOKUPS).tolist()):
+        start = time.perf_counter()
+        assert backend.get(f"key-{i}") is not None
+        latencies[n] = time.perf_counter() - start
+    return latencies
+
+
+def write(path, stop):
+    backend = SQLiteBackend(path, "bench")
+    batch = 0
+    while not stop.is_set():
+        backend.set_many({f"new-{batch}-{i}": VALUE for i in range(50)}, TTL)
+        batch += 1
+
+
+def main():
+    print(f"{'readers':>7} {'p50 us':>8} {'p99 us':>8} {'lookups/s':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.sqlite3")
+        prefill(path)
+        for readers in [1, 2, 4, 8]:
+            stop = Event()
+            writer = Process(target=write, args=(path, stop))
+            writer.start()
+            start = time.perf_counter()
+            with Pool(readers) as pool:
+                latencies = np.concatenate(
+                    pool.map(read, [(path, seed) for seed in range(readers)])
+                )
+            elapsed = time.perf_counter() - start
+            stop.set()
+            writer.join()
+            print(
+                f"{readers:>7} {np.percentile(latencies, 50) * 1e6:>8.0f} "
+                f"{np.percentile(latencies, 99) * 1e6:>8.0f} "
+                f"{len(latencies) / elapsed:>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
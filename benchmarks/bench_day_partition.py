@@ -0,0 +1,64 @@
+"""
+Benchmark of the geographic day partitioning in day_partition.py.
+
+For random attractions around a city centre, reports the runtime of
+`partition_days` and the mean distance of an attraction to the centroid of
+its day, against the previous split into `head(places_per_day)` chunks of
+the distance-sorted list.
+
+Run from the repository root:
+    python benchmarks/bench_day_partition.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from day_partition import partition_days  # noqa: E402
+from geo import distances_from, haversine_km  # noqa: E402
+
+CENTER = (48.8566, 2.3522)
+
+
+def spread_km(lats, lons, labels):
+    """Mean distance of each attraction to the centroid of its day."""
+    total = 0.0
+    for day in np.unique(labels):
+        members = labels == day
+        total += haversine_km(
+            lats[members], lons[members], lats[members].mean(), lons[members].mean()
+        ).sum()
+    return total / len(lats)
+
+
+def head_split(lats, lons, days):
+    """The previous split: consecutive chunks of the distance-sorted list."""
+    order = np.argsort(distances_from(CENTER[0], CENTER[1], lats, lons))
+    labels = np.empty(len(lats), dtype=np.intp)
+    labels[order] = np.arange(len(lats)) * days // len(lats)
+    return labels
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'POIs':>6} {'days':>5} {'time ms':>9} {'spread km':>10} {'head km':>8}")
+    for n in [50, 500, 1000, 2000, 5000]:
+        lats = CENTER[0] + rng.normal(0, 0.05, n)
+        lons = CENTER[1] + rng.normal(0, 0.07, n)
+        for days in [3, 7, 14]:
+            start = time.perf_counter()
+            labels = partition_days(lats, lons, days, center=CENTER)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(
+                f"{n:>6} {days:>5} {elapsed:>9.1f} "
+                f"{spread_km(lats, lons, labels):>10.2f} "
+                f"{spread_km(lats, lons, head_split(lats, lons, days)):>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark of the map rendering in map_renderer.py.
+
+For random places around a city centre, reports the build plus HTML render
+time and the size of the page of each map mode, against the previous map
+of one folium.Marker per place.
+
+Run from the repository root:
+    python benchmarks/bench_map_render.py
+"""
+
+import os
+import sys
+import time
+
+import folium
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from map_renderer import measure_map_render  # noqa: E402
+from poi_columns import PlaceColumns  # noqa: E402
+
+CENTER = (48.8566, 2.3522)
+CATEGORIES = ["museum", "hotel", "restaurant", "cafe", "park", "hostel", "party"]
+MODES = ["points", "clusters", "heatmap"]
+
+
+def random_places(n, rng):
+    categories = np.array(CATEGORIES, dtype=object)[
+        rng.integers(len(CATEGORIES), size=n)
+    ]
+    return PlaceColumns(
+        np.array([f"Place {i}" for i in range(n)], dtype=object),
+        categories,
+        CENTER[0] + rng.normal(0, 0.05, n),
+        CENTER[1] + rng.normal(0, 0.07, n),
+    ).to_frame()
+
+
+def marker_per_row(places_df):
+    """The previous map: one folium.Marker per place."""
+    start = time.perf_counter()
+    location_map = folium.Map(
+        location=[places_df["Latitude"].mean(), places_df["Longitude"].mean()],
+        zoom_start=13,
+    )
+    for _, row in places_df.iterrows():
+        folium.Marker(
+            location=[row["Latitude"], row["Longitude"]],
+            popup=f"{row['Name']} ({row['Category']})",
+        ).add_to(location_map)
+    html = location_map.get_root().render()
+    return {
+        "html_bytes": len(html.encode("utf-8")),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'POIs':>6} {'mode':>9} {'time ms':>9} {'HTML KB':>9}")
+    for n in [100, 1000, 5000, 20000]:
+        places_df = random_places(n, rng)
+        results = [("markers", marker_per_row(places_df))] if n <= 5000 else []
+        results += [(mode, measure_map_render(places_df, mode)) for mode in MODES]
+        for mode, result in results:
+            print(
+                f"{n:>6} {mode:>9} {result['seconds'] * 1000:>9.1f} "
+                f"{result['html_bytes'] / 1024:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
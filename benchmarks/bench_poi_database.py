@@ -0,0 +1,69 @@
+"""
+Benchmark of radius searches in the local POI database of poi_database.py.
+
+Writes random places around several cities to a temporary database, then
+reports the latency percentiles and the number of places of searches
+around random points of the cities for each radius.
+
+Run from the repository root:
+    python benchmarks/bench_poi_database.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from poi_columns import PlaceColumns  # noqa: E402
+from poi_database import POIDatabase, write_poi_database  # noqa: E402
+
+CITIES = [(48.8566, 2.3522), (51.5072, -0.1276), (40.7128, -74.006), (28.6139, 77.209)]
+PLACES_PER_CITY = 100000
+CATEGORIES = ["museum", "hotel", "restaurant", "cafe", "park", "hostel"]
+SEARCHES = 50
+
+
+def random_places(rng):
+    n = PLACES_PER_CITY * len(CITIES)
+    centres = np.repeat(np.array(CITIES), PLACES_PER_CITY, axis=0)
+    return PlaceColumns(
+        np.array([f"Place {i}" for i in range(n)], dtype=object),
+        np.array(CATEGORIES, dtype=object)[rng.integers(len(CATEGORIES), size=n)],
+        centres[:, 0] + rng.normal(0, 0.1, n),
+        centres[:, 1] + rng.normal(0, 0.14, n),
+    )
+
+
+def main():
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "poi.sqlite3")
+        start = time.perf_counter()
+        write_poi_database(path, random_places(rng))
+        print(
+            f"Wrote {len(CITIES) * PLACES_PER_CITY} places in {time.perf_counter() - start:.1f} s"
+        )
+
+        database = POIDatabase(path)
+        print(f"{'radius km':>9} {'places':>7} {'p50 ms':>8} {'p99 ms':>8}")
+        for radius_km in [1, 5, 10, 20]:
+            latencies, found = np.empty(SEARCHES), np.empty(SEARCHES)
+            for i in range(SEARCHES):
+                lat, lon = CITIES[i % len(CITIES)]
+                lat, lon = lat + rng.normal(0, 0.05), lon + rng.normal(0, 0.07)
+                start = time.perf_counter()
+                found[i] = len(database.places_within(lat, lon, radius_km * 1000))
+                latencies[i] = time.perf_counter() - start
+            print(
+                f"{radius_km:>9} {np.median(found):>7.0f} "
+                f"{np.percentile(latencies, 50) * 1000:>8.1f} "
+                f"{np.percentile(latencies, 99) * 1000:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
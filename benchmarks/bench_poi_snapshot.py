@@ -0,0 +1,118 @@
+"""
+Benchmark of radius searches in the memory-mapped POI snapshot of
+poi_snapshot.py, against the SQLite POI database of poi_database.py.
+
+Writes random places around several cities to both, then reports:
+    - the latency percentiles of searches around random points of the
+      cities for each radius,
+    - for a new worker process, the time to open the snapshot, the time
+      of its first search and the memory they take (read from /proc, so on
+      Linux), against the snapshot size.
+
+Run from the repository root:
+    python benchmarks/bench_poi_snapshot.py
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from poi_columns import PlaceColumns  # noqa: E402
+from poi_database import POIDatabase, write_poi_database  # noqa: E402
+from poi_snapshot import POISnapshot, write_poi_snapshot  # noqa: E402
+
+CITIES = [(48.8566, 2.3522), (51.5072, -0.1276), (40.7128, -74.006), (28.6139, 77.209)]
+PLACES_PER_CITY = 100000
+CATEGORIES = ["museum", "hotel", "restaurant", "cafe", "park", "hostel"]
+SEARCHES = 50
+
+# Run by the new worker: open the snapshot and serve one search
+WORKER = """
+import os, sys, time
+from poi_snapshot import POISnapshot
+def resident_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024**2
+imported = resident_mb()
+start = time.perf_counter()
+snapshot = POISnapshot(sys.argv[1])
+opened = time.perf_counter()
+places = snapshot.places_within(48.8566, 2.3522, 1000)
+searched = time.perf_counter()
+print((opened - start) * 1000, (searched - opened) * 1000, len(places), resident_mb() - imported)
+"""
+
+
+def random_places(rng):
+    n = PLACES_PER_CITY * len(CITIES)
+    centres = np.repeat(np.array(CITIES), PLACES_PER_CITY, axis=0)
+    return PlaceColumns(
+        np.array([f"Place {i}" for i in range(n)], dtype=object),
+        np.array(CATEGORIES, dtype=object)[rng.integers(len(CATEGORIES), size=n)],
+        centres[:, 0] + rng.normal(0, 0.1, n),
+        centres[:, 1] + rng.normal(0, 0.14, n),
+    )
+
+
+def search_latencies(store, rng):
+    for radius_km in [1, 5, 10, 20]:
+        latencies, found = np.empty(SEARCHES), np.empty(SEARCHES)
+        for i in range(SEARCHES):
+            lat, lon = CITIES[i % len(CITIES)]
+            lat, lon = lat + rng.normal(0, 0.05), lon + rng.normal(0, 0.07)
+            start = time.perf_counter()
+            found[i] = len(store.places_within(lat, lon, radius_km * 1000))
+            latencies[i] = time.perf_counter() - start
+        yield radius_km, np.median(found), latencies
+
+
+def main():
+    rng = np.random.default_rng(0)
+    places = random_places(rng)
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_path = os.path.join(directory, "poi_snapshot")
+        database_path = os.path.join(directory, "poi.sqlite3")
+        write_poi_snapshot(snapshot_path, places)
+        write_poi_database(database_path, places)
+
+        print(
+            f"{'store':>8} {'radius km':>9} {'places':>7} {'p50 ms':>8} {'p99 ms':>8}"
+        )
+        stores = [
+            ("snapshot", POISnapshot(snapshot_path)),
+            ("database", POIDatabase(database_path)),
+        ]
+        for name, store in stores:
+            for radius_km, found, latencies in search_latencies(store, rng):
+                print(
+                    f"{name:>8} {radius_km:>9} {found:>7.0f} "
+                    f"{np.percentile(latencies, 50) * 1000:>8.1f} "
+                    f"{np.percentile(latencies, 99) * 1000:>8.1f}"
+                )
+
+        size = (
+            sum(entry.stat().st_size for entry in os.scandir(snapshot_path)) / 1024**2
+        )
+        opened, searched, found, memory = subprocess.run(
+            [sys.executable, "-c", WORKER, snapshot_path],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=ROOT,
+        ).stdout.split()
+        print(
+            f"\nNew worker: snapshot of {size:.1f} MB opened in {float(opened):.1f} ms, "
+            f"first search ({found} places) in {float(searched):.1f} ms, "
+            f"{float(memory):.1f} MB more resident memory than after the imports"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import os
+import sqlite3
+import threading
+import time
+
+from config import cache_backend, sqlite_busy_timeout
+
+
+class CacheBackend:
+    """
+    Interface of the shared store behind the in-process caches (geocode,
+    POI tiles, travel times). Keys are strings, values bytes, and every
+    entry expires after its TTL.
+
+    The in-process LRUs answer repeated lookups of one worker. A backend
+    shares the entries between all worker processes of a deployment.
+    """
+
+    def get_many(self, keys):
+        """
+        Look up several keys at once.
+
+        Parameters:
+            keys (list): The keys.
+
+        Returns:
+            dict: Key -> value of the keys found and not expired.
+        """
+        raise NotImplementedError
+
+    def set_many(self, items, ttl):
+        """
+        Store several entries atomically: readers see all or none of them.
+
+        Parameters:
+            items (dict): Key -> value.
+            ttl (float): Seconds the entries stay valid.
+        """
+        raise NotImplementedError
+
+    def count(self):
+        """
+        Return the number of stored entries, expired ones included.
+
+        Returns:
+            int: The number of entries.
+        """
+        raise NotImplementedError
+
+    def get(self, key):
+        """
+        Look up one key.
+
+        Parameters:
+            key (str): The key.
+
+        Returns:
+            bytes: The value, or None if missing or expired.
+        """
+        return self.get_many([key]).get(key)
+
+    def set(self, key, value, ttl):
+        """
+        Store one entry.
+
+        Parameters:
+            key (str): The key.
+            value (bytes): The value.
+            ttl (float): Seconds the entry stays valid.
+        """
+        self.set_many({key: value}, ttl)
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Cache backend in a local SQLite database in WAL mode, shared by every
+    process on the host without an external service.
+
+    In WAL mode readers never block and are never blocked by the single
+    writer, and each write is one transaction, so readers see a batch of
+    entries either fully or not at all. Each thread (and process) has its
+    own connection.
+    Expired entries are purged when rows are written.
+
+    Parameters:
+        path (str): The database file.
+        table (str): The table of this cache, so several caches can share
+            a file.
+        busy_timeout (float): Seconds a writer waits for another one.
+    """
+
+    def __init__(self, path, table, busy_timeout=sqlite_busy_timeout):
+        self.path = path
+        self.table = table
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        connection.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_expires_at ON {table} (expires_at)"
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        # A forked worker must not reuse the connection of its parent
+        if connection is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Autocommit: reads need no transaction, writes open their own
+            connection = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get_many(self, keys):
+        keys = list(keys)
+        found = {}
+        connection = self._connection()
+        now = time.time()
+        # Stay well below SQLite's limit on query parameters
+        for i in range(0, len(keys), 500):
+            chunk = keys[i : i + 500]
+            rows = connection.execute(
+                f"SELECT key, value FROM {self.table} "
+                f"WHERE key IN ({','.join('?' * len(chunk))}) AND expires_at > ?",
+                chunk + [now],
+            ).fetchall()
+            found.update(rows)
+        return found
+
+    def set_many(self, items, ttl):
+        if not items:
+            return
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) "
+                "VALUES (?, ?, ?)",
+                [(key, value, now + ttl) for key, value in items.items()],
+            )
+            connection.execute(
+                f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,)
+            )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def count(self):
+        return (
+            self._connection()
+            .execute(f"SELECT COUNT(*) FROM {self.table}")
+            .fetchone()[0]
+        )
+
+
+def make_cache_backend(path, table, backend=cache_backend):
+    """
+    Create the backend configured for a cache.
+
+    Parameters:
+        path (str): The database file of the "sqlite" backend.
+        table (str): The table of the cache.
+        backend (str): "sqlite" to share the cache between the processes of
+            the host, "memory" to keep it in each process only.
+
+    Returns:
+        CacheBackend: The backend, or None for "memory".
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    if backend == "sqlite":
+        return SQLiteBackend(path, table)
+    if backend == "memory":
+        return None
+    raise ValueError(f"Unknown cache backend {backend!r}, expected sqlite or memory")
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from config import tourist_categories_dict
+
+# Main categories in config order, their position is the group code
+MAIN_CATEGORIES = list(tourist_categories_dict.keys())
+UNKNOWN_CODE = -1
+
+_main_category_of = {
+    subcategory.casefold(): main_category
+    for main_category, subcategories in tourist_categories_dict.items()
+    for subcategory in subcategories
+}
+
+
+def classify_categories(categories):
+    """
+    Map OSM categories (e.g. "museum") to their main category in
+    `tourist_categories_dict` (e.g. "Attractions").
+
+    Matching is exact, so "party" is not an art place and "barber" is not a
+    bar. Each distinct category is looked up once, so classifying a whole
+    fetch is a single O(n) pass.
+
+    Parameters:
+        categories (array-like): The OSM categories.
+
+    Returns:
+        pd.Categorical: Main categories, with MAIN_CATEGORIES as categories
+        and NaN (code -1) for categories outside `tourist_categories_dict`.
+    """
+    codes, uniques = pd.factorize(np.asarray(categories, dtype=object))
+    unique_codes = np.array(
+        [
+            (
+                MAIN_CATEGORIES.index(_main_category_of[value.casefold()])
+                if isinstance(value, str) and value.casefold() in _main_category_of
+                else UNKNOWN_CODE
+            )
+            for value in uniques
+        ]
+        + [UNKNOWN_CODE],  # factorize gives -1 for missing values
+        dtype=np.int8,
+    )
+    return pd.Categorical.from_codes(unique_codes[codes], categories=MAIN_CATEGORIES)
+
+
+def main_category_mask(places_df, main_category):
+    """
+    Boolean mask of the places in one main category, from the precomputed
+    "Main Category" column.
+
+    Parameters:
+        places_df (pd.DataFrame): Places with a "Main Category" column.
+        main_category (str): One of MAIN_CATEGORIES, e.g. "Food".
+
+    Returns:
+        np.ndarray: The mask, aligned with the rows of `places_df`.
+    """
+    codes = places_df["Main Category"].cat.codes.to_numpy()
+    return codes == MAIN_CATEGORIES.index(main_category)
@@ -1,4 +1,6 @@
-import random
+import os
+
+from estimators import DEFAULT_SEED, stable_randint
 
 poi_types = [
     "tourism",
@@ -43,26 +45,171 @@ tourist_categories_dict = {
     ],
 }
 
-email = "pooja" + str(random.randint(1, 1000)) + "@gmail.com"
+email = "pooja" + str(stable_randint(1, 1000, "email")) + "@gmail.com"
 
 train = False
 
+# Shared cache backend: "sqlite" shares the geocode, POI tile and travel-time
+# caches between all processes of a host, "memory" keeps them per process
+cache_backend = os.environ.get("CACHE_BACKEND", "sqlite")
+sqlite_busy_timeout = 30  # Seconds a writer waits for the database lock
+
+# Geocoding cache settings
+geocode_cache_path = ".cache/geocode.sqlite3"
+geocode_cache_size = 1024  # Entries kept in the in-memory LRU
+geocode_cache_ttl = 30 * 24 * 60 * 60  # 30 days, in seconds
+geocode_negative_cache_ttl = 24 * 60 * 60  # 1 day for queries with no results
+
+# Overpass POI tile cache settings
+poi_tile_size = 0.05  # Tile edge in degrees (~5.5 km of latitude)
+poi_cache_max_tiles = 2048  # Tiles kept before the least recently used is evicted
+poi_cache_max_bytes = 512 * 1024**2  # Memory for places shared by all sessions
+poi_cache_path = ".cache/poi_tiles.sqlite3"
+poi_cache_ttl = 7 * 24 * 60 * 60  # 7 days, in seconds
+
+# POI search source: "overpass" queries the Overpass API, "local" a POI
+# database and "snapshot" a memory-mapped POI snapshot, both built from an
+# OSM extract with osm_ingest.py
+poi_source = os.environ.get("POI_SOURCE", "overpass")
+poi_database_path = os.environ.get("POI_DATABASE_PATH", ".cache/poi.sqlite3")
+poi_snapshot_path = os.environ.get("POI_SNAPSHOT_PATH", ".cache/poi_snapshot")
+
+# Range of the POI search radius in km, of the radius slider of the UI and of
+# the requests of the service and the batch planner
+min_search_radius_km = 1
+max_search_radius_km = 20
+
+# Fetch pipeline timeouts, in seconds
+geocode_timeout = 20  # Per Nominatim request
+overpass_timeout = 30  # Per Overpass request
+fetch_pipeline_timeout = 60  # Overall deadline for source and destination
+
+# Upstream APIs, overridable e.g. to point at local stand-ins
+nominatim_url = os.environ.get(
+    "NOMINATIM_URL", "https://nominatim.openstreetmap.org/search"
+)
+overpass_url = os.environ.get("OVERPASS_URL", "https://overpass-api.de/api/interpreter")
+http_pool_size = 32  # Keep-alive connections kept per upstream host
+
+# Travel-time matrix provider settings
+google_maps_api_key = os.environ.get("GOOGLE_MAPS_API_KEY")  # Stub times if unset
+travel_time_timeout = 10  # Per Distance Matrix request, in seconds
+travel_time_cache_precision = 4  # Decimals of coordinates in cache keys (~11 m)
+travel_time_cache_size = 65536  # Origin/destination pairs kept in the LRU
+travel_time_cache_path = ".cache/travel_times.sqlite3"  # Only with an API key
+travel_time_cache_ttl = 30 * 24 * 60 * 60  # 30 days, in seconds
+
+# Cost engine: base price in Rupees per night, meal or entry of each main
+# category, scaled by the factor of the subcategory (1 if not listed)
+main_category_costs = {"Accommodation": 3000, "Food": 400, "Attractions": 300}
+subcategory_cost_factors = {
+    "hostel": 0.4,
+    "guest_house": 0.7,
+    "motel": 0.8,
+    "apartment": 1.2,
+    "resort": 2.5,
+    "bakery": 0.3,
+    "fast_food": 0.5,
+    "cafe": 0.6,
+    "food_court": 0.6,
+    "restaurant": 1.5,
+    "library": 0,
+    "park": 0,
+    "playground": 0,
+    "nature_reserve": 0,
+    "garden": 0,
+    "place_of_worship": 0,
+    "artwork": 0,
+    "grassland": 0,
+    "dog_park": 0,
+    "beach": 0,
+    "museum": 1.5,
+    "aquarium": 3,
+    "theatre": 3,
+    "escape_game": 4,
+    "theme_park": 6,
+    "golf_course": 8,
+}
+star_cost_step = 0.35  # Price change per hotel star above or below 3 stars
+min_star_cost_factor = 0.4
+# Share of the budget for each main category, the rest is kept as a reserve
+budget_shares = {"Accommodation": 0.45, "Food": 0.25, "Attractions": 0.2}
+
+# Attraction selection: a knapsack per day over the score of the attractions,
+# bounded by the sightseeing time of the day and the attractions budget
+attraction_selection_algorithm = "dp"  # "dp" (optimal on a grid) or "greedy"
+attraction_minutes_per_day = 480  # Visits plus travel between them
+candidate_attractions_per_day = 100  # Nearest attractions considered per day
+travel_minutes_per_km = 4  # Rough travel speed in the city (~15 km/h)
+min_travel_minutes = 10  # Shortest estimated leg to an attraction
+score_distance_scale_km = 5  # Score halves at this distance from the centre
+subcategory_scores = {
+    "attraction": 3,
+    "museum": 3,
+    "theme_park": 3,
+    "aquarium": 2.5,
+    "gallery": 2,
+    "theatre": 2,
+    "monastery": 2,
+    "beach": 2,
+    "nature_reserve": 2,
+    "garden": 1.5,
+    "place_of_worship": 1.5,
+    "park": 1.2,
+    "playground": 0.5,
+    "dog_park": 0.3,
+    "grassland": 0.3,
+}
+
+# Opening hours: stops are scheduled in the open windows of their places
+# within the sightseeing hours of each day
+day_start_time = "09:00"
+day_end_time = "20:00"
+opening_hours_cache_size = 4096  # Distinct opening_hours tags kept parsed
+
+# Result filtering: places of each subcategory kept from a fetch, the
+# subcategory filters then select among them without refetching
+places_per_category = 10
+
+# Map rendering: colour of the layer of each main category, and the number
+# of places drawn as points before the "auto" mode switches to a heatmap
+map_category_colors = {
+    "Accommodation": "#1f77b4",
+    "Food": "#ff7f0e",
+    "Attractions": "#2ca02c",
+    "Other": "#7f7f7f",
+}
+map_point_limit = 2000
+map_cache_size = 32  # Rendered map pages kept, shared by all sessions
+
+# HTTP itinerary service settings
+service_max_outbound = 32  # Fetch and planning calls running at once
+service_request_timeout = 90  # Deadline in seconds for each service request
+
 
 class TimeGoogleDataFetch:
-    def __init__(self, min_distance, max_distance):
+    def __init__(self, min_distance, max_distance, key=(), seed=DEFAULT_SEED):
         self.min_distance = min_distance
         self.max_distance = max_distance
+        self.key = key
+        self.seed = seed
         self.time_google_data_fetch = self.generate_time_google_data_fetch()
 
     def generate_time_google_data_fetch(self):
-        return random.randint(self.min_distance, self.max_distance)
+        return stable_randint(
+            self.min_distance, self.max_distance, "time", *self.key, seed=self.seed
+        )
 
 
 class CostTripAdvisorDataFetch:
-    def __init__(self):
+    def __init__(self, key=(), seed=DEFAULT_SEED):
         self.min_cost = 10
         self.max_cost = 20
+        self.key = key
+        self.seed = seed
         self.cost_trip_advisor_data_fetch = self.generate_cost_trip_advisor_data_fetch()
 
     def generate_cost_trip_advisor_data_fetch(self):
-        return random.randint(self.min_cost, self.max_cost)
+        return stable_randint(
+            self.min_cost, self.max_cost, "cost", *self.key, seed=self.seed
+        )
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+from categories import MAIN_CATEGORIES
+from config import (
+    budget_shares,
+    main_category_costs,
+    min_star_cost_factor,
+    star_cost_step,
+    subcategory_cost_factors,
+)
+
+
+def estimate_costs(places_df):
+    """
+    Price every place in one vectorized pass: the stay per night, the meal,
+    or the entry of an attraction, in Rupees.
+
+    The price is the base cost of the main category times the factor of the
+    subcategory. Stays are scaled by their OSM `stars` tag, and the OSM `fee`
+    tag overrides the tier of attractions: "no" makes them free, "yes" gives
+    a normally free kind of place (e.g. a park) the base entry price.
+
+    Parameters:
+        places_df (pd.DataFrame): Places with Category and Main Category,
+            and optionally Stars and Fee.
+
+    Returns:
+        np.ndarray: The price of each place, 0 for unclassified places.
+    """
+    n = len(places_df)
+    codes, uniques = pd.factorize(places_df["Category"].to_numpy(dtype=object))
+    factors = np.array(
+        [subcategory_cost_factors.get(str(value).casefold(), 1.0) for value in uniques]
+        + [1.0],  # factorize gives -1 for missing values
+        dtype=np.float64,
+    )[codes]
+
+    # Code -1 (unclassified) picks the trailing 0 base cost
+    main_codes = places_df["Main Category"].cat.codes.to_numpy()
+    base = np.array(
+        [main_category_costs[category] for category in MAIN_CATEGORIES] + [0.0],
+        dtype=np.float64,
+    )[main_codes]
+
+    stars = (
+        places_df["Stars"].to_numpy(dtype=np.float64)
+        if "Stars" in places_df
+        else np.full(n, np.nan)
+    )
+    is_stay = main_codes == MAIN_CATEGORIES.index("Accommodation")
+    star_factors = np.maximum(min_star_cost_factor, 1 + star_cost_step * (stars - 3))
+    factors = np.where(is_stay & ~np.isnan(stars), factors * star_factors, factors)
+
+    fees = (
+        places_df["Fee"].to_numpy(dtype=np.float64)
+        if "Fee" in places_df
+        else np.full(n, np.nan)
+    )
+    is_attraction = main_codes == MAIN_CATEGORIES.index("Attractions")
+    factors = np.where(is_attraction & (fees == 0), 0.0, factors)
+    factors = np.where(is_attraction & (fees == 1) & (factors == 0), 1.0, factors)
+    return np.round(base * factors)
+
+
+def allocate_budget(budget, days, shares=budget_shares):
+    """
+    Split the budget of a trip into allowances per night and per day.
+
+    Parameters:
+        budget (float): The budget of the trip in Rupees.
+        days (int): The number of days (nights) of the trip.
+        shares (dict): Share of the budget of each main category, the rest
+            is kept as a reserve.
+
+    Returns:
+        dict: stay_per_night, meal (per meal, three a day),
+        attractions_per_day and reserve, in Rupees.
+    """
+    days = max(1, days)
+    return {
+        "stay_per_night": budget * shares["Accommodation"] / days,
+        "meal": budget * shares["Food"] / (days * 3),
+        "attractions_per_day": budget * shares["Attractions"] / days,
+        "reserve": budget * (1 - sum(shares.values())),
+    }
@@ -1,7 +1,8 @@
 from config import TimeGoogleDataFetch, CostTripAdvisorDataFetch
+from estimators import DEFAULT_SEED
 
 
-def fetch_google_travel_time(min_distance, max_distance):
+def fetch_google_travel_time(min_distance, max_distance, key=(), seed=DEFAULT_SEED):
     """
     Fetch travel time from Google Maps API for a between
     `min_distance` and `max_distance` kilometers.
@@ -11,23 +12,31 @@ def fetch_google_travel_time(min_distance, max_distance):
 
         max_distance (int): The maximum distance in kilometers.
 
+        key (tuple): What is timed, e.g. a leg or a place. The same key and
+            seed always give the same time.
+
+        seed (int): The seed of the estimate.
+
     Returns:
 
         int: Travel time in minutes.
     """
-    config = TimeGoogleDataFetch(min_distance, max_distance)
+    config = TimeGoogleDataFetch(min_distance, max_distance, key=key, seed=seed)
     return config.time_google_data_fetch
 
 
-def fetch_trip_advisor_cost():
+def fetch_trip_advisor_cost(key=(), seed=DEFAULT_SEED):
     """
     Fetch cost from TripAdvisor API for a given trip.
 
     Parameters:
-        None
+        key (tuple): What is priced, e.g. a stay and a day. The same key and
+            seed always give the same cost.
+
+        seed (int): The seed of the estimate.
 
     Returns:
         int: Cost in dollars.
     """
-    config = CostTripAdvisorDataFetch()
+    config = CostTripAdvisorDataFetch(key=key, seed=seed)
     return config.cost_trip_advisor_data_fetch
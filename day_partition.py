@@ -0,0 +1,120 @@
+import math
+
+import numpy as np
+
+from geo import distances_from
+
+KM_PER_DEGREE = 111.195
+
+
+def _project_km(lats, lons, lat0):
+    """Equirectangular projection to kilometers around latitude `lat0`."""
+    x = (
+        np.asarray(lons, dtype=np.float64)
+        * KM_PER_DEGREE
+        * math.cos(math.radians(lat0))
+    )
+    y = np.asarray(lats, dtype=np.float64) * KM_PER_DEGREE
+    return np.column_stack([x, y])
+
+
+def _init_centers(points, k, rng):
+    """k-means++ seeding."""
+    centers = [points[rng.integers(len(points))]]
+    for _ in range(1, k):
+        d2 = np.min(
+            ((points[:, np.newaxis, :] - np.array(centers)[np.newaxis]) ** 2).sum(-1),
+            axis=1,
+        )
+        total = d2.sum()
+        if total == 0:
+            centers.append(points[rng.integers(len(points))])
+        else:
+            centers.append(points[rng.choice(len(points), p=d2 / total)])
+    return np.array(centers)
+
+
+def _assign_with_capacity(points, centers, capacity):
+    """
+    Assign every point to a cluster without exceeding `capacity` points per
+    cluster. In each round the unassigned points pick their nearest cluster
+    that still has room, and an over-subscribed cluster keeps only the
+    points closest to it; the others pick again in the next round.
+    """
+    n, k = len(points), len(centers)
+    d2 = ((points[:, np.newaxis, :] - centers[np.newaxis]) ** 2).sum(-1)
+    labels = np.full(n, -1, dtype=np.intp)
+    room = np.full(k, capacity, dtype=np.intp)
+
+    unassigned = np.arange(n)
+    while len(unassigned):
+        open_clusters = np.flatnonzero(room > 0)
+        choice = open_clusters[np.argmin(d2[np.ix_(unassigned, open_clusters)], axis=1)]
+        for cluster in np.unique(choice):
+            applicants = unassigned[choice == cluster]
+            if len(applicants) > room[cluster]:
+                nearest = np.argsort(d2[applicants, cluster], kind="stable")
+                applicants = applicants[nearest[: room[cluster]]]
+            labels[applicants] = cluster
+            room[cluster] -= len(applicants)
+        unassigned = np.flatnonzero(labels == -1)
+    return labels
+
+
+def partition_days(lats, lons, days, center=None, max_iter=30, random_state=42):
+    """
+    Split attractions into `days` compact geographic groups of balanced
+    size, so each day covers one neighbourhood.
+
+    This is a capacity-constrained k-means: each iteration assigns the
+    closest (attraction, day) pairs first while no day holds more than
+    ceil(n / days) attractions, then moves every day's centre to the mean
+    of its attractions, until the assignment no longer changes.
+
+    Parameters:
+        lats (array-like): Latitudes of the attractions in degrees.
+        lons (array-like): Longitudes of the attractions in degrees.
+        days (int): The number of days (groups).
+        center (tuple): Optional (lat, lon) of the city centre. Days are
+            numbered from the group closest to it outwards.
+        max_iter (int): The maximum number of k-means iterations.
+        random_state (int): The seed of the k-means++ initialisation.
+
+    Returns:
+        np.ndarray: Day index (0 to days - 1) of every attraction.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    n = len(lats)
+    k = min(days, n)
+    if k == 0:
+        return np.zeros(n, dtype=np.intp)
+
+    points = _project_km(lats, lons, float(np.mean(lats)))
+    capacity = math.ceil(n / k)
+    rng = np.random.default_rng(random_state)
+    centers = _init_centers(points, k, rng)
+
+    labels = None
+    for _ in range(max_iter):
+        new_labels = _assign_with_capacity(points, centers, capacity)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for cluster in range(k):
+            members = points[labels == cluster]
+            if len(members):
+                centers[cluster] = members.mean(axis=0)
+
+    # Number the days from the centre outwards
+    if center is not None:
+        centroid_lats = np.array([lats[labels == c].mean() for c in range(k)])
+        centroid_lons = np.array([lons[labels == c].mean() for c in range(k)])
+        order = np.argsort(
+            distances_from(center[0], center[1], centroid_lats, centroid_lons),
+            kind="stable",
+        )
+        day_of_cluster = np.empty(k, dtype=np.intp)
+        day_of_cluster[order] = np.arange(k)
+        labels = day_of_cluster[labels]
+    return labels
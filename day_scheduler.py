@@ -0,0 +1,61 @@
+from opening_hours import earliest_visit
+
+
+def schedule_stops(
+    first_leg_minutes, leg_minutes, visit_minutes, hours, weekday, day_start, day_end
+):
+    """
+    Give each stop of a day a visit time inside the open hours of its place.
+
+    Stops are taken in route order while they can be visited on arrival.
+    When none can, the one that opens first is visited next, waiting for it
+    to open, so a place that opens late does not hold up the rest of the
+    day. Stops that fit in none of their open windows before `day_end` are
+    left out.
+
+    Parameters:
+        first_leg_minutes (array-like): Travel minutes from the start of the
+            day (the stay) to each stop, 0 where there is no stay.
+        leg_minutes (np.ndarray): Travel minutes between stops, [i, j] from
+            stop i to stop j.
+        visit_minutes (array-like): Minutes of the visit of each stop.
+        hours (list): Opening hours of each stop from
+            `opening_hours.parse_opening_hours`, None where unknown.
+        weekday (int): Day of the week, 0 for Monday.
+        day_start (int): Minutes since midnight the day starts at.
+        day_end (int): Minutes since midnight all visits must end by.
+
+    Returns:
+        list: (stop, arrival, start) of the visited stops in visit order,
+        with the arrival and the start of the visit in minutes since
+        midnight.
+    """
+    schedule = []
+    remaining = list(range(len(visit_minutes)))
+    now, current = day_start, None
+    while remaining:
+        best = None
+        for stop in remaining:
+            travel = (
+                first_leg_minutes[stop]
+                if current is None
+                else leg_minutes[current][stop]
+            )
+            arrival = now + travel
+            start = earliest_visit(
+                hours[stop], weekday, arrival, visit_minutes[stop], day_end
+            )
+            if start is None:
+                continue
+            if start == arrival:
+                best = (stop, arrival, start)
+                break
+            if best is None or start < best[2]:
+                best = (stop, arrival, start)
+        if best is None:
+            break
+        stop, arrival, start = best
+        schedule.append(best)
+        remaining.remove(stop)
+        now, current = start + visit_minutes[stop], stop
+    return schedule
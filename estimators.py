@@ -0,0 +1,26 @@
+import hashlib
+
+DEFAULT_SEED = 0
+
+
+def stable_randint(low, high, *key, seed=DEFAULT_SEED):
+    """
+    Draw an integer in [low, high] that only depends on `key` and `seed`.
+
+    Unlike random.randint, repeated calls with the same key return the same
+    number in every run and process, so estimates derived from it (travel
+    times, visit durations, costs) are reproducible and plans built from
+    them can be cached and compared.
+
+    Parameters:
+        low (int): The smallest value.
+        high (int): The largest value.
+        *key: What is being estimated, e.g. ("visit", name, lat, lon).
+        seed (int): Selects another set of draws for the same keys.
+
+    Returns:
+        int: The drawn integer.
+    """
+    text = "\x1f".join(str(part) for part in (seed, low, high) + key)
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return low + int.from_bytes(digest, "big") % (high - low + 1)
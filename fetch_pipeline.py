@@ -0,0 +1,134 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from config import geocode_timeout, overpass_timeout, fetch_pipeline_timeout
+from geocode_cache import geocode
+from poi_cache import fetch_places
+
+
+class FetchCancelled(Exception):
+    """Raised inside a chain when the pipeline was cancelled between stages."""
+
+
+class ChainResult:
+    """
+    Outcome of one geocode -> POI chain of the fetch pipeline.
+
+    Parameters:
+        name (str): The name of the chain, e.g. "destination".
+        query (str): The location entered by the user.
+        radius (int): The POI search radius in meters.
+
+    Attributes:
+        location (dict): The geocoded location, None if not found.
+        places (pd.DataFrame): The points of interest, None if not fetched.
+        error (Exception): The error that stopped the chain, if any.
+        stage (str): The stage the chain stopped at ("geocode" or "poi").
+        elapsed (float): Wall time of the chain in seconds.
+    """
+
+    def __init__(self, name, query, radius):
+        self.name = name
+        self.query = query
+        self.radius = radius
+        self.location = None
+        self.places = None
+        self.error = None
+        self.stage = None
+        self.elapsed = None
+
+    @property
+    def timed_out(self):
+        return isinstance(self.error, (TimeoutError, FetchCancelled))
+
+
+def _run_chain(
+    name, query, radius, subcategories, cancel_event, geocode_timeout, overpass_timeout
+):
+    result = ChainResult(name, query, radius)
+    start = time.perf_counter()
+    try:
+        result.stage = "geocode"
+        result.location = geocode(result.query, timeout=geocode_timeout)
+        if result.location is None:
+            return result
+
+        if cancel_event.is_set():
+            raise FetchCancelled(f"Fetching {result.name} was cancelled")
+        result.stage = "poi"
+        result.places = fetch_places(
+            result.location["lat"],
+            result.location["lon"],
+            result.radius,
+            subcategories=subcategories,
+            timeout=overpass_timeout,
+        )
+        result.stage = None
+    except Exception as e:
+        result.error = e
+    finally:
+        result.elapsed = time.perf_counter() - start
+    return result
+
+
+def run_fetch_pipeline(
+    chains,
+    subcategories=None,
+    geocode_timeout=geocode_timeout,
+    overpass_timeout=overpass_timeout,
+    timeout=fetch_pipeline_timeout,
+):
+    """
+    Run independent geocode -> POI chains in parallel, one thread per chain,
+    so the wall time is that of the slowest chain instead of their sum.
+
+    Each stage has its own request timeout, and the whole pipeline has an
+    overall deadline: chains still running when it passes are cancelled
+    before their next stage and reported as timed out.
+
+    Parameters:
+        chains (dict): Chain name -> (location query, radius in meters).
+        subcategories (list): Subcategories to fetch, defaults to all.
+        geocode_timeout (float): Timeout in seconds for each Nominatim call.
+        overpass_timeout (float): Timeout in seconds for each Overpass call.
+        timeout (float): Overall deadline in seconds for the pipeline.
+
+    Returns:
+        dict: Chain name -> ChainResult.
+    """
+    cancel_event = threading.Event()
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, len(chains)), thread_name_prefix="fetch"
+    )
+    futures = {
+        name: executor.submit(
+            _run_chain,
+            name,
+            query,
+            radius,
+            subcategories,
+            cancel_event,
+            geocode_timeout,
+            overpass_timeout,
+        )
+        for name, (query, radius) in chains.items()
+    }
+    wait(futures.values(), timeout=timeout)
+
+    results = {}
+    for name, future in futures.items():
+        if future.done():
+            results[name] = future.result()
+            continue
+        # Chains past the deadline stop before their next stage
+        cancel_event.set()
+        future.cancel()
+        query, radius = chains[name]
+        results[name] = ChainResult(name, query, radius)
+        results[name].error = TimeoutError(
+            f"Fetching {name} did not finish within {timeout} seconds"
+        )
+    # Do not wait for cancelled chains, their in-flight request times out alone
+    executor.shutdown(wait=False, cancel_futures=True)
+    return results
@@ -0,0 +1,92 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2, dtype=np.float64):
+    """
+    Great-circle distance in kilometers between points, element-wise.
+
+    Inputs broadcast like NumPy arrays, so scalars, arrays, pandas Series
+    and mixes of them all work in one array pass.
+
+    Parameters:
+        lat1 (float or array-like): Latitudes of the first points in degrees.
+        lon1 (float or array-like): Longitudes of the first points in degrees.
+        lat2 (float or array-like): Latitudes of the second points in degrees.
+        lon2 (float or array-like): Longitudes of the second points in degrees.
+        dtype (np.dtype): Float type of the computation, np.float32 halves
+            memory for large inputs at ~1 m accuracy.
+
+    Returns:
+        np.ndarray or float: Distances in kilometers.
+    """
+    lat1 = np.radians(np.asarray(lat1, dtype=dtype))
+    lon1 = np.radians(np.asarray(lon1, dtype=dtype))
+    lat2 = np.radians(np.asarray(lat2, dtype=dtype))
+    lon2 = np.radians(np.asarray(lon2, dtype=dtype))
+
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+    return distance.astype(dtype, copy=False)
+
+
+def distances_from(lat, lon, lats, lons, dtype=np.float64):
+    """
+    One-to-many distances: from one point to every point of a set.
+
+    Parameters:
+        lat (float): Latitude of the origin in degrees.
+        lon (float): Longitude of the origin in degrees.
+        lats (array-like): Latitudes of the points in degrees.
+        lons (array-like): Longitudes of the points in degrees.
+        dtype (np.dtype): Float type of the computation.
+
+    Returns:
+        np.ndarray: Distances in kilometers, one per point.
+    """
+    return haversine_km(lat, lon, lats, lons, dtype=dtype)
+
+
+def distance_matrix(lats, lons, other_lats=None, other_lons=None, dtype=np.float64):
+    """
+    Many-to-many distances between two point sets.
+
+    Parameters:
+        lats (array-like): Latitudes of the origins in degrees.
+        lons (array-like): Longitudes of the origins in degrees.
+        other_lats (array-like): Latitudes of the destinations, defaults to
+            the origins for a square matrix.
+        other_lons (array-like): Longitudes of the destinations.
+        dtype (np.dtype): Float type of the computation.
+
+    Returns:
+        np.ndarray: (n_origins, n_destinations) matrix of kilometers.
+    """
+    if other_lats is None or other_lons is None:
+        other_lats, other_lons = lats, lons
+    lats = np.asarray(lats, dtype=dtype)[:, np.newaxis]
+    lons = np.asarray(lons, dtype=dtype)[:, np.newaxis]
+    other_lats = np.asarray(other_lats, dtype=dtype)[np.newaxis, :]
+    other_lons = np.asarray(other_lons, dtype=dtype)[np.newaxis, :]
+    return haversine_km(lats, lons, other_lats, other_lons, dtype=dtype)
+
+
+def consecutive_distances(lats, lons, dtype=np.float64):
+    """
+    Pairwise distances between consecutive points of a route.
+
+    Parameters:
+        lats (array-like): Latitudes of the stops in visiting order.
+        lons (array-like): Longitudes of the stops in visiting order.
+        dtype (np.dtype): Float type of the computation.
+
+    Returns:
+        np.ndarray: n - 1 leg distances in kilometers.
+    """
+    lats = np.asarray(lats, dtype=dtype)
+    lons = np.asarray(lons, dtype=dtype)
+    return haversine_km(lats[:-1], lons[:-1], lats[1:], lons[1:], dtype=dtype)
@@ -0,0 +1,220 @@
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from cache_backend import make_cache_backend
+from config import (
+    email,
+    geocode_cache_path,
+    geocode_cache_size,
+    geocode_cache_ttl,
+    geocode_negative_cache_ttl,
+    nominatim_url,
+)
+from http_session import get_http_session
+
+NOMINATIM_URL = nominatim_url
+
+
+def normalise_query(query):
+    """
+    Normalise a free-text location query so that equivalent spellings share
+    one cache entry, e.g. " new  york,USA " and "New York, USA".
+
+    Parameters:
+        query (str): The location entered by the user.
+
+    Returns:
+        str: The normalised cache key.
+    """
+    query = unicodedata.normalize("NFKC", query).casefold()
+    query = re.sub(r"\s*,\s*", ", ", query)
+    query = re.sub(r"\s+", " ", query)
+    return query.strip(" ,")
+
+
+class GeocodeCache:
+    """
+    Two-level cache for geocoding results: an in-memory LRU in front of a
+    shared backend, by default a SQLite store shared by every session and
+    every process of the app on the host.
+
+    Queries that returned no results are cached as well (negative caching),
+    with their own, shorter TTL.
+
+    Parameters:
+        backend (CacheBackend): The shared store, defaults to the one of
+            `config.cache_backend` ("memory" keeps the cache in memory only).
+        max_entries (int): The number of entries kept in the in-memory LRU.
+        ttl (int): Seconds a found location stays valid.
+        negative_ttl (int): Seconds a "no results" answer stays valid.
+
+    Attributes:
+        hits (int): Lookups answered from memory or the backend.
+        misses (int): Lookups that had to go to the network.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        max_entries=geocode_cache_size,
+        ttl=geocode_cache_ttl,
+        negative_ttl=geocode_negative_cache_ttl,
+    ):
+        self.backend = (
+            backend
+            if backend is not None
+            else make_cache_backend(geocode_cache_path, "geocode_cache")
+        )
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def hits(self):
+        return self.memory_hits + self.disk_hits
+
+    def get(self, query):
+        """
+        Look up a normalised query.
+
+        Parameters:
+            query (str): The normalised query.
+
+        Returns:
+            tuple: (found, location) where `location` is None for a cached
+            "no results" answer.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(query)
+            if entry is not None:
+                location, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(query)
+                    self.memory_hits += 1
+                    return True, location
+                del self._memory[query]
+
+        # The backend is read outside the lock, it never blocks readers
+        value = self.backend.get(query) if self.backend is not None else None
+        with self._lock:
+            if value is not None:
+                entry = json.loads(value)
+                self._remember(query, entry["location"], entry["expires_at"])
+                self.disk_hits += 1
+                return True, entry["location"]
+            self.misses += 1
+            return False, None
+
+    def set(self, query, location):
+        """
+        Store the result of a lookup.
+
+        Parameters:
+            query (str): The normalised query.
+            location (dict or None): The location found, or None if the
+                query returned no results.
+        """
+        ttl = self.ttl if location is not None else self.negative_ttl
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(query, location, expires_at)
+        if self.backend is not None:
+            entry = {"location": location, "expires_at": expires_at}
+            self.backend.set(query, json.dumps(entry).encode("utf-8"), ttl)
+
+    def _remember(self, query, location, expires_at):
+        self._memory[query] = (location, expires_at)
+        self._memory.move_to_end(query)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        """
+        Return hit/miss counters and sizes, used to size the cache.
+
+        Returns:
+            dict: Counters for memory hits, disk hits, misses and entries.
+        """
+        disk_entries = self.backend.count() if self.backend is not None else 0
+        with self._lock:
+            memory_entries = len(self._memory)
+        lookups = self.hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": memory_entries,
+            "disk_entries": disk_entries,
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_geocode_cache():
+    """
+    Return the process-wide geocode cache, creating it on first use.
+
+    Returns:
+        GeocodeCache: The shared cache.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = GeocodeCache()
+        return _default_cache
+
+
+def geocode(query, cache=None, timeout=100):
+    """
+    Fetch the coordinates of a location with the Nominatim API, answering
+    repeated lookups from the cache.
+
+    Parameters:
+        query (str): The location entered by the user, e.g. "Paris".
+        cache (GeocodeCache): The cache to use, defaults to the shared one.
+        timeout (float): Timeout in seconds for the Nominatim request.
+
+    Returns:
+        dict or None: {"lat", "lon", "display_name"} of the best match, or
+        None if Nominatim returned no results.
+
+    Raises:
+        requests.exceptions.RequestException: If the request fails or
+            Nominatim answers with an HTTP error.
+    """
+    cache = cache if cache is not None else get_geocode_cache()
+    key = normalise_query(query)
+    found, location = cache.get(key)
+    if found:
+        return location
+
+    params = {"q": query, "format": "json", "limit": 1}
+    headers = {"User-Agent": f"ItineraryPlanner/1.0 ({email})"}
+    response = get_http_session().get(
+        NOMINATIM_URL, params=params, headers=headers, timeout=timeout
+    )
+    response.raise_for_status()
+
+    results = response.json()
+    location = None
+    if results:
+        location = {
+            "lat": float(results[0]["lat"]),
+            "lon": float(results[0]["lon"]),
+            "display_name": results[0].get("display_name", query),
+        }
+    cache.set(key, location)
+    return location
@@ -0,0 +1,33 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import http_pool_size
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """
+    Return the process-wide requests session for Nominatim and Overpass.
+
+    Reusing one session keeps connections to each host alive between
+    requests, saving a TCP and TLS handshake per call, and lets up to
+    `http_pool_size` threads talk to the same host at once.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=4, pool_maxsize=http_pool_size, pool_block=True
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
@@ -2,10 +2,11 @@ import streamlit as st
 import requests
 import pandas as pd
 import folium
-from streamlit_folium import st_folium
+import streamlit.components.v1 as components
 import random
 import math
 from datetime import timedelta, date
+from geo import distances_from
 
 # Custom CSS for background and other styles
 def add_custom_css():
@@ -345,7 +346,7 @@ if st.session_state.places_df is not None:
                 popup=f"{row['Name']} ({row['Category']})"
             ).add_to(location_map)
 
-        st_folium(location_map, width=700, height=500)
+        components.html(location_map.get_root().render(), width=700, height=500)
 
         st.markdown("")
         st.markdown("---")
@@ -389,12 +390,10 @@ if st.session_state.places_df is not None:
                         st.markdown("---")
                         
                         # Add distance calculation
-                        sorted_places["Distance"] = sorted_places.apply(
-                            lambda row: ((row["Latitude"] - st.session_state.lat) ** 2 + 
-                                        (row["Longitude"] - st.session_state.lon) ** 2) ** 0.5, axis=1
+                        sorted_places["Distance_km"] = distances_from(
+                            st.session_state.lat, st.session_state.lon,
+                            sorted_places["Latitude"], sorted_places["Longitude"]
                         )
-                        
-                        sorted_places["Distance_km"] = sorted_places["Distance"] * 111  # Approx conversion to km
                         sorted_places = sorted_places.sort_values("Distance_km")
                         
                         # Generate itinerary
@@ -526,8 +525,6 @@ if st.session_state.places_df is not None:
     # Final Data Display
     with st.expander("ℹ️ All Places Of Interest", expanded=False):
         st.markdown("##### Detailed List")
-        if "Distance" in sorted_places.columns:
-            sorted_places = sorted_places.drop(columns=["Distance"])
         sorted_places["Place Category"] = sorted_places["Category"].str.replace("_", " ").str.title()
         st.dataframe(sorted_places.drop(columns={"Category"}).reset_index(drop=True))
         sorted_places = sorted_places.drop(columns={"Place Category"})
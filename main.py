@@ -1,14 +1,14 @@
 import streamlit as st
 import requests
-import pandas as pd
-import folium
-from streamlit_folium import st_folium
-from datetime import timedelta, date
-from config import poi_types, tourist_categories_dict, email, train
+import streamlit.components.v1 as components
+from datetime import date
+from config import tourist_categories_dict, train, min_search_radius_km, max_search_radius_km
 from user_interface import add_custom_css
-from utils import determine_transport_mode, calculate_travel_time
-from data_fetch import fetch_google_travel_time, fetch_trip_advisor_cost
 from recommender import train_models
+from fetch_pipeline import run_fetch_pipeline
+from trip_planner import plan_itinerary
+from map_renderer import get_map_cache
+from place_filter import PlaceFilter
 
 # add custom CSS to the app
 add_custom_css()
@@ -45,7 +45,7 @@ source = st.sidebar.text_input("Source (e.g., New York):", "New York")
 # set default value to New York as 10 kms
 radius_source = 10 * 1000  # Convert to meters
 destination = st.sidebar.text_input("Destination (e.g., Paris):", "Paris")
-radius = st.sidebar.slider("Search Radius (kms):", 1, 20, 1) * 1000  # Convert to meters
+radius = st.sidebar.slider("Search Radius (kms):", min_search_radius_km, max_search_radius_km, 1) * 1000  # Convert to meters
 
 # Button to Filter by Category
 st.sidebar.header("Filter by Points of Interest Categories")
@@ -97,10 +97,11 @@ selected_subcategories_attractions = [
 fetch_button = st.sidebar.button("Get Recommendations")
 
 # Initialize session state
-if "places_df" not in st.session_state:
-    st.session_state.places_df = None
-if "places_df_source" not in st.session_state:
-    st.session_state.places_df_source = None
+# The fetched places are kept unmodified, the filters only select among them
+if "place_filter" not in st.session_state:
+    st.session_state.place_filter = None
+if "place_filter_source" not in st.session_state:
+    st.session_state.place_filter_source = None
 if "lat" not in st.session_state or "lon" not in st.session_state:
     st.session_state.lat = None
     st.session_state.lon = None
@@ -108,279 +109,96 @@ if "lat_source" not in st.session_state or "lon_source" not in st.session_state:
     st.session_state.lat_source = None
     st.session_state.lon_source = None
 
-# Step 3: Fetch Coordinates with Nominatim API
+# Step 3: Fetch Coordinates with Nominatim API and Points of Interest with Overpass API
+# The destination and source chains run in parallel
 if fetch_button:
-    with st.spinner("Fetching Destination Location..."):
-        nominatim_url = "https://nominatim.openstreetmap.org/search"
-        params = {"q": destination, "format": "json", "limit": 1}
-        headers = {"User-Agent": f"ItineraryPlanner/1.0 ({email})"}
-
-        try:
-            response = requests.get(
-                nominatim_url, params=params, headers=headers, timeout=100
-            )
-            if response.status_code == 200:
-                results = response.json()
-                if results:
-                    location = results[0]
-                    st.session_state.lat = float(location["lat"])
-                    st.session_state.lon = float(location["lon"])
-                    st.write(
-                        f"Found destination {destination} at Latitude: {round(st.session_state.lat, 3)} and Longitude: {round(st.session_state.lon, 3)}"
-                    )
-                    st.success("Destination Location Fetched Successfully!")
-                else:
-                    st.error(
-                        "No results returned from Nominatim. Please check your input for destination."
-                    )
-            else:
-                st.error(
-                    f"Failed to fetch destination location data. HTTP Status: {response.status_code}"
-                )
-        except requests.exceptions.RequestException as e:
-            st.error(f"An error occurred while fetching destination location data: {e}")
+    with st.spinner("Fetching Destination and Source Points of Interests..."):
+        # Every subcategory is fetched, the filters select among the places
+        # so changing them never needs another fetch
+        fetch_results = run_fetch_pipeline(
+            {
+                "destination": (destination, radius),
+                "source": (source, radius_source),
+            }
+        )
 
-    with st.spinner("Fetching Source Location..."):
-        nominatim_url = "https://nominatim.openstreetmap.org/search"
-        params = {"q": source, "format": "json", "limit": 1}
-        headers = {"User-Agent": f"ItineraryPlanner/1.0 ({email})"}
+    state_keys = {
+        "destination": ("lat", "lon", "place_filter"),
+        "source": ("lat_source", "lon_source", "place_filter_source"),
+    }
+    for name, result in fetch_results.items():
+        lat_key, lon_key, filter_key = state_keys[name]
 
-        try:
-            response = requests.get(
-                nominatim_url, params=params, headers=headers, timeout=100
-            )
-            if response.status_code == 200:
-                results = response.json()
-                if results:
-                    location_source = results[0]
-                    st.session_state.lat_source = float(location_source["lat"])
-                    st.session_state.lon_source = float(location_source["lon"])
-                    st.write(
-                        f"Found source {source} at Latitude: {round(st.session_state.lat_source, 3)} and Longitude: {round(st.session_state.lon_source, 3)}"
-                    )
-                    st.success("Source Location Fetched Successfully!")
-                else:
-                    st.error(
-                        "No results returned from Nominatim. Please check your input for source."
-                    )
-            else:
+        if result.timed_out:
+            st.error(f"Fetching {name} data timed out. Please try again.")
+            continue
+
+        if result.stage == "geocode":
+            if isinstance(result.error, requests.exceptions.HTTPError):
                 st.error(
-                    f"Failed to fetch source location data. HTTP Status: {response.status_code}"
+                    f"Failed to fetch {name} location data. HTTP Status: {result.error.response.status_code}"
                 )
-        except requests.exceptions.RequestException as e:
-            st.error(f"An error occurred while fetching source location data: {e}")
-
-    # Fetch Destination Points of Interest with Overpass API
-    if st.session_state.lat is not None and st.session_state.lon is not None:
-        with st.spinner("Fetching Destination Points of Interests..."):
-            overpass_url = "https://overpass-api.de/api/interpreter"
-
-            # Construct query for all Destination POI types
-            query = f"""
-            [out:json];
-            (
-            """
-            for poi_type in poi_types:
-                query += f'node["{poi_type}"](around:{radius},{st.session_state.lat},{st.session_state.lon});'
-                query += f'way["{poi_type}"](around:{radius},{st.session_state.lat},{st.session_state.lon});'
-                query += f'relation["{poi_type}"](around:{radius},{st.session_state.lat},{st.session_state.lon});'
-            query += """
-            );
-            out center;
-            """
-
-            try:
-                response = requests.get(
-                    overpass_url, params={"data": query}, timeout=30
+            elif result.error is not None:
+                st.error(
+                    f"An error occurred while fetching {name} location data: {result.error}"
                 )
-                if response.status_code == 200:
-                    data = response.json().get("elements", [])
-                    if data:
-                        places = []
-                        for element in data:
-                            tags = element.get("tags", {})
-                            name = tags.get("name", "Unnamed Location")
-                            category = (
-                                tags.get("tourism")
-                                or tags.get("amenity")
-                                or tags.get("leisure")
-                                or tags.get("shop")
-                                or tags.get("natural")
-                                or tags.get("transport")
-                                or tags.get("cultural")
-                                or "Unknown Category"
-                            )
-                            lat = element.get(
-                                "lat", element.get("center", {}).get("lat")
-                            )
-                            lon = element.get(
-                                "lon", element.get("center", {}).get("lon")
-                            )
-
-                            if name and lat and lon:
-                                places.append(
-                                    {
-                                        "Name": name,
-                                        "Category": category,
-                                        "Latitude": lat,
-                                        "Longitude": lon,
-                                    }
-                                )
-
-                        places_data = pd.DataFrame(places)
-                        st.session_state.places_df = places_data.dropna(
-                            subset=["Latitude", "Longitude"]
-                        )
-
-                        # remove ""Unknown Category" from the category column, "Unknown Location" from the name column
-                        st.session_state.places_df = st.session_state.places_df[
-                            st.session_state.places_df["Category"] != "Unknown Category"
-                        ]
-                        st.session_state.places_df = st.session_state.places_df[
-                            st.session_state.places_df["Name"] != "Unnamed Location"
-                        ]
-
-                        # Maximum of 20 in each category
-                        st.session_state.places_df = (
-                            st.session_state.places_df.groupby("Category")
-                            .head(10)
-                            .reset_index(drop=True)
-                        )
-                        st.success(
-                            "Destination Points of Interests Fetched Successfully!"
-                        )
-                    else:
-                        st.error(
-                            "No points of interest found for the given type and radius around the destination."
-                        )
-                else:
-                    st.error(
-                        f"Failed to fetch Destination POI data from Overpass API. HTTP Status: {response.status_code}"
-                    )
-            except requests.exceptions.RequestException as e:
-                st.error(f"An error occurred while fetching Destination POI data: {e}")
-
-    # Fetch Source Points of Interest with Overpass API
-    if (
-        st.session_state.lat_source is not None
-        and st.session_state.lon_source is not None
-    ):
-        with st.spinner("Fetching Source Points of Interests..."):
-            overpass_url = "https://overpass-api.de/api/interpreter"
-
-            # Construct query for all Source POI types
-            query = f"""
-            [out:json];
-            (
-            """
-            for poi_type in poi_types:
-                query += f'node["{poi_type}"](around:{radius_source},{st.session_state.lat_source},{st.session_state.lon_source});'
-                query += f'way["{poi_type}"](around:{radius_source},{st.session_state.lat_source},{st.session_state.lon_source});'
-                query += f'relation["{poi_type}"](around:{radius_source},{st.session_state.lat_source},{st.session_state.lon_source});'
-            query += """
-            );
-            out center;
-            """
-
-            try:
-                response = requests.get(
-                    overpass_url, params={"data": query}, timeout=30
+            else:
+                st.error(
+                    f"No results returned from Nominatim. Please check your input for {name}."
                 )
-                if response.status_code == 200:
-                    data = response.json().get("elements", [])
-                    if data:
-                        places_source = []
-                        for element in data:
-                            tags = element.get("tags", {})
-                            name = tags.get("name", "Unnamed Location")
-                            category = (
-                                tags.get("tourism")
-                                or tags.get("amenity")
-                                or tags.get("leisure")
-                                or tags.get("shop")
-                                or tags.get("natural")
-                                or tags.get("transport")
-                                or tags.get("cultural")
-                                or "Unknown Category"
-                            )
-                            lat = element.get(
-                                "lat", element.get("center", {}).get("lat")
-                            )
-                            lon = element.get(
-                                "lon", element.get("center", {}).get("lon")
-                            )
-
-                            if name and lat and lon:
-                                places_source.append(
-                                    {
-                                        "Name": name,
-                                        "Category": category,
-                                        "Latitude": lat,
-                                        "Longitude": lon,
-                                    }
-                                )
+            continue
 
-                        places_data_source = pd.DataFrame(places_source)
-                        st.session_state.places_df_source = places_data_source.dropna(
-                            subset=["Latitude", "Longitude"]
-                        )
-
-                        # remove ""Unknown Category" from the category column, "Unknown Location" from the name column
-                        st.session_state.places_df_source = (
-                            st.session_state.places_df_source[
-                                st.session_state.places_df_source["Category"]
-                                != "Unknown Category"
-                            ]
-                        )
-                        st.session_state.places_df_source = (
-                            st.session_state.places_df_source[
-                                st.session_state.places_df_source["Name"]
-                                != "Unnamed Location"
-                            ]
-                        )
+        st.session_state[lat_key] = result.location["lat"]
+        st.session_state[lon_key] = result.location["lon"]
+        st.write(
+            f"Found {name} {result.query} at Latitude: {round(result.location['lat'], 3)} and Longitude: {round(result.location['lon'], 3)}"
+        )
+        st.success(f"{name.title()} Location Fetched Successfully!")
 
-                        # Maximum of 20 in each category
-                        st.session_state.places_df_source = (
-                            st.session_state.places_df_source.groupby("Category")
-                            .head(10)
-                            .reset_index(drop=True)
-                        )
-                        st.success("Source Points of Interests Fetched Successfully!")
-                    else:
-                        st.error(
-                            "No points of interest found for the given type and radius around the source."
-                        )
-            except requests.exceptions.RequestException as e:
-                st.error(f"An error occurred while fetching Source POI data: {e}")
+        if isinstance(result.error, requests.exceptions.HTTPError):
+            st.error(
+                f"Failed to fetch {name.title()} POI data from Overpass API. HTTP Status: {result.error.response.status_code}"
+            )
+        elif result.error is not None:
+            st.error(
+                f"An error occurred while fetching {name.title()} POI data: {result.error}"
+            )
+        elif result.places.empty:
+            st.error(
+                f"No points of interest found for the given type and radius around the {name}."
+            )
+        else:
+            # Maximum of 10 in each category, selected by the filters below
+            st.session_state[filter_key] = PlaceFilter(result.places)
+            st.success(f"{name.title()} Points of Interests Fetched Successfully!")
 
 if (
-    st.session_state.places_df is not None
-    and st.session_state.places_df_source is not None
+    st.session_state.place_filter is not None
+    and st.session_state.place_filter_source is not None
 ):
+    selected_subcategories = (
+        selected_subcategories_food
+        + selected_subcategories_accommodation
+        + selected_subcategories_attractions
+    )
 
     st.write("## Recommendations at Destination")
-    # Filter the DataFrame based on selected categories
-    filtered_df = st.session_state.places_df
-    filtered_df = filtered_df[
-        filtered_df["Category"].isin(
-            selected_subcategories_food
-            + selected_subcategories_accommodation
-            + selected_subcategories_attractions
-        )
-    ].reset_index(drop=True)
-    filtered_df["Place Category"] = (
-        filtered_df["Category"].str.replace("_", " ").str.title()
+    # Select the places of the selected categories, the fetched places are
+    # kept so widening the selection needs no new fetch
+    filtered_df = st.session_state.place_filter.select(selected_subcategories)
+    st.dataframe(
+        filtered_df.assign(
+            **{
+                "Place Category": filtered_df["Category"]
+                .str.replace("_", " ")
+                .str.title()
+            }
+        ).drop(columns={"Category"})
     )
-    st.dataframe(filtered_df.drop(columns={"Category"}))
-    filtered_df = filtered_df.drop(columns={"Place Category"})
 
     # Display filtered data
     if not filtered_df.empty:
 
-        # Update the session state with the filtered DataFrame
-        st.session_state.places_df = filtered_df
-        sorted_places = filtered_df.copy()
-
         st.markdown("")
         st.markdown("---")
 
@@ -388,7 +206,7 @@ if (
         st.markdown("## Insights from Recommendations at Destination")
 
         # Display selected categories (remove "_" and make it capital)
-        selected_categories = st.session_state.places_df["Category"].unique()
+        selected_categories = filtered_df["Category"].unique()
         selected_categories = [
             cat.replace("_", " ").title() for cat in selected_categories
         ]
@@ -397,44 +215,39 @@ if (
 
         # Display total number of places found
         st.markdown("#### Total Number of Places Found at Destination")
-        st.write(len(st.session_state.places_df))
-
-    # Filter the DataFrame based on selected categories
-    filtered_df_source = st.session_state.places_df_source
-    filtered_df_source = filtered_df_source[
-        filtered_df_source["Category"].isin(
-            selected_subcategories_food
-            + selected_subcategories_accommodation
-            + selected_subcategories_attractions
-        )
-    ].reset_index(drop=True)
-    filtered_df_source["Place Category"] = (
-        filtered_df_source["Category"].str.replace("_", " ").str.title()
+        st.write(len(filtered_df))
+
+    # Select the source places of the selected categories
+    filtered_df_source = st.session_state.place_filter_source.select(
+        selected_subcategories
     )
-    filtered_df_source = filtered_df_source.drop(columns={"Place Category"})
 
     # Display filtered source data
     if not filtered_df_source.empty:
 
-        # Update the session state with the filtered source DataFrame
-        st.session_state.places_df_source = filtered_df_source
-        sorted_places_source = filtered_df_source.copy()
-
         st.markdown("")
         st.markdown("---")
 
-        # Map Visualization
+        # Map Visualization, one layer per main category ("Auto" switches
+        # to a heatmap for large results)
+        map_style = st.sidebar.selectbox(
+            "Map Style:", ["Auto", "Points", "Clusters", "Heatmap"]
+        )
+        # The maps are static pages cached by the content of the places, so
+        # reruns for other widgets neither rebuild nor redraw them
         st.header("Explore Places on the Map at Destination 🗺️")
-        map_center = [filtered_df["Latitude"].mean(), filtered_df["Longitude"].mean()]
-        location_map = folium.Map(location=map_center, zoom_start=13)
-
-        for _, row in filtered_df.iterrows():
-            folium.Marker(
-                location=[row["Latitude"], row["Longitude"]],
-                popup=f"{row['Name']} ({row['Category']})",
-            ).add_to(location_map)
+        components.html(
+            get_map_cache().html(filtered_df, mode=map_style.lower()),
+            width=700,
+            height=500,
+        )
 
-        st_folium(location_map, width=700, height=500)
+        st.header("Explore Places on the Map at Source 🗺️")
+        components.html(
+            get_map_cache().html(filtered_df_source, mode=map_style.lower()),
+            width=700,
+            height=500,
+        )
 
         st.markdown("")
         st.markdown("---")
@@ -475,508 +288,232 @@ if (
                 # Validate travel dates
                 if len(travel_dates) != 2:
                     st.error("Please select a start and end date for your trip.")
+                elif (travel_dates[1] - travel_dates[0]).days < 1:
+                    st.error("Travel dates must span at least one full day.")
                 else:
                     trip_start, trip_end = travel_dates
                     days = (trip_end - trip_start).days
-                    if days < 1:
-                        st.error("Travel dates must span at least one full day.")
-                    else:
-                        # Display trip information at the start
-                        st.write("")
-                        st.write("#### Trip Details")
-                        st.info(f"🗓️ **Trip Start Date**: {trip_start}")
-                        st.info(f"🗓️ **Trip End Date**: {trip_end}")
-                        st.info(f"📆 **Number of Days**: {days}")
-                        st.info(f"💰 **Budget**: ₹{budget}")
-                        st.markdown("---")
-
-                        # training models in recommender.py to get the most popular, highly rated and
-                        # recommended places considering the user's preferences (especially budget and travel dates)
-                        # 1. Autoencoder Model, 2. ALS Model, 3. K-Means Clustering Model
-                        train_models(
-                            rbm_units=(5, 3),
-                            als_params=(10, 10, 0.1),
-                            kmeans_clusters=3,
-                            knn_neighbors=5,
-                            train=train,
-                        )
-
-                        # Add distance calculation for destination places
-                        sorted_places["Distance"] = sorted_places.apply(
-                            lambda row: (
-                                (row["Latitude"] - st.session_state.lat) ** 2
-                                + (row["Longitude"] - st.session_state.lon) ** 2
-                            )
-                            ** 0.5,
-                            axis=1,
-                        )
-
-                        sorted_places["Distance_km"] = (
-                            sorted_places["Distance"] * 111
-                        )  # Approx conversion to km
-                        sorted_places = sorted_places.sort_values("Distance_km")
 
-                        # Add distance calculation for source places
-                        sorted_places_source["Distance"] = sorted_places_source.apply(
-                            lambda row: (
-                                (row["Latitude"] - st.session_state.lat_source) ** 2
-                                + (row["Longitude"] - st.session_state.lon_source) ** 2
-                            )
-                            ** 0.5,
-                            axis=1,
-                        )
-
-                        sorted_places_source["Distance_km"] = (
-                            sorted_places_source["Distance"] * 111
-                        )  # Approx conversion to km
-                        sorted_places_source = sorted_places_source.sort_values(
-                            "Distance_km", ascending=False
-                        )
-
-                        # Show details of source and destination and select place to stay
-                        try:
-                            # Travel from source to destination
-                            st.write("#### Travel from Source to Destination")
-                            st.write(f"🚆 **From:** {source}")
-                            st.write(f"🚆 **To:** {destination}")
-
-                            # total distance calculation as distance from source to destination based on lat/lon
-                            total_distance_source_destination = (
-                                (st.session_state.lat - st.session_state.lat_source)
-                                ** 2
-                                + (st.session_state.lon - st.session_state.lon_source)
-                                ** 2
-                            ) ** 0.5
-                            total_distance__source_destination_km = (
-                                total_distance_source_destination * 111
-                            )  # Approx conversion to km
-                            st.write(
-                                f"🛤️ Total Distance from source to destination: {total_distance__source_destination_km:.2f} km"
-                            )
-                            st.write(
-                                f"⏳ Travel Time: {calculate_travel_time(total_distance__source_destination_km)} minutes"
-                            )
-                            st.write(
-                                f"🚶 Recommended Mode: {determine_transport_mode(total_distance__source_destination_km)}"
-                            )
-
-                            st.markdown("---")
+                    # Display trip information at the start
+                    st.write("")
+                    st.write("#### Trip Details")
+                    st.info(f"🗓️ **Trip Start Date**: {trip_start}")
+                    st.info(f"🗓️ **Trip End Date**: {trip_end}")
+                    st.info(f"📆 **Number of Days**: {days}")
+                    st.info(f"💰 **Budget**: ₹{budget}")
+                    st.markdown("---")
+
+                    # training models in recommender.py to get the most popular, highly rated and
+                    # recommended places considering the user's preferences (especially budget and travel dates)
+                    # 1. Autoencoder Model, 2. ALS Model, 3. K-Means Clustering Model
+                    train_models(
+                        rbm_units=(5, 3),
+                        als_params=(10, 10, 0.1),
+                        kmeans_clusters=3,
+                        knn_neighbors=5,
+                        train=train,
+                    )
 
-                        except:
-                            # Display a warning or handle gracefully
-                            st.warning(
-                                "No suitable source and destination points of interest found for the given filters."
-                            )
-                            pass
-
-                try:
-                    # Generate itinerary for the trip
-                    places_per_day = min(
-                        5, max(1, len(sorted_places) // days)
-                    )  # 5 places/day max
-                    visited_indices = set()  # Track visited places
-
-                    # max 3 places in source total (not per day)
-                    places_source = min(
-                        3, max(1, len(sorted_places_source) // 3)
-                    )  # 3 places max
-                    visited_indices_source = set()  # Track visited places in source
-
-                    # Filter out places already visited
-                    available_places_source = sorted_places_source[
-                        ~sorted_places_source.index.isin(visited_indices_source)
-                    ]
-
-                    # Select attractions for the day
-                    attractions_source = available_places_source[
-                        (
-                            available_places_source["Category"].str.contains(
-                                "beach|attraction|library|art|aquarium|theatre|events_venue|museum|park|golf_course|theme_park|nature_reserve|garden|escape_game|amusement_arcade|place_of_worship|monastery|handicraft|artwork|pottery|antiques|grassland|dog_park|horse_riding",
-                                case=False,
-                                na=False,
-                            )
+                    try:
+                        # Plan the trip headlessly, then render the plan
+                        plan = plan_itinerary(
+                            filtered_df,
+                            filtered_df_source,
+                            (st.session_state.lat, st.session_state.lon),
+                            (st.session_state.lat_source, st.session_state.lon_source),
+                            (trip_start, trip_end),
+                            budget,
+                            filters=selected_subcategories,
                         )
-                        & (
-                            ~available_places_source["Category"].str.contains(
-                                "apartment", case=False, na=False
-                            )
-                        )
-                    ].head(places_source)
 
-                    if attractions_source.empty:
+                        # Travel from source to destination
+                        journey = plan["journey"]
+                        st.write("#### Travel from Source to Destination")
+                        st.write(f"🚆 **From:** {source}")
+                        st.write(f"🚆 **To:** {destination}")
                         st.write(
-                            "⚠️ Not enough attractions on the way from source to destination."
+                            f"🛤️ Total Distance from source to destination: {journey['distance_km']:.2f} km"
                         )
+                        st.write(f"⏳ Travel Time: {journey['travel_time']} minutes")
+                        st.write(f"🚶 Recommended Mode: {journey['mode']}")
+                        st.markdown("---")
 
-                    # Select POIs from soruce
-                    source_places = available_places_source[
-                        ~available_places_source.index.isin(visited_indices_source)
-                        & (
-                            available_places_source["Category"].str.contains(
-                                "beach|attraction|library|art|aquarium|theatre|events_venue|museum|park|golf_course|theme_park|nature_reserve|garden|escape_game|amusement_arcade|place_of_worship|monastery|handicraft|artwork|pottery|antiques|grassland|dog_park|horse_riding",
-                                case=False,
-                                na=False,
+                        # Places of interest on the way from the source
+                        if not plan["source_places"]:
+                            st.write(
+                                "⚠️ Not enough attractions on the way from source to destination."
                             )
-                        )
-                        & (
-                            ~available_places_source["Category"].str.contains(
-                                "apartment", case=False, na=False
+                        else:
+                            st.markdown(
+                                "##### 📌 Places of Interest You Can Visit on the Way from Source to Destination"
                             )
-                        )
-                    ].head(
-                        3
-                    )  # 3 extra places max
-                    if not source_places.empty:
-                        st.markdown(
-                            "##### 📌 Places of Interest You Can Visit on the Way from Source to Destination"
-                        )
-
-                        source_idx_dict = {}
-                        for i, (idx, source_place) in enumerate(
-                            source_places.iterrows()
-                        ):
-                            source_idx_dict[i] = idx
-                            if i == 0:
-                                st.write(f"🚆 **From:** {source}")
-                                st.write(
-                                    f"🗺️ **To:** {source_place['Name']} ({source_place['Category'].replace('_', ' ').title()})"
-                                )
-                                st.write(
-                                    f"📍 Location: {round(source_place['Latitude'], 3)}, {round(source_place['Longitude'], 3)}"
-                                )
-                                st.write(
-                                    f"🛤️ Distance: {round(source_place['Distance_km'], 2)} km"
-                                )
-                                st.markdown("---")
-                            elif i > 0:
-                                try:
+                            previous = None
+                            for place in plan["source_places"]:
+                                if previous is None:
+                                    st.write(f"🚆 **From:** {source}")
+                                else:
                                     st.write(
-                                        f"🗺️ **From:** {source_places.loc[source_idx_dict[i-1]]['Name']} ({source_places.loc[source_idx_dict[i-1]]['Category'].replace('_', ' ').title()})"
+                                        f"🗺️ **From:** {previous['name']} ({previous['category'].replace('_', ' ').title()})"
                                     )
-                                except:
-                                    st.write(f"🚆 **From:** {source}")
                                 st.write(
-                                    f"🗺️ **To:** {source_place['Name']} ({source_place['Category'].replace('_', ' ').title()})"
+                                    f"🗺️ **To:** {place['name']} ({place['category'].replace('_', ' ').title()})"
                                 )
                                 st.write(
-                                    f"📍 Location: {round(source_place['Latitude'], 3)}, {round(source_place['Longitude'], 3)}"
+                                    f"📍 Location: {round(place['lat'], 3)}, {round(place['lon'], 3)}"
                                 )
                                 st.write(
-                                    f"🛤️ Distance: {round(source_place['Distance_km'], 2)} km"
+                                    f"🛤️ Distance: {round(place['distance_km'], 2)} km"
                                 )
                                 st.markdown("---")
+                                previous = place
 
-                        visited_indices_source.update(source_places.index)
+                        for day_plan in plan["days"]:
+                            st.write(f"### Places to Visit at the Destination")
+                            st.write(f"#### Day {day_plan['day']}: {day_plan['date']}")
 
-                    for day in range(1, days + 1):
-                        st.write(f"### Places to Visit at the Destination")
-                        st.write(
-                            f"#### Day {day}: {trip_start + timedelta(days=day - 1)}"
-                        )
+                            if not day_plan["stops"]:
+                                st.write(
+                                    "⚠️ Not enough attractions open for this day at the destination."
+                                )
+                                continue
 
-                        # Filter out places already visited
-                        available_places = sorted_places[
-                            ~sorted_places.index.isin(visited_indices)
-                        ]
-
-                        # Select attractions for the day
-                        attractions = available_places[
-                            (
-                                available_places["Category"].str.contains(
-                                    "beach|attraction|library|art|aquarium|theatre|events_venue|museum|park|golf_course|theme_park|nature_reserve|garden|escape_game|amusement_arcade|place_of_worship|monastery|handicraft|artwork|pottery|antiques|grassland|dog_park|horse_riding",
-                                    case=False,
-                                    na=False,
+                            stay_place = day_plan["stay"]
+                            if stay_place is None:
+                                st.warning(
+                                    "No suitable stay places found for the given filters."
                                 )
-                            )
-                            & (
-                                ~available_places["Category"].str.contains(
-                                    "apartment", case=False, na=False
+                            else:
+                                st.write(
+                                    f"🏨 **Stay**: {stay_place['name']} ({stay_place['category'].replace('_', ' ').title()})"
                                 )
-                            )
-                        ].head(places_per_day)
-
-                        if attractions.empty:
-                            st.write(
-                                "⚠️ Not enough attractions for this day at the destination."
-                            )
-                            break
-
-                        # Add the selected attractions to the visited set
-                        visited_indices.update(attractions.index)
-
-                        try:
-                            stay_place = sorted_places[
-                                sorted_places["Category"].str.contains(
-                                    "hotel|guest_house|hostel|apartment|motel|resort|stay",
-                                    case=False,
-                                    na=False,
+                                st.write(
+                                    f"📍 Location: {round(stay_place['lat'], 3)}, {round(stay_place['lon'], 3)}"
                                 )
-                            ].iloc[0]
-
-                            # Display stay details
-                            st.write(
-                                f"🏨 **Stay**: {stay_place['Name']} ({stay_place['Category'].replace('_', ' ').title()})"
-                            )
-                            st.write(
-                                f"📍 Location: {round(stay_place['Latitude'], 3)}, {round(stay_place['Longitude'], 3)}"
-                            )
-                            st.write(f"📆 Number Of Days: {days}")
-                            st.write(
-                                f"💵 Cost Per Day: ₹{round(budget*(fetch_trip_advisor_cost()/(days*100)),0)}"
-                            )
-                            st.markdown("---")
-                        except:
-                            st.warning(
-                                "No suitable stay places found for the given filters."
-                            )
+                                st.write(f"📆 Number Of Days: {days}")
+                                st.write(
+                                    f"💵 Cost Per Day: ₹{day_plan['stay_cost_per_day']}"
+                                )
+                                st.markdown("---")
 
-                        # Display places for the day
-                        idx_dict = {}
-                        for i, (idx, attraction) in enumerate(attractions.iterrows()):
-                            idx_dict[i] = idx
-                            if i == 0:
-                                # Source (hotel) to first destination
-                                distance_km = attraction["Distance_km"]
-                                travel_time = calculate_travel_time(distance_km)
-                                transport_mode = determine_transport_mode(distance_km)
-
-                                if stay_place.empty:
+                            # Display places for the day in route order
+                            previous = None
+                            for stop in day_plan["stops"]:
+                                if previous is not None:
+                                    st.write(
+                                        f"🎯 **From:** {previous['name']} ({previous['category'].replace('_', ' ').title()})"
+                                    )
+                                elif stay_place is None:
                                     st.warning(
                                         "Start from the station/airport directly as no suitable stay places found for the given filters."
                                     )
                                 else:
                                     st.write(
-                                        f"🏨 **From Stay:** {stay_place['Name']} ({stay_place['Category'].replace('_', ' ').title()})"
+                                        f"🏨 **From Stay:** {stay_place['name']} ({stay_place['category'].replace('_', ' ').title()})"
                                     )
                                 st.write(
-                                    f"🎯 **To:** {attraction['Name']} ({attraction['Category'].replace('_', ' ').title()})"
-                                )
-                                st.write(
-                                    f"📍 Location: {round(attraction['Latitude'], 3)}, {round(attraction['Longitude'], 3)}"
+                                    f"🎯 **To:** {stop['name']} ({stop['category'].replace('_', ' ').title()})"
                                 )
-                                st.write(f"🛤️ Distance: {distance_km:.2f} km")
-                                st.write(f"⏳ Travel Time: {travel_time} minutes")
-                                st.write(f"🚶 Recommended Mode: {transport_mode}")
                                 st.write(
-                                    f"🕒 Estimated Visit Duration: {fetch_google_travel_time(min_distance=30, max_distance=120)} minutes"
+                                    f"📍 Location: {round(stop['lat'], 3)}, {round(stop['lon'], 3)}"
                                 )
-                                st.markdown("---")
-                            elif i > 0:
-                                # From previous destination to next destination
-                                distance_km = attraction["Distance_km"]
-                                travel_time = calculate_travel_time(distance_km)
-                                transport_mode = determine_transport_mode(distance_km)
-
-                                try:
-                                    st.write(
-                                        f"🎯 **From:** {attractions.loc[idx_dict[i-1]]['Name']} ({attractions.loc[idx_dict[i-1]]['Category'].replace('_', ' ').title()})"
-                                    )
-                                except:
-                                    if stay_place.empty:
-                                        st.warning(
-                                            "Start from the station/airport directly as no suitable stay places found for the given filters."
-                                        )
-                                    else:
-                                        st.write(
-                                            f"🏨 **From Stay:** {stay_place['Name']} ({stay_place['Category'].replace('_', ' ').title()})"
-                                        )
+                                st.write(f"🛤️ Distance: {stop['distance_km']:.2f} km")
+                                st.write(f"⏳ Travel Time: {stop['travel_time']} minutes")
+                                st.write(f"🚶 Recommended Mode: {stop['mode']}")
                                 st.write(
-                                    f"🎯 **To:** {attraction['Name']} ({attraction['Category'].replace('_', ' ').title()})"
+                                    f"🕒 Estimated Visit Duration: {stop['visit_duration']} minutes"
                                 )
                                 st.write(
-                                    f"📍 Location: {round(attraction['Latitude'], 3)}, {round(attraction['Longitude'], 3)}"
+                                    f"🕘 Arrival: {stop['arrival']}, Visit: {stop['start']} - {stop['end']}"
                                 )
-                                st.write(f"🛤️ Distance: {distance_km:.2f} km")
-                                st.write(f"⏳ Travel Time: {travel_time} minutes")
-                                st.write(f"🚶 Recommended Mode: {transport_mode}")
+                                if stop["opening_hours"]:
+                                    st.write(f"🚪 Opening Hours: {stop['opening_hours']}")
+                                st.write(f"🎟️ Estimated Entry Cost: ₹{stop['cost']:.0f}")
+                                st.markdown("---")
+                                previous = stop
+
+                            if stay_place is not None:
                                 st.write(
-                                    f"🕒 Estimated Visit Duration: {fetch_google_travel_time(min_distance=30, max_distance=120)} minutes"
+                                    f"🏨 **Back to Stay:** {stay_place['name']} ({day_plan['return_to_stay_km']:.2f} km)"
                                 )
                                 st.markdown("---")
 
-                        # Select additional POIs
-                        extra_places = available_places[
-                            ~available_places.index.isin(visited_indices)
-                            & (
-                                available_places["Category"].str.contains(
-                                    "beach|attraction|library|art|aquarium|theatre|events_venue|museum|park|golf_course|theme_park|nature_reserve|garden|escape_game|amusement_arcade|place_of_worship|monastery|handicraft|artwork|pottery|antiques|grassland|dog_park|horse_riding",
-                                    case=False,
-                                    na=False,
-                                )
-                            )
-                            & (
-                                ~available_places["Category"].str.contains(
-                                    "apartment", case=False, na=False
+                            # Additional places near the last attraction of the day
+                            if day_plan["extra_places"]:
+                                st.markdown(
+                                    "##### 📌 Additional Places of Interest You Can Visit on the Way at the Destination for each Day of Itinerary"
                                 )
-                            )
-                        ].head(
-                            3
-                        )  # 3 extra places max
-                        if not extra_places.empty:
-                            st.markdown(
-                                "##### 📌 Additional Places of Interest You Can Visit on the Way at the Destination for each Day of Itinerary"
-                            )
-
-                            extra_idx_dict = {}
-                            for i, (idx, extra) in enumerate(extra_places.iterrows()):
-                                extra_idx_dict[i] = idx
-                                if i == 0:
-                                    if stay_place.empty:
-                                        st.warning(
-                                            "Start from the station/airport directly as no suitable stay places found for the given filters."
-                                        )
-                                    else:
-                                        st.write(
-                                            f"🏨 **From Stay:** {stay_place['Name']} ({stay_place['Category'].replace('_', ' ').title()})"
-                                        )
+                                for extra in day_plan["extra_places"]:
+                                    st.write(
+                                        f"🗺️ **From:** {previous['name']} ({previous['category'].replace('_', ' ').title()})"
+                                    )
                                     st.write(
-                                        f"🗺️ **To:** {extra['Name']} ({extra['Category'].replace('_', ' ').title()})"
+                                        f"🗺️ **To:** {extra['name']} ({extra['category'].replace('_', ' ').title()})"
                                     )
                                     st.write(
-                                        f"📍 Location: {round(extra['Latitude'], 3)}, {round(extra['Longitude'], 3)}"
+                                        f"📍 Location: {round(extra['lat'], 3)}, {round(extra['lon'], 3)}"
                                     )
                                     st.write(
-                                        f"🛤️ Distance: {round(extra['Distance_km']/2, 2)} km"
+                                        f"🛤️ Distance: {round(extra['distance_km'], 2)} km"
                                     )
                                     st.markdown("---")
-                                elif i > 0:
-                                    try:
-                                        st.write(
-                                            f"🗺️ **From:** {extra_places.loc[extra_idx_dict[i-1]]['Name']} ({extra_places.loc[extra_idx_dict[i-1]]['Category'].replace('_', ' ').title()})"
-                                        )
-                                    except:
-                                        if stay_place.empty:
-                                            st.warning(
-                                                "Start from the station/airport directly as no suitable stay places found for the given filters."
-                                            )
-                                        else:
-                                            st.write(
-                                                f"🏨 **From Stay:** {stay_place['Name']} ({stay_place['Category'].replace('_', ' ').title()})"
-                                            )
+                                    previous = extra
+
+                            # Meal locations near the stops they follow
+                            meals = day_plan["meals"]
+                            if len(meals) == 3:
+                                # Display meal locations in tabs
+                                tabs = st.tabs(["🍳 Breakfast", "🍴 Lunch", "🍽️ Dinner"])
+                            elif meals:
+                                # Fallback: Only one or two meal places available
+                                st.warning(
+                                    "Not enough meal locations for breakfast, lunch, and dinner. Showing available meal options below!"
+                                )
+                                tabs = [st.container() for _ in meals]
+                            else:
+                                st.error(
+                                    "Not enough meal locations available to recommend breakfast, lunch, or dinner."
+                                )
+                                tabs = []
+                            for tab, meal in zip(tabs, meals):
+                                with tab:
                                     st.write(
-                                        f"🗺️ **To:** {extra['Name']} ({extra['Category'].replace('_', ' ').title()})"
+                                        f"🍽️ **{meal['meal']}**: {meal['name']} ({meal['category'].replace('_', ' ').title()})"
                                     )
                                     st.write(
-                                        f"📍 Location: {round(extra['Latitude'], 3)}, {round(extra['Longitude'], 3)}"
+                                        f"📍 Location: {round(meal['lat'], 3)}, {round(meal['lon'], 3)}"
                                     )
                                     st.write(
-                                        f"🛤️ Distance: {round(extra['Distance_km']/2, 2)} km"
+                                        f"🛤️ Distance: {round(meal['distance_km'], 2)} km"
                                     )
+                                    st.write(
+                                        f"⏳ Travel Time: {meal['travel_time']} minutes"
+                                    )
+                                    st.write(f"💵 Estimated Cost: ₹{meal['cost']:.0f}")
                                     st.markdown("---")
 
-                            visited_indices.update(extra_places.index)
-
-                        # Filter meal locations
-                        meal_places = available_places[
-                            available_places["Category"].str.contains(
-                                "bakery|fast_food|restaurant|cafe|food_court|food|bar|pub|club",
-                                case=False,
-                                na=False,
-                            )
-                        ]
-
-                        # Ensure there are enough meal places to avoid index errors
-                        if len(meal_places) >= 3:
-                            # Assign meal places
-                            breakfast_place = meal_places.iloc[0]
-                            lunch_place = meal_places.iloc[1]
-                            dinner_place = meal_places.iloc[2]
-
-                            # Display meal locations in tabs
-                            tabs = st.tabs(["🍳 Breakfast", "🍴 Lunch", "🍽️ Dinner"])
-
-                            with tabs[0]:  # Breakfast
-                                st.write(
-                                    f"🍽️ **Breakfast**: {breakfast_place['Name']} ({breakfast_place['Category'].replace('_', ' ').title()})"
-                                )
-                                st.write(
-                                    f"📍 Location: {round(breakfast_place['Latitude'], 3)}, {round(breakfast_place['Longitude'], 3)}"
-                                )
-                                st.write(
-                                    f"🛤️ Distance: {round(breakfast_place['Distance_km'], 2)} km"
-                                )
-                                st.write(
-                                    f"⏳ Travel Time: {calculate_travel_time(breakfast_place['Distance_km'])} minutes"
-                                )
-                                st.markdown("---")
-
-                            with tabs[1]:  # Lunch
-                                st.write(
-                                    f"🍽️ **Lunch**: {lunch_place['Name']} ({lunch_place['Category'].replace('_', ' ').title()})"
-                                )
-                                st.write(
-                                    f"📍 Location: {round(lunch_place['Latitude'], 3)}, {round(lunch_place['Longitude'], 3)}"
-                                )
-                                st.write(
-                                    f"🛤️ Distance: {round(lunch_place['Distance_km'], 2)} km"
-                                )
-                                st.write(
-                                    f"⏳ Travel Time: {calculate_travel_time(lunch_place['Distance_km'])} minutes"
-                                )
-                                st.markdown("---")
-
-                            with tabs[2]:  # Dinner
-                                st.write(
-                                    f"🍽️ **Dinner**: {dinner_place['Name']} ({dinner_place['Category'].replace('_', ' ').title()})"
-                                )
-                                st.write(
-                                    f"📍 Location: {round(dinner_place['Latitude'], 3)}, {round(dinner_place['Longitude'], 3)}"
-                                )
-                                st.write(
-                                    f"🛤️ Distance: {round(dinner_place['Distance_km'], 2)} km"
-                                )
-                                st.write(
-                                    f"⏳ Travel Time: {calculate_travel_time(dinner_place['Distance_km'])} minutes"
-                                )
-                                st.markdown("---")
-
-                            # Mark the meal places as visited
-                            visited_indices.update(
-                                [
-                                    breakfast_place.name,
-                                    lunch_place.name,
-                                    dinner_place.name,
-                                ]
-                            )
-
-                        elif len(meal_places) > 0:
-                            # Fallback: Only one or two meal places available
-                            st.warning(
-                                "Not enough meal locations for breakfast, lunch, and dinner. Showing available meal options below!"
+                            st.write(
+                                f"💰 **Estimated Cost of Day {day_plan['day']}**: ₹{day_plan['cost']:.0f}"
                             )
-
-                            for i, place in enumerate(meal_places.itertuples()):
-                                meal_type = ["Breakfast", "Lunch", "Dinner"][i]
-                                st.write(
-                                    f"🍽️ **{meal_type}**: {place.Name} ({place.Category.replace('_', ' ').title()})"
-                                )
-                                st.write(
-                                    f"📍 Location: {round(place.Latitude, 3)}, {round(place.Longitude, 3)}"
-                                )
-                                st.write(
-                                    f"🛤️ Distance: {round(place.Distance_km, 2)} km"
-                                )
-                                st.write(
-                                    f"⏳ Travel Time: {calculate_travel_time(place.Distance_km)} minutes"
-                                )
-                                st.markdown("")
-
-                                # Mark this place as visited
-                                visited_indices.add(place.Index)
-
                             st.markdown("---")
 
-                        else:
-                            st.error(
-                                "Not enough meal locations available to recommend breakfast, lunch, or dinner."
+                        # Total cost against the budget
+                        st.write("#### Estimated Trip Cost")
+                        st.info(
+                            f"💰 **Total**: ₹{plan['total_cost']:.0f} of your ₹{budget} budget"
+                        )
+                        if not plan["within_budget"]:
+                            st.warning(
+                                "⚠️ This itinerary exceeds your budget. Consider a higher budget, fewer days or cheaper categories."
                             )
 
-                except IndexError as e:
-                    st.error(
-                        f"Not enough data to plan the trip for {days} days. Please adjust your filters or data."
-                    )
-                except Exception as e:
-                    st.error(f"An error occurred while generating the itinerary: {e}")
+                    except IndexError as e:
+                        st.error(
+                            f"Not enough data to plan the trip for {days} days. Please adjust your filters or data."
+                        )
+                    except Exception as e:
+                        st.error(
+                            f"An error occurred while generating the itinerary: {e}"
+                        )
             else:
                 st.warning(
                     "No itinerary to show yet. Start by entering budget, travel dates and 'Get Recommended Itinerary'."
@@ -988,13 +525,15 @@ if (
     # Final Data Display
     with st.expander("ℹ️ All Places Of Interest", expanded=False):
         st.markdown("##### Detailed List")
-        if "Distance" in sorted_places.columns:
-            sorted_places = sorted_places.drop(columns=["Distance"])
-        sorted_places["Place Category"] = (
-            sorted_places["Category"].str.replace("_", " ").str.title()
+        st.dataframe(
+            filtered_df.assign(
+                **{
+                    "Place Category": filtered_df["Category"]
+                    .str.replace("_", " ")
+                    .str.title()
+                }
+            ).drop(columns={"Category"})
         )
-        st.dataframe(sorted_places.drop(columns={"Category"}).reset_index(drop=True))
-        sorted_places = sorted_places.drop(columns={"Place Category"})
 
     csv = filtered_df.to_csv(index=False).encode("utf-8")
     st.download_button(
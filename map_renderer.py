@@ -0,0 +1,288 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import folium
+import pandas as pd
+from folium.plugins import FastMarkerCluster, HeatMap
+
+from categories import MAIN_CATEGORIES
+from config import map_cache_size, map_category_colors, map_point_limit
+
+MAP_MODES = ["auto", "points", "clusters", "heatmap"]
+MAP_COLUMNS = ["Name", "Category", "Latitude", "Longitude", "Main Category"]
+OTHER_PLACES = "Other"
+
+# Draws each clustered point as a small circle in the colour of its layer
+_CLUSTER_CALLBACK = """
+function (row) {{
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {{
+        radius: 5, color: "{color}", fillColor: "{color}", fillOpacity: 0.8
+    }});
+    marker.bindTooltip(row[2]);
+    return marker;
+}};
+"""
+
+
+def resolve_map_mode(mode, n_points):
+    """
+    Pick the rendering of a map: "auto" draws individual points up to
+    `config.map_point_limit` places and a heatmap beyond.
+
+    Parameters:
+        mode (str): One of MAP_MODES.
+        n_points (int): The number of places on the map.
+
+    Returns:
+        str: "points", "clusters" or "heatmap".
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    if mode not in MAP_MODES:
+        raise ValueError(f"Unknown map mode {mode!r}, expected one of {MAP_MODES}")
+    if mode == "auto":
+        return "points" if n_points <= map_point_limit else "heatmap"
+    return mode
+
+
+def _category_groups(places_df):
+    """
+    Column arrays of the places of each main category, unclassified places
+    last, each as (name, names, categories, lats, lons).
+    """
+    codes = places_df["Main Category"].cat.codes.to_numpy()
+    names = places_df["Name"].to_numpy(dtype=object)
+    categories = places_df["Category"].to_numpy(dtype=object)
+    lats = places_df["Latitude"].to_numpy()
+    lons = places_df["Longitude"].to_numpy()
+    for code, name in list(enumerate(MAIN_CATEGORIES)) + [(-1, OTHER_PLACES)]:
+        members = codes == code
+        if members.any():
+            yield (
+                name,
+                names[members],
+                categories[members],
+                lats[members],
+                lons[members],
+            )
+
+
+def _feature_collection(names, categories, lats, lons):
+    """A GeoJSON FeatureCollection of points, built straight from columns."""
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [lon, lat]},
+                "properties": {"name": name, "category": category},
+            }
+            for name, category, lat, lon in zip(
+                names.tolist(), categories.tolist(), lats.tolist(), lons.tolist()
+            )
+        ],
+    }
+
+
+def build_place_map(places_df, mode="auto", zoom_start=13):
+    """
+    Build a folium map of places with one layer per main category.
+
+    Instead of one marker object per place, each layer is a single element
+    built from the column arrays, so the page stays small and responsive
+    with thousands of places:
+        "points": a GeoJSON layer of coloured circles with a name tooltip.
+        "clusters": a FastMarkerCluster layer that groups nearby places.
+        "heatmap": one density layer of all places.
+
+    Parameters:
+        places_df (pd.DataFrame): Places with Name, Category, Latitude,
+            Longitude and Main Category.
+        mode (str): One of MAP_MODES, see `resolve_map_mode`.
+        zoom_start (int): The initial zoom level.
+
+    Returns:
+        folium.Map: The map, centred on the places.
+    """
+    mode = resolve_map_mode(mode, len(places_df))
+    location_map = folium.Map(
+        location=[places_df["Latitude"].mean(), places_df["Longitude"].mean()],
+        zoom_start=zoom_start,
+    )
+
+    if mode == "heatmap":
+        HeatMap(
+            places_df[["Latitude", "Longitude"]].to_numpy().tolist(),
+            name="Density of Places",
+            radius=12,
+        ).add_to(location_map)
+    else:
+        for name, names, categories, lats, lons in _category_groups(places_df):
+            color = map_category_colors.get(name, map_category_colors[OTHER_PLACES])
+            if mode == "clusters":
+                FastMarkerCluster(
+                    [
+                        [lat, lon, f"{place} ({category})"]
+                        for place, category, lat, lon in zip(
+                            names.tolist(),
+                            categories.tolist(),
+                            lats.tolist(),
+                            lons.tolist(),
+                        )
+                    ],
+                    callback=_CLUSTER_CALLBACK.format(color=color),
+                    name=name,
+                ).add_to(location_map)
+            else:
+                folium.GeoJson(
+                    _feature_collection(names, categories, lats, lons),
+                    name=name,
+                    marker=folium.CircleMarker(
+                        radius=5, color=color, fill=True, fill_opacity=0.8
+                    ),
+                    tooltip=folium.GeoJsonTooltip(
+                        fields=["name", "category"], labels=False
+                    ),
+                ).add_to(location_map)
+    folium.LayerControl(collapsed=True).add_to(location_map)
+    return location_map
+
+
+def measure_map_render(places_df, mode="auto"):
+    """
+    Build a map and render it to HTML, measuring both.
+
+    Parameters:
+        places_df (pd.DataFrame): Places, see `build_place_map`.
+        mode (str): One of MAP_MODES.
+
+    Returns:
+        dict: points, mode (the resolved one), html_bytes and seconds.
+    """
+    start = time.perf_counter()
+    html = build_place_map(places_df, mode=mode).get_root().render()
+    return {
+        "points": len(places_df),
+        "mode": resolve_map_mode(mode, len(places_df)),
+        "html_bytes": len(html.encode("utf-8")),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def map_content_hash(places_df):
+    """
+    Hash the columns of places drawn on a map, so equal place sets get the
+    same key whatever frame object holds them.
+
+    Parameters:
+        places_df (pd.DataFrame): Places, see `build_place_map`.
+
+    Returns:
+        str: A hex digest of the places, in order.
+    """
+    row_hashes = pd.util.hash_pandas_object(places_df[MAP_COLUMNS], index=False)
+    return hashlib.blake2b(row_hashes.to_numpy().tobytes(), digest_size=16).hexdigest()
+
+
+class MapHTMLCache:
+    """
+    LRU cache of rendered map pages keyed by the content hash of the places,
+    the map mode and the zoom level.
+
+    Streamlit reruns the whole script on every widget change. With this
+    cache an unchanged set of places is neither rebuilt nor rendered again,
+    and the page sent to the browser is identical, so the map is not
+    redrawn. Pages are immutable strings and can be shared by all sessions.
+
+    Parameters:
+        max_entries (int): The number of pages kept before eviction.
+
+    Attributes:
+        hits (int): Pages answered from the cache.
+        misses (int): Pages that had to be built.
+        evictions (int): Pages dropped by the LRU policy.
+    """
+
+    def __init__(self, max_entries=map_cache_size):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def html(self, places_df, mode="auto", zoom_start=13):
+        """
+        Return the HTML page of the map of places, building it on a miss.
+
+        Parameters:
+            places_df (pd.DataFrame): Places, see `build_place_map`.
+            mode (str): One of MAP_MODES.
+            zoom_start (int): The initial zoom level.
+
+        Returns:
+            str: The full HTML page of the map.
+        """
+        key = (
+            map_content_hash(places_df),
+            resolve_map_mode(mode, len(places_df)),
+            zoom_start,
+        )
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return page
+            self.misses += 1
+
+        page = build_place_map(places_df, mode=key[1], zoom_start=zoom_start)
+        page = page.get_root().render()
+        with self._lock:
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+                self.evictions += 1
+        return page
+
+    def stats(self):
+        """
+        Return hit/miss/eviction counters and the size of the cached pages.
+
+        Returns:
+            dict: Cache statistics.
+        """
+        with self._lock:
+            pages = len(self._pages)
+            html_bytes = sum(len(page) for page in self._pages.values())
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "pages": pages,
+            "html_bytes": html_bytes,
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_map_cache():
+    """
+    Return the process-wide map page cache, creating it on first use.
+
+    Returns:
+        MapHTMLCache: The shared cache.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = MapHTMLCache()
+        return _default_cache
@@ -0,0 +1,196 @@
+import functools
+import re
+
+from config import opening_hours_cache_size
+
+MINUTES_PER_DAY = 24 * 60
+WEEKDAYS = ["mo", "tu", "we", "th", "fr", "sa", "su"]  # date.weekday() order
+FULL_DAY = (1 << MINUTES_PER_DAY) - 1
+ALWAYS_OPEN = (FULL_DAY,) * 7
+
+_RULE_SEPARATOR = re.compile(r";|\|\|")
+# ", " after a time starts an additional rule: "Mo 10:00-12:00, We 14:00-18:00"
+_ADDITIONAL_RULE = re.compile(r"(?<=\d),\s*(?=[a-z])")
+_TIMES_START = re.compile(r"\d{1,2}:\d{2}|\b(?:off|closed|open)\b")
+# A weekday, optionally with the nth-weekday-of-the-month suffix, e.g. "mo[1]"
+_WEEKDAY = r"(mo|tu|we|th|fr|sa|su)(?:\[[^\]]*\])?"
+_WEEKDAY_RANGE = re.compile(rf"^{_WEEKDAY}(?:-{_WEEKDAY})?$")
+_HOLIDAY = re.compile(r"^(?:ph|sh)(?:\s*[+-]\d+\s*days?)?$")
+_TIME_RANGE = re.compile(r"^(\d{1,2}):(\d{2})(?:-(\d{1,2}):(\d{2}))?(\+)?$")
+
+
+def parse_time(value):
+    """
+    Return the minutes since midnight of an "HH:MM" time.
+
+    Parameters:
+        value (str): The time, e.g. "09:30".
+
+    Returns:
+        int: Minutes since midnight.
+    """
+    hours, minutes = value.strip().split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _interval_bits(start, end):
+    return ((1 << (end - start)) - 1) << start
+
+
+def _parse_days(selector):
+    """Weekdays of a selector such as "mo-fr,su", None if unsupported."""
+    selector = selector.strip().rstrip(":").replace(" ", "")
+    if not selector:
+        return list(range(7))
+    days = []
+    for part in selector.split(","):
+        match = _WEEKDAY_RANGE.match(part)
+        if match is None:
+            if _HOLIDAY.match(part):
+                continue  # Holidays are not known, their rules are skipped
+            return None
+        first = WEEKDAYS.index(match.group(1))
+        last = WEEKDAYS.index(match.group(2) or match.group(1))
+        days.extend((first + i) % 7 for i in range((last - first) % 7 + 1))
+    return days
+
+
+def _parse_times(selector):
+    """
+    (day_bits, next_day_bits) of a time selector such as
+    "09:00-12:00,13:00-18:00". Times past midnight spill into the next day.
+    None if unsupported.
+    """
+    selector = selector.strip().replace(" ", "")
+    if selector in ("", "open"):
+        return FULL_DAY, 0
+    if selector in ("off", "closed"):
+        return 0, 0
+    day_bits, next_day_bits = 0, 0
+    for part in selector.split(","):
+        match = _TIME_RANGE.match(part)
+        if match is None:
+            return None
+        start = int(match.group(1)) * 60 + int(match.group(2))
+        if match.group(3) is None:
+            if not match.group(5):
+                return None
+            end = MINUTES_PER_DAY  # Open end, taken as midnight
+        else:
+            end = int(match.group(3)) * 60 + int(match.group(4))
+        if start >= MINUTES_PER_DAY or end > 2 * MINUTES_PER_DAY:
+            return None
+        if end <= start:
+            end += MINUTES_PER_DAY  # e.g. 22:00-02:00
+        day_bits |= _interval_bits(start, min(end, MINUTES_PER_DAY))
+        if end > MINUTES_PER_DAY:
+            next_day_bits |= _interval_bits(0, end - MINUTES_PER_DAY)
+    return day_bits, next_day_bits
+
+
+@functools.lru_cache(maxsize=opening_hours_cache_size)
+def parse_opening_hours(value):
+    """
+    Parse an OSM `opening_hours` tag into one bitmap per weekday, bit m of
+    a bitmap being set when the place is open in minute m of the day.
+
+    The weekday and time rules of the tag are supported ("Mo-Fr 09:00-18:00;
+    Sa 10:00-14:00; Su off", "24/7", "22:00-02:00", "10:00+"), later rules
+    replacing earlier ones for their weekdays. Tags with month, date or
+    sunrise rules are left unparsed. Parsing is memoised per distinct tag,
+    as the same few patterns repeat across thousands of places.
+
+    Parameters:
+        value (str): The tag value.
+
+    Returns:
+        tuple: Seven int bitmaps from Monday to Sunday, or None if the tag
+        is missing or unsupported, i.e. the opening hours are unknown.
+    """
+    if not value or not isinstance(value, str):
+        return None
+    value = value.strip().casefold()
+    if value == "24/7":
+        return ALWAYS_OPEN
+
+    week = [0] * 7
+    for rule in _RULE_SEPARATOR.split(value):
+        for n, part in enumerate(_ADDITIONAL_RULE.split(rule)):
+            part = part.strip()
+            if not part:
+                continue
+            match = _TIMES_START.search(part)
+            split = match.start() if match else len(part)
+            days = _parse_days(part[:split])
+            times = _parse_times(part[split:])
+            if days is None or times is None:
+                return None
+            if not days and part[:split].strip():
+                continue  # A holiday-only rule
+            day_bits, next_day_bits = times
+            for day in days:
+                if n == 0:
+                    week[day] = 0  # A rule replaces what was set for its days
+                week[day] |= day_bits
+            for day in days:
+                week[(day + 1) % 7] |= next_day_bits
+    return tuple(week)
+
+
+@functools.lru_cache(maxsize=opening_hours_cache_size)
+def open_windows(bits):
+    """
+    Return the open intervals of a day bitmap.
+
+    Parameters:
+        bits (int): A day bitmap of `parse_opening_hours`.
+
+    Returns:
+        tuple: (start, end) minutes of each interval, in order.
+    """
+    windows = []
+    while bits:
+        start = (bits & -bits).bit_length() - 1
+        run = bits >> start
+        length = (run ^ (run + 1)).bit_length() - 1
+        windows.append((start, start + length))
+        bits &= ~_interval_bits(start, start + length)
+    return tuple(windows)
+
+
+def earliest_visit(hours, weekday, earliest, duration, latest_end=MINUTES_PER_DAY):
+    """
+    Return the earliest start of a visit that fits in an open window.
+
+    Parameters:
+        hours (tuple): Bitmaps of `parse_opening_hours`, None if unknown,
+            which is treated as open.
+        weekday (int): Day of the week, 0 for Monday.
+        earliest (int): Minutes since midnight the visit can start at.
+        duration (int): Minutes of the visit.
+        latest_end (int): Minutes since midnight the visit must end by.
+
+    Returns:
+        int: Minutes since midnight of the start, or None if the visit does
+        not fit on that day.
+    """
+    if hours is None:
+        return earliest if earliest + duration <= latest_end else None
+    for start, end in open_windows(hours[weekday]):
+        start = max(start, earliest)
+        if start + duration <= min(end, latest_end):
+            return start
+    return None
+
+
+def format_time(minutes):
+    """
+    Format minutes since midnight as "HH:MM".
+
+    Parameters:
+        minutes (int): Minutes since midnight.
+
+    Returns:
+        str: The time.
+    """
+    return f"{int(minutes) // 60:02d}:{int(minutes) % 60:02d}"
@@ -0,0 +1,259 @@
+"""
+Build the local POI database from an OpenStreetMap extract.
+
+Reads a `.osm.pbf` extract (needs pyosmium) or a GeoJSON export of one, e.g.
+from `osmium export`, as a FeatureCollection (`.geojson`, `.json`) or one
+feature per line (`.geojsonseq`, `.geojsonl`). Keeps the named features with
+a `config.poi_types` tag whose value is a subcategory of
+`tourist_categories_dict`, like the Overpass query does, categorised by
+`poi_columns.poi_category` like places from Overpass, and writes them to
+the database the POI search reads when `POI_SOURCE=local`, or with
+`--format snapshot` to the memory-mapped snapshot read when
+`POI_SOURCE=snapshot`.
+
+Ways and multipolygon relations are placed at the centre of their bounding
+box, like the `out center` of Overpass.
+
+Usage:
+    python osm_ingest.py ile-de-france-latest.osm.pbf
+    POI_SOURCE=local streamlit run main.py
+
+    python osm_ingest.py europe-latest.osm.pbf --format snapshot
+    POI_SOURCE=snapshot uvicorn service:app --workers 4
+"""
+
+import argparse
+import itertools
+import json
+import sys
+import time
+
+from config import poi_database_path, poi_snapshot_path, poi_types
+from overpass_query import CSV_COLUMNS, PRICE_TAGS, SCHEDULE_TAGS
+from poi_columns import parse_poi_stream, poi_category
+from poi_database import write_poi_database
+from poi_snapshot import write_poi_snapshot
+
+GEOJSON_SUFFIXES = (".geojson", ".json")
+GEOJSON_SEQ_SUFFIXES = (".geojsonseq", ".geojsonl", ".geojsons")
+PBF_SUFFIXES = (".osm.pbf", ".pbf")
+
+
+def _clean(value):
+    # Tabs and line breaks would split the CSV line of the parser
+    return " ".join(str(value).split()) if value is not None else ""
+
+
+def poi_line(osm_type, osm_id, lat, lon, tags):
+    """
+    Turn an OSM element into a line of the Overpass CSV format read by
+    `parse_poi_stream`, keeping only the tags the app uses.
+
+    Parameters:
+        osm_type (str): "node", "way" or "relation".
+        osm_id (int): The OSM id.
+        lat (float): Latitude of the element (centre) in degrees.
+        lon (float): Longitude of the element (centre) in degrees.
+        tags (Mapping): The OSM tags.
+
+    Returns:
+        str: The line, or None if the element is not a named point of
+        interest in one of the subcategories.
+    """
+    if not tags.get("name"):
+        return None
+    # The parser picks the category by the same rule as for Overpass
+    categories = [tags.get(key) for key in poi_types]
+    if poi_category(categories) is None:
+        return None
+    fields = (
+        [osm_type, osm_id, lat, lon, tags.get("name")]
+        + categories
+        + [tags.get(tag) for tag in PRICE_TAGS + SCHEDULE_TAGS]
+    )
+    return "\t".join(_clean(field) for field in fields)
+
+
+def _bbox_centre(points):
+    lats = [lat for lat, _ in points]
+    lons = [lon for _, lon in points]
+    if not lats:
+        return None
+    return (min(lats) + max(lats)) / 2, (min(lons) + max(lons)) / 2
+
+
+def _geojson_points(coordinates):
+    # Nested coordinate arrays of any geometry, down to [lon, lat] pairs
+    if coordinates and isinstance(coordinates[0], (int, float)):
+        yield coordinates[1], coordinates[0]
+        return
+    for part in coordinates or []:
+        yield from _geojson_points(part)
+
+
+def _geojson_line(feature):
+    geometry = feature.get("geometry") or {}
+    if geometry.get("type") == "GeometryCollection":
+        points = [
+            point
+            for part in geometry.get("geometries", [])
+            for point in _geojson_points(part.get("coordinates"))
+        ]
+    else:
+        points = list(_geojson_points(geometry.get("coordinates")))
+    centre = _bbox_centre(points)
+    if centre is None:
+        return None
+    properties = feature.get("properties") or {}
+    # Overpass exports nest the tags, osmium exports them flat
+    tags = properties.get("tags", properties)
+    osm_id = str(properties.get("@id", feature.get("id", "")))  # e.g. "node/123"
+    osm_type, _, osm_id = osm_id.rpartition("/")
+    return poi_line(osm_type, osm_id, *centre, tags)
+
+
+def read_geojson(path):
+    """
+    Yield the POI lines of a GeoJSON FeatureCollection or GeoJSON sequence.
+
+    Parameters:
+        path (str): The GeoJSON file.
+
+    Yields:
+        str: Lines of the Overpass CSV format, see `poi_line`.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(GEOJSON_SEQ_SUFFIXES):
+            # One feature per line, optionally prefixed by a record separator
+            features = (json.loads(line.strip("\x1e \r\n")) for line in f)
+            features = (feature for feature in features if feature)
+        else:
+            features = json.load(f).get("features", [])
+        for feature in features:
+            line = _geojson_line(feature)
+            if line is not None:
+                yield line
+
+
+def read_pbf(path):
+    """
+    Return the POI lines of an `.osm.pbf` extract.
+
+    Nodes are read as they are, ways and multipolygon relations with the
+    locations of their nodes.
+
+    Parameters:
+        path (str): The extract.
+
+    Returns:
+        list: Lines of the Overpass CSV format, see `poi_line`.
+
+    Raises:
+        ImportError: If pyosmium is not installed.
+    """
+    try:
+        import osmium
+    except ImportError as e:
+        raise ImportError(
+            "Reading .osm.pbf extracts needs pyosmium: pip install osmium"
+        ) from e
+
+    lines = []
+
+    def keep(osm_type, osm_id, points, tags):
+        centre = _bbox_centre(points)
+        if centre is not None:
+            line = poi_line(osm_type, osm_id, *centre, tags)
+            if line is not None:
+                lines.append(line)
+
+    class POIHandler(osmium.SimpleHandler):
+        def node(self, node):
+            if node.tags.get("name") and node.location.valid():
+                keep(
+                    "node", node.id, [(node.location.lat, node.location.lon)], node.tags
+                )
+
+        def way(self, way):
+            if way.tags.get("name"):
+                points = [
+                    (node.location.lat, node.location.lon)
+                    for node in way.nodes
+                    if node.location.valid()
+                ]
+                keep("way", way.id, points, way.tags)
+
+        def area(self, area):
+            # Areas of closed ways are already read as ways
+            if area.tags.get("name") and not area.from_way():
+                points = [
+                    (node.lat, node.lon)
+                    for ring in area.outer_rings()
+                    for node in ring
+                    if node.location.valid()
+                ]
+                keep("relation", area.orig_id(), points, area.tags)
+
+    POIHandler().apply_file(path, locations=True)
+    return lines
+
+
+def read_extract(path):
+    """
+    Read the points of interest of an OSM extract.
+
+    Parameters:
+        path (str): A `.osm.pbf`, GeoJSON or GeoJSON sequence file.
+
+    Returns:
+        PlaceColumns: The places.
+
+    Raises:
+        ValueError: If the file type is not supported.
+    """
+    if path.endswith(PBF_SUFFIXES):
+        lines = read_pbf(path)
+    elif path.endswith(GEOJSON_SUFFIXES + GEOJSON_SEQ_SUFFIXES):
+        lines = read_geojson(path)
+    else:
+        raise ValueError(
+            f"Unsupported extract {path}, expected .osm.pbf, .geojson or .geojsonseq"
+        )
+    header = "\t".join(CSV_COLUMNS)
+    return parse_poi_stream(itertools.chain([header], lines))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build the local POI database or snapshot from an OSM extract."
+    )
+    parser.add_argument("extract", help="OSM extract, .osm.pbf or GeoJSON")
+    parser.add_argument(
+        "--format",
+        choices=["database", "snapshot"],
+        default="database",
+        help="SQLite database (POI_SOURCE=local) or snapshot (POI_SOURCE=snapshot)",
+    )
+    parser.add_argument(
+        "-o", "--output", default=None, help="The POI database file or snapshot"
+    )
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    places = read_extract(args.extract)
+    if args.format == "snapshot":
+        args.output = args.output or poi_snapshot_path
+        write_poi_snapshot(args.output, places)
+    else:
+        args.output = args.output or poi_database_path
+        write_poi_database(args.output, places)
+    print(
+        f"Wrote {len(places)} places to {args.output} in "
+        f"{time.perf_counter() - start:.1f} s",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+from config import poi_types, tourist_categories_dict
+
+# Columns requested from Overpass: type/id/center plus only the tags we use
+POI_TAGS = ["name"] + poi_types
+PRICE_TAGS = ["stars", "fee"]  # Used by the cost engine
+SCHEDULE_TAGS = ["opening_hours"]  # Used by the day scheduler
+CSV_COLUMNS = (
+    ["::type", "::id", "::lat", "::lon"] + POI_TAGS + PRICE_TAGS + SCHEDULE_TAGS
+)
+
+
+def all_subcategories():
+    """
+    Return every subcategory offered in the sidebar, in config order.
+
+    Returns:
+        list: Subcategories of all main categories in `tourist_categories_dict`.
+    """
+    return [
+        subcategory
+        for subcategories in tourist_categories_dict.values()
+        for subcategory in subcategories
+    ]
+
+
+def around_filter(radius, lat, lon):
+    """
+    Return an Overpass `around` filter.
+
+    Parameters:
+        radius (float): Radius in meters.
+        lat (float): Latitude of the centre in degrees.
+        lon (float): Longitude of the centre in degrees.
+
+    Returns:
+        str: The filter, e.g. "(around:1000,48.85,2.35)".
+    """
+    return f"(around:{radius},{lat},{lon})"
+
+
+def bbox_filter(south, west, north, east):
+    """
+    Return an Overpass bounding box filter.
+
+    Parameters:
+        south (float): Southern latitude in degrees.
+        west (float): Western longitude in degrees.
+        north (float): Northern latitude in degrees.
+        east (float): Eastern longitude in degrees.
+
+    Returns:
+        str: The filter, e.g. "(48.8,2.3,48.85,2.35)".
+    """
+    return f"({south},{west},{north},{east})"
+
+
+def build_poi_query(areas, subcategories=None, timeout=25):
+    """
+    Build a compact Overpass query for points of interest.
+
+    One `nwr` statement per area replaces the node/way/relation clause per
+    POI type: a regex key filter matches any of `config.poi_types`, the value
+    filter keeps only the selected subcategories, and unnamed features are
+    skipped server-side since they are never shown. The CSV output carries
+    only the name, the category keys, the price tags and the (center)
+    coordinates.
+
+    Parameters:
+        areas (list): Area filters from `around_filter` or `bbox_filter`.
+        subcategories (list): Subcategories to keep, defaults to all of
+            `tourist_categories_dict`.
+        timeout (int): Server-side timeout in seconds.
+
+    Returns:
+        str: The Overpass QL query.
+    """
+    if subcategories is None:
+        subcategories = all_subcategories()
+    keys = "|".join(poi_types)
+    values = "|".join(sorted(set(subcategories)))
+    columns = ",".join(CSV_COLUMNS)
+
+    query = f'[out:csv({columns};true;"\\t")][timeout:{timeout}];('
+    for area in areas:
+        query += f'nwr[~"^({keys})$"~"^({values})$"]["name"]{area};'
+    query += ");out center qt;"
+    return query
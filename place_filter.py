@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from config import places_per_category
+
+
+class PlaceFilter:
+    """
+    Subcategory filter over the places of one fetch, which are never
+    modified: the filter is a boolean mask over them.
+
+    The categories are factorized once when the filter is built, so a new
+    selection is a lookup of the selected category codes and one pass over
+    the rows, without copying the places or calling any API. Widening the
+    selection again brings back every place that was filtered out.
+
+    Parameters:
+        places_df (pd.DataFrame): The places of a fetch, with a "Category"
+            column. It is shared, not copied, and must not be modified.
+        per_category (int): Places of each subcategory kept, in fetch order,
+            or None to keep them all.
+
+    Attributes:
+        places_df (pd.DataFrame): The places of the fetch.
+    """
+
+    def __init__(self, places_df, per_category=places_per_category):
+        self.places_df = places_df
+        self._codes, self._categories = pd.factorize(
+            places_df["Category"].to_numpy(dtype=object)
+        )
+        # factorize gives -1 for missing categories, which are never kept
+        self._kept = self._codes >= 0
+        if per_category is not None:
+            rank = pd.Series(self._codes).groupby(self._codes).cumcount()
+            self._kept &= rank.to_numpy() < per_category
+        self._last = None
+
+    def __len__(self):
+        return int(self._kept.sum())
+
+    def mask(self, categories):
+        """
+        Boolean mask of the kept places in the selected subcategories.
+
+        Parameters:
+            categories (list): The selected subcategories.
+
+        Returns:
+            np.ndarray: The mask, aligned with the rows of `places_df`.
+        """
+        selected = np.isin(self._categories, list(categories))
+        return selected[self._codes] & self._kept
+
+    def select(self, categories):
+        """
+        The kept places in the selected subcategories, as a new frame with
+        a fresh index. The last selection is memoised, so reruns with an
+        unchanged filter return the same frame.
+
+        Parameters:
+            categories (list): The selected subcategories.
+
+        Returns:
+            pd.DataFrame: The selected places, in fetch order.
+        """
+        key = frozenset(categories)
+        if self._last is not None and self._last[0] == key:
+            return self._last[1]
+        selected = self.places_df[self.mask(key)].reset_index(drop=True)
+        self._last = (key, selected)
+        return selected
@@ -0,0 +1,534 @@
+import hashlib
+import math
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from cache_backend import make_cache_backend
+from config import (
+    overpass_url,
+    poi_cache_max_bytes,
+    poi_cache_max_tiles,
+    poi_cache_path,
+    poi_cache_ttl,
+    poi_source,
+    poi_tile_size,
+)
+from geo import EARTH_RADIUS_KM, distances_from, haversine_km
+from http_session import get_http_session
+from overpass_query import all_subcategories, bbox_filter, build_poi_query
+from poi_columns import PlaceColumns, parse_poi_stream
+from poi_database import get_poi_database
+from poi_snapshot import get_poi_snapshot
+
+OVERPASS_URL = overpass_url
+
+
+def tile_of(lat, lon, tile_size=poi_tile_size):
+    """
+    Return the key of the grid tile containing a point.
+
+    Parameters:
+        lat (float): Latitude in degrees.
+        lon (float): Longitude in degrees.
+        tile_size (float): Tile edge in degrees.
+
+    Returns:
+        tuple: (row, col) indices of the tile.
+    """
+    return math.floor(lat / tile_size), math.floor(lon / tile_size)
+
+
+def tile_bounds(tile, tile_size=poi_tile_size):
+    """
+    Return the bounding box of a tile.
+
+    Parameters:
+        tile (tuple): (row, col) indices of the tile.
+        tile_size (float): Tile edge in degrees.
+
+    Returns:
+        tuple: (south, west, north, east) in degrees.
+    """
+    row, col = tile
+    return (
+        round(row * tile_size, 7),
+        round(col * tile_size, 7),
+        round((row + 1) * tile_size, 7),
+        round((col + 1) * tile_size, 7),
+    )
+
+
+def tiles_for_radius(lat, lon, radius, tile_size=poi_tile_size):
+    """
+    Return the tiles that intersect a circle around a point.
+
+    Parameters:
+        lat (float): Latitude of the centre in degrees.
+        lon (float): Longitude of the centre in degrees.
+        radius (float): Radius in meters.
+        tile_size (float): Tile edge in degrees.
+
+    Returns:
+        list: (row, col) keys of the intersecting tiles, row by row.
+    """
+    radius_km = radius / 1000
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+    min_row, min_col = tile_of(lat - dlat, lon - dlon, tile_size)
+    max_row, max_col = tile_of(lat + dlat, lon + dlon, tile_size)
+
+    tiles = []
+    for row in range(min_row, max_row + 1):
+        for col in range(min_col, max_col + 1):
+            south, west, north, east = tile_bounds((row, col), tile_size)
+            # Closest point of the tile to the centre decides the intersection
+            nearest_lat = min(max(lat, south), north)
+            nearest_lon = min(max(lon, west), east)
+            if haversine_km(lat, lon, nearest_lat, nearest_lon) <= radius_km:
+                tiles.append((row, col))
+    return tiles
+
+
+def _tile_runs(tiles):
+    """
+    Merge tiles that are adjacent in the same row into rectangles, so the
+    missing tiles can be fetched with a handful of bounding boxes.
+    """
+    runs = []
+    for row, col in sorted(tiles):
+        if runs and runs[-1][0] == row and runs[-1][2] == col - 1:
+            runs[-1][2] = col
+        else:
+            runs.append([row, col, col])
+    return runs
+
+
+class POITileCache:
+    """
+    Process-wide store of Overpass points of interest, shared by all
+    sessions.
+
+    Places are cached per (filter, grid tile). A radius search is answered
+    by joining the cached tiles it covers and fetching only the missing
+    ones, so overlapping searches (a bigger radius, a nearby landmark) reuse
+    what was already downloaded. Tiles being fetched are claimed, so
+    concurrent searches of the same area wait for one Overpass request
+    instead of sending their own.
+
+    The frame of each search is memoised too, and `fetch_places` hands out
+    copies of it, so no session can change the frame of another one.
+
+    Tiles and frames are evicted least recently used first, frames before
+    tiles since they are rebuilt from tiles without any request, when there
+    are more than `max_tiles` tiles or they take more than `max_bytes`.
+
+    Fetched tiles are also written to a backend shared by the other worker
+    processes, which is read for tiles missing in memory.
+
+    Parameters:
+        tile_size (float): Tile edge in degrees.
+        max_tiles (int): The number of tiles kept before eviction.
+        max_bytes (int): The memory kept for tiles and frames before
+            eviction.
+        backend (CacheBackend): The shared store, defaults to the one of
+            `config.cache_backend` ("memory" keeps tiles in memory only).
+        ttl (int): Seconds a tile stays valid in the backend.
+
+    Attributes:
+        hits (int): Tiles answered from memory or the backend.
+        backend_hits (int): Tiles answered from the backend.
+        misses (int): Tiles that had to be fetched.
+        evictions (int): Tiles and frames dropped by the LRU policy.
+        frame_hits (int): Searches answered with a memoised frame.
+        frame_misses (int): Searches whose frame had to be built.
+        coalesced (int): Tiles that waited for another search's request.
+    """
+
+    def __init__(
+        self,
+        tile_size=poi_tile_size,
+        max_tiles=poi_cache_max_tiles,
+        max_bytes=poi_cache_max_bytes,
+        backend=None,
+        ttl=poi_cache_ttl,
+    ):
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        self.max_bytes = max_bytes
+        self.backend = (
+            backend
+            if backend is not None
+            else make_cache_backend(poi_cache_path, "poi_tiles")
+        )
+        self.ttl = ttl
+        self.hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.frame_hits = 0
+        self.frame_misses = 0
+        self.coalesced = 0
+        self._tiles = OrderedDict()  # key -> (PlaceColumns, bytes)
+        self._frames = OrderedDict()  # search key -> (DataFrame, bytes)
+        self._fetching = {}  # key -> threading.Event set once stored
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, tiles):
+        """
+        Split tiles into cached places and missing tiles.
+
+        Parameters:
+            tiles (list): (filter key, (row, col)) tile keys.
+
+        Returns:
+            tuple: (places, missing) where `places` holds the PlaceColumns of
+            the cached tiles and `missing` the keys still to be fetched.
+        """
+        places, missing = [], []
+        with self._lock:
+            for tile in tiles:
+                entry = self._tiles.get(tile)
+                if entry is None:
+                    missing.append(tile)
+                else:
+                    self._tiles.move_to_end(tile)
+                    places.append(entry[0])
+            self.hits += len(places)
+
+        if missing and self.backend is not None:
+            keys = {self._backend_key(tile): tile for tile in missing}
+            found = {
+                keys[key]: pickle.loads(value)
+                for key, value in self.backend.get_many(list(keys)).items()
+            }
+            if found:
+                self._remember(found)
+                places.extend(found.values())
+                missing = [tile for tile in missing if tile not in found]
+                with self._lock:
+                    self.hits += len(found)
+                    self.backend_hits += len(found)
+        with self._lock:
+            self.misses += len(missing)
+        return places, missing
+
+    def _backend_key(self, tile):
+        key, (row, col) = tile
+        digest = hashlib.blake2b("\x1f".join(key).encode("utf-8"), digest_size=8)
+        return f"{digest.hexdigest()}:{self.tile_size}:{row}:{col}"
+
+    def claim(self, tiles):
+        """
+        Claim missing tiles for fetching. Tiles another search is already
+        fetching are not claimed again.
+
+        Parameters:
+            tiles (list): (filter key, (row, col)) tile keys.
+
+        Returns:
+            tuple: (claimed, pending) where `claimed` are the tiles to fetch
+            and release, and `pending` maps the other tiles to the event set
+            once they are stored.
+        """
+        claimed, pending = [], {}
+        with self._lock:
+            for tile in tiles:
+                if tile in self._fetching:
+                    pending[tile] = self._fetching[tile]
+                else:
+                    self._fetching[tile] = threading.Event()
+                    claimed.append(tile)
+            self.coalesced += len(pending)
+        return claimed, pending
+
+    def release(self, tiles):
+        """
+        Release claimed tiles, whether or not they could be fetched, and
+        wake the searches waiting for them.
+
+        Parameters:
+            tiles (list): Tile keys returned as claimed by `claim`.
+        """
+        with self._lock:
+            events = [self._fetching.pop(tile, None) for tile in tiles]
+        for event in events:
+            if event is not None:
+                event.set()
+
+    def store(self, tiles):
+        """
+        Store the places of fetched tiles in memory and in the backend,
+        evicting the least recently used entries beyond the limits.
+
+        Parameters:
+            tiles (dict): (filter key, (row, col)) tile key -> PlaceColumns
+                of the places in the tile.
+        """
+        self._remember(tiles)
+        if self.backend is not None:
+            self.backend.set_many(
+                {
+                    self._backend_key(tile): pickle.dumps(places, protocol=5)
+                    for tile, places in tiles.items()
+                },
+                self.ttl,
+            )
+
+    def _remember(self, tiles):
+        sizes = {tile: places.nbytes for tile, places in tiles.items()}
+        with self._lock:
+            for tile, places in tiles.items():
+                previous = self._tiles.pop(tile, None)
+                if previous is not None:
+                    self._bytes -= previous[1]
+                self._tiles[tile] = (places, sizes[tile])
+                self._bytes += sizes[tile]
+            self._evict()
+
+    def lookup_frame(self, key):
+        """
+        Return the memoised frame of a search.
+
+        Parameters:
+            key (tuple): The search key, see `fetch_places`.
+
+        Returns:
+            pd.DataFrame: The memoised frame, which must not be modified,
+            or None if not cached.
+        """
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is None:
+                self.frame_misses += 1
+                return None
+            self._frames.move_to_end(key)
+            self.frame_hits += 1
+            return entry[0]
+
+    def store_frame(self, key, places_df):
+        """
+        Memoise the frame of a search.
+
+        Parameters:
+            key (tuple): The search key, see `fetch_places`.
+            places_df (pd.DataFrame): The frame, shared from now on.
+        """
+        # Strings are shared with the tiles, only the columns themselves
+        # (pointers and numbers) are extra memory
+        nbytes = int(places_df.memory_usage(index=True, deep=False).sum())
+        with self._lock:
+            previous = self._frames.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._frames[key] = (places_df, nbytes)
+            self._bytes += nbytes
+            self._evict()
+
+    def _evict(self):
+        # Called with the lock held
+        while self._frames and self._bytes > self.max_bytes:
+            self._bytes -= self._frames.popitem(last=False)[1][1]
+            self.evictions += 1
+        while self._tiles and (
+            len(self._tiles) > self.max_tiles or self._bytes > self.max_bytes
+        ):
+            self._bytes -= self._tiles.popitem(last=False)[1][1]
+            self.evictions += 1
+
+    def stats(self):
+        """
+        Return hit/miss/eviction counters and the memory of the store.
+
+        Returns:
+            dict: Cache statistics.
+        """
+        with self._lock:
+            tiles = len(self._tiles)
+            places = sum(len(entry[0]) for entry in self._tiles.values())
+            frames = len(self._frames)
+            nbytes = self._bytes
+        lookups = self.hits + self.misses
+        frame_lookups = self.frame_hits + self.frame_misses
+        return {
+            "hits": self.hits,
+            "backend_hits": self.backend_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "frame_hits": self.frame_hits,
+            "frame_misses": self.frame_misses,
+            "frame_hit_rate": self.frame_hits / frame_lookups if frame_lookups else 0.0,
+            "coalesced": self.coalesced,
+            "tiles": tiles,
+            "places": places,
+            "frames": frames,
+            "bytes": nbytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_poi_cache():
+    """
+    Return the process-wide POI tile cache, creating it on first use.
+
+    Returns:
+        POITileCache: The shared cache.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = POITileCache()
+        return _default_cache
+
+
+def filter_key(subcategories=None):
+    """
+    Return the cache key of a subcategory filter, so tiles fetched with
+    different filters are cached separately.
+
+    Parameters:
+        subcategories (list): Subcategories to keep, defaults to all.
+
+    Returns:
+        tuple: The sorted, de-duplicated subcategories.
+    """
+    if subcategories is None:
+        subcategories = all_subcategories()
+    return tuple(sorted(set(subcategories)))
+
+
+def fetch_tiles(tiles, subcategories=None, tile_size=poi_tile_size, timeout=30):
+    """
+    Fetch the points of interest of several tiles with one Overpass request.
+
+    The response is streamed and parsed line by line into column buffers,
+    then split into tiles with vectorized tile indices.
+
+    Parameters:
+        tiles (list): (row, col) tile keys.
+        subcategories (list): Subcategories to keep, defaults to all.
+        tile_size (float): Tile edge in degrees.
+        timeout (float): Timeout in seconds for the Overpass request.
+
+    Returns:
+        dict: Tile key -> PlaceColumns of the places in the tile.
+
+    Raises:
+        requests.exceptions.RequestException: If the request fails or
+            Overpass answers with an HTTP error.
+    """
+    areas = []
+    for row, first_col, last_col in _tile_runs(tiles):
+        south, west, _, _ = tile_bounds((row, first_col), tile_size)
+        _, _, north, east = tile_bounds((row, last_col), tile_size)
+        areas.append(bbox_filter(south, west, north, east))
+    query = build_poi_query(areas, subcategories, timeout=int(timeout))
+
+    with get_http_session().get(
+        OVERPASS_URL, params={"data": query}, timeout=timeout, stream=True
+    ) as response:
+        response.raise_for_status()
+        places = parse_poi_stream(response.iter_lines(chunk_size=64 * 1024))
+
+    # Every place belongs to the tile containing its (center) coordinates
+    rows = np.floor(places.lats / tile_size).astype(np.int64)
+    cols = np.floor(places.lons / tile_size).astype(np.int64)
+    return {tile: places.take((rows == tile[0]) & (cols == tile[1])) for tile in tiles}
+
+
+def fetch_places(lat, lon, radius, subcategories=None, cache=None, timeout=30):
+    """
+    Fetch the points of interest within `radius` meters of a point, reusing
+    cached tiles and fetching only the missing ones from Overpass. Repeated
+    searches get a copy of the memoised frame: its columns are copied, the
+    strings in them are shared, so the caller may modify it.
+
+    With `config.poi_source` set to "local" or "snapshot", the places are
+    read from the local POI database or the memory-mapped POI snapshot
+    instead, without the tile cache or any request.
+
+    Parameters:
+        lat (float): Latitude of the centre in degrees.
+        lon (float): Longitude of the centre in degrees.
+        radius (float): Search radius in meters.
+        subcategories (list): Subcategories to keep, defaults to all.
+        cache (POITileCache): The cache to use, defaults to the shared one.
+        timeout (float): Timeout in seconds for the Overpass request.
+
+    Returns:
+        pd.DataFrame: Places with Name, Category, Latitude, Longitude,
+        Main Category, Stars, Fee and Opening Hours.
+
+    Raises:
+        requests.exceptions.RequestException: If the request fails or
+            Overpass answers with an HTTP error.
+    """
+    if poi_source == "local":
+        places = get_poi_database().places_within(lat, lon, radius, subcategories)
+        return places.to_frame()
+    if poi_source == "snapshot":
+        places = get_poi_snapshot().places_within(lat, lon, radius, subcategories)
+        return places.to_frame()
+
+    cache = cache if cache is not None else get_poi_cache()
+    key = filter_key(subcategories)
+    tiles = tiles_for_radius(lat, lon, radius, cache.tile_size)
+    search = (key, round(lat, 6), round(lon, 6), radius)
+    places_df = cache.lookup_frame(search)
+    if places_df is not None:
+        return places_df.copy()
+    # The same search running in another session is waited for
+    claimed_search, pending_search = cache.claim([search])
+    for event in pending_search.values():
+        event.wait(timeout)
+        places_df = cache.lookup_frame(search)
+        if places_df is not None:
+            return places_df.copy()
+    try:
+        places_df = _search_tiles(cache, key, tiles, lat, lon, radius, timeout)
+        cache.store_frame(search, places_df)
+    finally:
+        cache.release(claimed_search)
+    return places_df.copy()
+
+
+def _search_tiles(cache, key, tiles, lat, lon, radius, timeout):
+    """The frame of a search, from cached tiles and the missing ones."""
+    places, missing = cache.lookup([(key, tile) for tile in tiles])
+    if missing:
+        claimed, pending = cache.claim(missing)
+        try:
+            if claimed:
+                places.extend(_fetch_and_store(cache, claimed, timeout))
+        finally:
+            cache.release(claimed)
+
+        # Tiles fetched by another search, refetched if that request failed
+        for event in pending.values():
+            event.wait(timeout)
+        pending_places, failed = cache.lookup(list(pending))
+        places.extend(pending_places)
+        if failed:
+            places.extend(_fetch_and_store(cache, failed, timeout))
+
+    places = PlaceColumns.concat(places)
+    distance_km = distances_from(lat, lon, places.lats, places.lons)
+    return places.take(distance_km <= radius / 1000).to_frame()
+
+
+def _fetch_and_store(cache, tiles, timeout):
+    """Fetch (filter key, tile) keys of one filter and store them."""
+    key = tiles[0][0]
+    fetched = fetch_tiles(
+        [tile for _, tile in tiles], key, cache.tile_size, timeout=timeout
+    )
+    cache.store({(key, tile): tile_places for tile, tile_places in fetched.items()})
+    return list(fetched.values())
@@ -0,0 +1,287 @@
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+from categories import classify_categories
+from config import poi_types
+from overpass_query import CSV_COLUMNS, all_subcategories
+
+PLACE_COLUMNS = [
+    "Name",
+    "Category",
+    "Latitude",
+    "Longitude",
+    "Main Category",
+    "Stars",
+    "Fee",
+    "Opening Hours",
+]
+FREE_FEE_VALUES = {"no", "0", "free", "donation"}
+
+_subcategories = frozenset(all_subcategories())
+
+
+def poi_category(values):
+    """
+    The category of a place: the first value of its `config.poi_types` tags
+    that is a subcategory of `tourist_categories_dict`, the values the
+    Overpass query matches places by. Places from Overpass and from an OSM
+    extract get their category by this one rule.
+
+    Parameters:
+        values (iterable): The tag values in `config.poi_types` order, empty
+            or None where a tag is unset.
+
+    Returns:
+        str: The category, or None if no value is a subcategory.
+
+    A place tagged tourism=information and amenity=cafe is a cafe, one
+    tagged amenity=parking and tourism=museum a museum:
+
+    >>> poi_category(["information", "cafe", "", "", "", "", ""])
+    'cafe'
+    >>> poi_category(["museum", "parking", "", "", "", "", ""])
+    'museum'
+    >>> poi_category(["", "parking", "", "", "", "", ""]) is None
+    True
+    """
+    for value in values:
+        if value in _subcategories:
+            return value
+    return None
+
+
+class PlaceColumns:
+    """
+    Points of interest stored as column arrays instead of a list of records.
+
+    Parameters:
+        names (np.ndarray): Object array of place names.
+        categories (np.ndarray): Object array of categories, with one shared
+            string object per distinct category.
+        lats (np.ndarray): Float64 array of latitudes.
+        lons (np.ndarray): Float64 array of longitudes.
+        stars (np.ndarray): Float64 array of the OSM `stars` tag, NaN where
+            unset. Defaults to all NaN.
+        fees (np.ndarray): Float64 array of the OSM `fee` tag: 1 for an
+            entrance fee, 0 for free entry, NaN where unset. Defaults to all
+            NaN.
+        opening_hours (np.ndarray): Object array of the OSM `opening_hours`
+            tag, with one shared string object per distinct value, None
+            where unset. Defaults to all None.
+    """
+
+    def __init__(
+        self, names, categories, lats, lons, stars=None, fees=None, opening_hours=None
+    ):
+        self.names = names
+        self.categories = categories
+        self.lats = lats
+        self.lons = lons
+        self.stars = stars if stars is not None else np.full(len(lats), np.nan)
+        self.fees = fees if fees is not None else np.full(len(lats), np.nan)
+        self.opening_hours = (
+            opening_hours
+            if opening_hours is not None
+            else np.full(len(lats), None, dtype=object)
+        )
+
+    def __len__(self):
+        return len(self.lats)
+
+    @property
+    def nbytes(self):
+        """The memory of the columns, counting each shared string once."""
+        strings = {
+            id(value): value
+            for column in (self.names, self.categories, self.opening_hours)
+            for value in column.tolist()
+            if value is not None
+        }
+        return sum(
+            column.nbytes
+            for column in (
+                self.names,
+                self.categories,
+                self.lats,
+                self.lons,
+                self.stars,
+                self.fees,
+                self.opening_hours,
+            )
+        ) + sum(sys.getsizeof(value) for value in strings.values())
+
+    @classmethod
+    def empty(cls):
+        return cls(
+            np.empty(0, dtype=object),
+            np.empty(0, dtype=object),
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=np.float64),
+        )
+
+    @classmethod
+    def concat(cls, parts):
+        """
+        Join several column sets into one.
+
+        Parameters:
+            parts (list): PlaceColumns to join, in order.
+
+        Returns:
+            PlaceColumns: The joined columns.
+        """
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+        return cls(
+            np.concatenate([part.names for part in parts]),
+            np.concatenate([part.categories for part in parts]),
+            np.concatenate([part.lats for part in parts]),
+            np.concatenate([part.lons for part in parts]),
+            np.concatenate([part.stars for part in parts]),
+            np.concatenate([part.fees for part in parts]),
+            np.concatenate([part.opening_hours for part in parts]),
+        )
+
+    def take(self, index):
+        """
+        Select rows by boolean mask or integer index array.
+
+        Parameters:
+            index (np.ndarray): Boolean mask or integer positions.
+
+        Returns:
+            PlaceColumns: The selected rows.
+        """
+        return PlaceColumns(
+            self.names[index],
+            self.categories[index],
+            self.lats[index],
+            self.lons[index],
+            self.stars[index],
+            self.fees[index],
+            self.opening_hours[index],
+        )
+
+    def to_frame(self):
+        """
+        Build the places DataFrame used by the app. Categories are classified
+        into their main category once here, at ingest.
+
+        Returns:
+            pd.DataFrame: Places with Name, Category, Latitude, Longitude,
+            Main Category, Stars, Fee and Opening Hours.
+        """
+        return pd.DataFrame(
+            {
+                "Name": self.names,
+                "Category": self.categories,
+                "Latitude": self.lats,
+                "Longitude": self.lons,
+                "Main Category": classify_categories(self.categories),
+                "Stars": self.stars,
+                "Fee": self.fees,
+                "Opening Hours": self.opening_hours,
+            },
+            columns=PLACE_COLUMNS,
+        )
+
+
+def _grow(buffer, capacity):
+    grown = np.empty(capacity, dtype=buffer.dtype)
+    grown[: len(buffer)] = buffer
+    return grown
+
+
+def _parse_stars(value):
+    # e.g. "4", "3.5" or "4S" (superior)
+    match = re.match(r"\s*(\d+(?:\.\d+)?)", value)
+    return float(match.group(1)) if match else np.nan
+
+
+def _parse_fee(value):
+    # "no" is free entry, "yes" or an amount such as "10 EUR" a paid one
+    return 0.0 if value.strip().casefold() in FREE_FEE_VALUES else 1.0
+
+
+def parse_poi_stream(lines, capacity=4096):
+    """
+    Parse the CSV response of a `build_poi_query` query line by line,
+    writing each place straight into preallocated column buffers.
+
+    Only one line of the body is held as text at a time, so peak memory is
+    the column buffers rather than the whole response plus parsed records.
+    Buffers double when full and are trimmed to size at the end. The category
+    is given by `poi_category`, rows without a name, category or coordinates
+    are dropped. The `stars` and `fee` tags are
+    parsed into numbers for the cost engine, the `opening_hours` tag is kept
+    as is for the day scheduler.
+
+    Parameters:
+        lines (iterable): Lines of the response body, as str or bytes, e.g.
+            `response.iter_lines()` of a streamed request.
+        capacity (int): The initial number of rows of the buffers.
+
+    Returns:
+        PlaceColumns: The parsed places.
+    """
+    names = np.empty(capacity, dtype=object)
+    categories = np.empty(capacity, dtype=object)
+    lats = np.empty(capacity, dtype=np.float64)
+    lons = np.empty(capacity, dtype=np.float64)
+    stars = np.empty(capacity, dtype=np.float64)
+    fees = np.empty(capacity, dtype=np.float64)
+    opening_hours = np.empty(capacity, dtype=object)
+    shared_categories = {}
+    shared_opening_hours = {}
+    n_columns = len(CSV_COLUMNS)
+    last_category = 5 + len(poi_types)
+    size = 0
+
+    lines = iter(lines)
+    next(lines, None)  # Header
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        fields = line.rstrip("\r\n").split("\t")
+        if len(fields) < n_columns:
+            continue
+        lat, lon, name = fields[2], fields[3], fields[4]
+        category = poi_category(fields[5:last_category])
+        if not (name and category and lat and lon):
+            continue
+
+        if size == len(lats):
+            capacity = 2 * len(lats)
+            names, categories = _grow(names, capacity), _grow(categories, capacity)
+            lats, lons = _grow(lats, capacity), _grow(lons, capacity)
+            stars, fees = _grow(stars, capacity), _grow(fees, capacity)
+            opening_hours = _grow(opening_hours, capacity)
+        star_value, fee_value, hours_value = fields[last_category : last_category + 3]
+        names[size] = name
+        categories[size] = shared_categories.setdefault(category, category)
+        lats[size] = float(lat)
+        lons[size] = float(lon)
+        stars[size] = _parse_stars(star_value) if star_value else np.nan
+        fees[size] = _parse_fee(fee_value) if fee_value else np.nan
+        opening_hours[size] = (
+            shared_opening_hours.setdefault(hours_value, hours_value)
+            if hours_value
+            else None
+        )
+        size += 1
+
+    return PlaceColumns(
+        names[:size].copy(),
+        categories[:size].copy(),
+        lats[:size].copy(),
+        lons[:size].copy(),
+        stars[:size].copy(),
+        fees[:size].copy(),
+        opening_hours[:size].copy(),
+    )
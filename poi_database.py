@@ -0,0 +1,170 @@
+import math
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from config import poi_database_path
+from geo import EARTH_RADIUS_KM, distances_from
+from poi_columns import PlaceColumns
+
+_PLACE_FIELDS = "name, category, lat, lon, stars, fee, opening_hours"
+
+
+def write_poi_database(path, places):
+    """
+    Write places to a local POI database, replacing the previous one.
+
+    Places go to a `places` table and their coordinates to an SQLite R*Tree,
+    so a radius search reads only the places of its bounding box. The
+    database is built in a temporary file and moved into place, so running
+    workers keep reading the previous one until they reopen it.
+
+    Parameters:
+        path (str): The database file.
+        places (PlaceColumns): The places, e.g. from `osm_ingest.read_extract`.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    building = f"{path}.building"
+    if os.path.exists(building):
+        os.remove(building)
+    connection = sqlite3.connect(building)
+    try:
+        connection.execute(
+            "CREATE TABLE places (id INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+            "category TEXT NOT NULL, lat REAL NOT NULL, lon REAL NOT NULL, "
+            "stars REAL, fee REAL, opening_hours TEXT)"
+        )
+        connection.execute(
+            "CREATE VIRTUAL TABLE places_index "
+            "USING rtree(id, min_lat, max_lat, min_lon, max_lon)"
+        )
+        # Nearby places get nearby ids, so a search reads few pages
+        places = places.take(
+            np.lexsort((np.floor(places.lons / 0.01), np.floor(places.lats / 0.01)))
+        )
+        ids = range(1, len(places) + 1)
+        # NaN is stored as NULL
+        stars = [None if math.isnan(value) else value for value in places.stars]
+        fees = [None if math.isnan(value) else value for value in places.fees]
+        lats, lons = places.lats.tolist(), places.lons.tolist()
+        connection.executemany(
+            f"INSERT INTO places (id, {_PLACE_FIELDS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            zip(
+                ids,
+                places.names.tolist(),
+                places.categories.tolist(),
+                lats,
+                lons,
+                stars,
+                fees,
+                places.opening_hours.tolist(),
+            ),
+        )
+        connection.executemany(
+            "INSERT INTO places_index VALUES (?, ?, ?, ?, ?)",
+            zip(ids, lats, lats, lons, lons),
+        )
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(building, path)
+
+
+class POIDatabase:
+    """
+    Read-only access to a local POI database written by `write_poi_database`,
+    used by the POI search in place of Overpass.
+
+    Each thread (and process) has its own connection.
+
+    Parameters:
+        path (str): The database file.
+
+    Raises:
+        FileNotFoundError: If the database does not exist.
+    """
+
+    def __init__(self, path=poi_database_path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"No POI database at {path}, build one with osm_ingest.py"
+            )
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        # A forked worker must not reuse the connection of its parent
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM places").fetchone()[0]
+
+    def places_within(self, lat, lon, radius, subcategories=None):
+        """
+        Find the places within `radius` meters of a point: the R*Tree gives
+        the places of the bounding box, their exact distance the rest.
+
+        Parameters:
+            lat (float): Latitude of the centre in degrees.
+            lon (float): Longitude of the centre in degrees.
+            radius (float): Search radius in meters.
+            subcategories (list): Subcategories to keep, defaults to all.
+
+        Returns:
+            PlaceColumns: The places, in database order.
+        """
+        dlat = math.degrees(radius / 1000 / EARTH_RADIUS_KM)
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        query = (
+            f"SELECT {_PLACE_FIELDS} FROM places_index "
+            "JOIN places ON places.id = places_index.id "
+            "WHERE min_lat <= ? AND max_lat >= ? AND min_lon <= ? AND max_lon >= ?"
+        )
+        params = [lat + dlat, lat - dlat, lon + dlon, lon - dlon]
+        if subcategories is not None:
+            subcategories = sorted(set(subcategories))
+            query += f" AND category IN ({','.join('?' * len(subcategories))})"
+            params += subcategories
+        rows = self._connection().execute(query, params).fetchall()
+
+        if not rows:
+            return PlaceColumns.empty()
+        names, categories, lats, lons, stars, fees, opening_hours = zip(*rows)
+        # One shared string object per distinct category and opening hours
+        shared = {}
+        places = PlaceColumns(
+            np.array(names, dtype=object),
+            np.array([shared.setdefault(c, c) for c in categories], dtype=object),
+            np.array(lats, dtype=np.float64),
+            np.array(lons, dtype=np.float64),
+            np.array(stars, dtype=np.float64),
+            np.array(fees, dtype=np.float64),
+            np.array([shared.setdefault(h, h) for h in opening_hours], dtype=object),
+        )
+        distance_km = distances_from(lat, lon, places.lats, places.lons)
+        return places.take(distance_km <= radius / 1000)
+
+
+_default_database = None
+_default_database_lock = threading.Lock()
+
+
+def get_poi_database():
+    """
+    Return the process-wide local POI database, opening it on first use.
+
+    Returns:
+        POIDatabase: The database at `config.poi_database_path`.
+    """
+    global _default_database
+    with _default_database_lock:
+        if _default_database is None:
+            _default_database = POIDatabase()
+        return _default_database
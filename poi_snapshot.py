@@ -0,0 +1,326 @@
+import json
+import math
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config import poi_snapshot_path
+from geo import EARTH_RADIUS_KM, distances_from
+from poi_columns import PlaceColumns
+
+SNAPSHOT_VERSION = 1
+# Array files of a snapshot, each a .npy file opened with mmap
+SNAPSHOT_ARRAYS = [
+    "keys",
+    "key_index",
+    "lats",
+    "lons",
+    "stars",
+    "fees",
+    "categories",
+    "names_offsets",
+    "names",
+    "opening_hours",
+    "hours_offsets",
+    "hours",
+]
+QUANTA = 2**32  # Steps of the latitude and longitude grid of the keys
+CELLS_PER_SEARCH = 4  # Curve cells across a search box, per axis
+KEY_BLOCK = 4096  # Keys per entry of the sparse key index
+
+
+def _quantize(lats, lons):
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    lat_q = np.clip((lats + 90) / 180 * QUANTA, 0, QUANTA - 1).astype(np.uint64)
+    lon_q = np.clip((lons + 180) / 360 * QUANTA, 0, QUANTA - 1).astype(np.uint64)
+    return lat_q, lon_q
+
+
+def _spread_bits(values):
+    # Put the 32 bits of each value on the even bits of a 64-bit integer
+    values = np.asarray(values, dtype=np.uint64)
+    for shift, mask in [
+        (16, 0x0000FFFF0000FFFF),
+        (8, 0x00FF00FF00FF00FF),
+        (4, 0x0F0F0F0F0F0F0F0F),
+        (2, 0x3333333333333333),
+        (1, 0x5555555555555555),
+    ]:
+        values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+    return values
+
+
+def morton_keys(lats, lons):
+    """
+    Z-order (Morton) keys of points: the bits of their latitude and
+    longitude on a 2**32 grid, interleaved. Points close on the map mostly
+    get close keys, so the places of an area are a few runs of a sorted
+    array.
+
+    Parameters:
+        lats (array-like): Latitudes in degrees.
+        lons (array-like): Longitudes in degrees.
+
+    Returns:
+        np.ndarray: The uint64 keys.
+    """
+    lat_q, lon_q = _quantize(lats, lons)
+    return _spread_bits(lon_q) | (_spread_bits(lat_q) << np.uint64(1))
+
+
+def _encode_strings(values):
+    """UTF-8 bytes of strings and their offsets: string i is data[o[i]:o[i + 1]]."""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def _decode_strings(offsets, data, index):
+    """The strings at positions `index`, reading only their bytes."""
+    buffer = memoryview(data)
+    starts, ends = offsets[index].tolist(), offsets[index + 1].tolist()
+    return np.array(
+        [str(buffer[start:end], "utf-8") for start, end in zip(starts, ends)],
+        dtype=object,
+    )
+
+
+def write_poi_snapshot(path, places):
+    """
+    Write places to a columnar snapshot, replacing the previous one.
+
+    The snapshot is a directory of .npy arrays, one per column, sorted by
+    the Morton key of the places. Names are stored as UTF-8 bytes with
+    offsets, categories and opening hours as codes into string tables. It
+    is built next to `path` and moved into place, running workers keep
+    their mapping of the previous files.
+
+    Parameters:
+        path (str): The snapshot directory.
+        places (PlaceColumns): The places, e.g. from `osm_ingest.read_extract`.
+    """
+    keys = morton_keys(places.lats, places.lons)
+    order = np.argsort(keys, kind="stable")
+    places = places.take(order)
+    category_codes, categories = pd.factorize(places.categories)
+    hours_codes, hours = pd.factorize(places.opening_hours)  # None gets -1
+    names_offsets, names = _encode_strings(places.names)
+    hours_offsets, hours_bytes = _encode_strings(hours)
+    keys = keys[order]
+    arrays = {
+        "keys": keys,
+        "key_index": keys[::KEY_BLOCK],
+        "lats": places.lats,
+        "lons": places.lons,
+        "stars": places.stars,
+        "fees": places.fees,
+        "categories": category_codes.astype(np.int16),
+        "names_offsets": names_offsets,
+        "names": names,
+        "opening_hours": hours_codes.astype(np.int32),
+        "hours_offsets": hours_offsets,
+        "hours": hours_bytes,
+    }
+
+    building = f"{path}.building"
+    shutil.rmtree(building, ignore_errors=True)
+    os.makedirs(building)
+    for name in SNAPSHOT_ARRAYS:
+        np.save(os.path.join(building, f"{name}.npy"), arrays[name])
+    with open(os.path.join(building, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": SNAPSHOT_VERSION,
+                "places": len(places),
+                "categories": categories.tolist(),
+            },
+            f,
+        )
+
+    # A directory cannot replace another one, the previous one is moved away
+    previous = f"{path}.previous"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, previous)
+    os.replace(building, path)
+    shutil.rmtree(previous, ignore_errors=True)
+
+
+class POISnapshot:
+    """
+    A columnar POI snapshot written by `write_poi_snapshot`, memory-mapped
+    and used by the POI search in place of Overpass.
+
+    Opening it maps the files without reading them, so a new worker serves
+    its first search after reading only the pages of that search. The
+    pages are shared by every process mapping the snapshot. A search slices
+    the runs of the Morton keys covering its bounding box, views on the
+    mapped arrays, and copies only the places within its radius.
+
+    Parameters:
+        path (str): The snapshot directory.
+
+    Raises:
+        FileNotFoundError: If the snapshot does not exist.
+        ValueError: If the snapshot has another format version.
+    """
+
+    def __init__(self, path=poi_snapshot_path):
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(
+                f"No POI snapshot at {path}, build one with osm_ingest.py"
+            )
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["version"] != SNAPSHOT_VERSION:
+            raise ValueError(
+                f"POI snapshot {path} has version {meta['version']}, "
+                f"expected {SNAPSHOT_VERSION}"
+            )
+        self.path = path
+        self.categories = np.array(meta["categories"], dtype=object)
+        self._arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in SNAPSHOT_ARRAYS
+        }
+
+    def __len__(self):
+        return len(self._arrays["keys"])
+
+    def _search_keys(self, values, side):
+        """
+        np.searchsorted on the keys, through the sparse index of the first
+        key of each block so only one block of keys is read per value.
+        """
+        keys = self._arrays["keys"]
+        blocks = np.searchsorted(self._arrays["key_index"], values, side=side) - 1
+        positions = np.zeros(len(values), dtype=np.int64)
+        for i, (value, block) in enumerate(zip(values, blocks.tolist())):
+            if block >= 0:
+                start = block * KEY_BLOCK
+                block_keys = keys[start : start + KEY_BLOCK]
+                positions[i] = start + np.searchsorted(block_keys, value, side=side)
+        return positions
+
+    def key_ranges(self, south, west, north, east):
+        """
+        Positions of the runs of keys covering a bounding box: the box is
+        covered by about CELLS_PER_SEARCH² cells of the curve, each cell a
+        key range, adjacent ranges merged.
+
+        Parameters:
+            south (float): Southern latitude in degrees.
+            west (float): Western longitude in degrees.
+            north (float): Northern latitude in degrees.
+            east (float): Eastern longitude in degrees.
+
+        Returns:
+            tuple: (starts, ends) arrays of positions in the sorted arrays.
+        """
+        (low_lat, high_lat), (low_lon, high_lon) = _quantize(
+            [south, north], [west, east]
+        )
+        span = max(int(high_lat - low_lat), int(high_lon - low_lon), 1)
+        level = max(0, math.ceil(math.log2(span / CELLS_PER_SEARCH)))
+        level = np.uint64(level)
+        cell_lats = np.arange(
+            low_lat >> level, (high_lat >> level) + 1, dtype=np.uint64
+        )
+        cell_lons = np.arange(
+            low_lon >> level, (high_lon >> level) + 1, dtype=np.uint64
+        )
+        cells = np.sort(
+            (
+                _spread_bits(cell_lons)[None, :]
+                | (_spread_bits(cell_lats)[:, None] << np.uint64(1))
+            ).ravel()
+        )
+        # Each cell holds the keys sharing its top bits
+        first = cells << (np.uint64(2) * level)
+        last = (cells + np.uint64(1)) << (np.uint64(2) * level)
+        starts = self._search_keys(first, side="left")
+        ends = self._search_keys(last - np.uint64(1), side="right")
+        # Merge runs of adjacent cells
+        joined = np.flatnonzero(starts[1:] > ends[:-1])
+        return (
+            starts[np.concatenate(([0], joined + 1))],
+            ends[np.concatenate((joined, [len(ends) - 1]))],
+        )
+
+    def places_within(self, lat, lon, radius, subcategories=None):
+        """
+        Find the places within `radius` meters of a point.
+
+        Parameters:
+            lat (float): Latitude of the centre in degrees.
+            lon (float): Longitude of the centre in degrees.
+            radius (float): Search radius in meters.
+            subcategories (list): Subcategories to keep, defaults to all.
+
+        Returns:
+            PlaceColumns: The places, in key order.
+        """
+        dlat = math.degrees(radius / 1000 / EARTH_RADIUS_KM)
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        starts, ends = self.key_ranges(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+
+        arrays = self._arrays
+        selected = None
+        if subcategories is not None:
+            selected = np.isin(self.categories, list(subcategories))
+        index = []
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            # Views on the mapped arrays, only their pages are read
+            within = (
+                distances_from(
+                    lat, lon, arrays["lats"][start:end], arrays["lons"][start:end]
+                )
+                <= radius / 1000
+            )
+            if selected is not None:
+                within &= selected[arrays["categories"][start:end]]
+            index.append(start + np.flatnonzero(within))
+        index = np.concatenate(index) if index else np.empty(0, dtype=np.int64)
+
+        # One shared string object per distinct opening hours, None where unset
+        hours_used, hours_index = np.unique(
+            arrays["opening_hours"][index], return_inverse=True
+        )
+        hours = np.full(len(hours_used), None, dtype=object)
+        known = hours_used >= 0
+        hours[known] = _decode_strings(
+            arrays["hours_offsets"], arrays["hours"], hours_used[known]
+        )
+        return PlaceColumns(
+            _decode_strings(arrays["names_offsets"], arrays["names"], index),
+            self.categories[arrays["categories"][index]],
+            np.array(arrays["lats"][index]),
+            np.array(arrays["lons"][index]),
+            np.array(arrays["stars"][index]),
+            np.array(arrays["fees"][index]),
+            hours[hours_index],
+        )
+
+
+_default_snapshot = None
+_default_snapshot_lock = threading.Lock()
+
+
+def get_poi_snapshot():
+    """
+    Return the process-wide POI snapshot, mapping it on first use.
+
+    Returns:
+        POISnapshot: The snapshot at `config.poi_snapshot_path`.
+    """
+    global _default_snapshot
+    with _default_snapshot_lock:
+        if _default_snapshot is None:
+            _default_snapshot = POISnapshot()
+        return _default_snapshot
@@ -0,0 +1,130 @@
+import numpy as np
+
+from geo import distance_matrix
+
+
+def _nearest_neighbour(distances, stops, start):
+    path = [start]
+    unvisited = set(stops)
+    while unvisited:
+        last = distances[path[-1]]
+        nearest = min(unvisited, key=lambda stop: last[stop])
+        path.append(nearest)
+        unvisited.remove(nearest)
+    return path
+
+
+def _two_opt(path, distances):
+    """Reverse path segments while that shortens the route. Ends stay fixed."""
+    improved = False
+    n = len(path)
+    changed = True
+    while changed:
+        changed = False
+        for i in range(1, n - 2):
+            a, b = path[i - 1], path[i]
+            for j in range(i + 1, n - 1):
+                c, d = path[j], path[j + 1]
+                delta = (
+                    distances[a][c]
+                    + distances[b][d]
+                    - distances[a][b]
+                    - distances[c][d]
+                )
+                if delta < -1e-9:
+                    path[i : j + 1] = reversed(path[i : j + 1])
+                    b = path[i]
+                    changed = improved = True
+    return improved
+
+
+def _or_opt(path, distances, max_segment=3):
+    """Move segments of up to `max_segment` stops, possibly reversed, to a
+    better place in the route. Ends stay fixed."""
+    improved = False
+    changed = True
+    while changed:
+        changed = False
+        for length in range(1, max_segment + 1):
+            for i in range(1, len(path) - length):
+                j = i + length  # segment is path[i:j]
+                if j >= len(path):
+                    break
+                prev, first, last, nxt = path[i - 1], path[i], path[j - 1], path[j]
+                removed = (
+                    distances[prev][first] + distances[last][nxt] - distances[prev][nxt]
+                )
+                for k in range(0, len(path) - 1):
+                    if i - 1 <= k < j:
+                        continue
+                    a, b = path[k], path[k + 1]
+                    forward = distances[a][first] + distances[last][b]
+                    backward = distances[a][last] + distances[first][b]
+                    inserted = min(forward, backward) - distances[a][b]
+                    if inserted - removed < -1e-9:
+                        segment = path[i:j]
+                        if backward < forward:
+                            segment.reverse()
+                        rest = path[:i] + path[j:]
+                        at = k + 1 if k < i else k + 1 - length
+                        path[:] = rest[:at] + segment + rest[at:]
+                        changed = improved = True
+                        break
+                if changed:
+                    break
+            if changed:
+                break
+    return improved
+
+
+def optimize_route(lats, lons, start=None, end=None):
+    """
+    Order a day's stops into a short visiting route.
+
+    The distance matrix is built once, a nearest-neighbour tour is improved
+    with 2-opt and Or-opt moves until neither helps, and the real leg
+    distances of the final order are returned. For 20 stops this runs in a
+    few milliseconds.
+
+    Parameters:
+        lats (array-like): Latitudes of the stops in degrees.
+        lons (array-like): Longitudes of the stops in degrees.
+        start (tuple): Optional (lat, lon) the route starts from, e.g. the
+            stay. Without it the route may start at any stop.
+        end (tuple): Optional (lat, lon) the route ends at, e.g. back at the
+            stay. Without it the route may end at any stop.
+
+    Returns:
+        tuple: (order, legs_km) where `order` lists the stop positions in
+        visiting order and `legs_km` holds the distance of each leg: from
+        `start` (or the first stop) to each stop in turn, then to `end` if
+        given.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    n = len(lats)
+    if n == 0:
+        return [], np.empty(0)
+
+    # Stops are nodes 0..n-1, the start and end nodes n and n+1. A missing
+    # start or end is a free node at zero distance from every stop.
+    all_lats = np.append(lats, [start[0] if start else 0, end[0] if end else 0])
+    all_lons = np.append(lons, [start[1] if start else 0, end[1] if end else 0])
+    matrix = distance_matrix(all_lats, all_lons)
+    if start is None:
+        matrix[n, :] = matrix[:, n] = 0
+    if end is None:
+        matrix[n + 1, :] = matrix[:, n + 1] = 0
+    distances = matrix.tolist()  # Nested lists index faster than NumPy here
+
+    path = _nearest_neighbour(distances, range(n), n) + [n + 1]
+    while _two_opt(path, distances) | _or_opt(path, distances):
+        pass
+
+    order = path[1:-1]
+    legs = [distances[a][b] for a, b in zip(path, path[1:])]
+    if start is None:
+        legs = legs[1:]
+    if end is None:
+        legs = legs[:-1]
+    return order, np.array(legs)
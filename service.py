@@ -0,0 +1,278 @@
+"""
+Asynchronous HTTP service for geocoding, POI search and itinerary planning.
+
+It runs the same fetch and planning code as main.py. Outbound Nominatim and
+Overpass calls and the planning itself run in a bounded thread pool, so the
+event loop keeps serving other requests while they wait. All outbound calls
+share one pooled keep-alive session, and each request has its own deadline.
+
+Endpoints:
+    GET  /geocode?q=Paris
+    GET  /pois?q=Paris&radius=1000&subcategories=museum,cafe
+    GET  /pois?lat=48.85&lon=2.35&radius=1000
+    POST /itinerary with a JSON trip request, see `itinerary`.
+
+Run with an ASGI server, e.g.:
+    uvicorn service:app --workers 4
+
+Set NOMINATIM_URL and OVERPASS_URL to point the service at local stand-ins.
+"""
+
+import asyncio
+import functools
+import math
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date
+
+import requests
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from config import (
+    geocode_timeout,
+    max_search_radius_km,
+    min_search_radius_km,
+    overpass_timeout,
+    poi_source,
+    service_max_outbound,
+    service_request_timeout,
+)
+from estimators import DEFAULT_SEED
+from geocode_cache import geocode
+from poi_cache import fetch_places
+from poi_snapshot import get_poi_snapshot
+from trip_planner import plan_itinerary
+
+DEFAULT_RADIUS = 1000
+DEFAULT_SOURCE_RADIUS = 10 * 1000
+# Search radii in meters
+MIN_RADIUS = min_search_radius_km * 1000
+MAX_RADIUS = max_search_radius_km * 1000
+
+
+class ServiceError(Exception):
+    """An error answered to the client with an HTTP status code."""
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _run(request, func, *args, **kwargs):
+    """Run a blocking call in the service's thread pool."""
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(
+        request.app.state.executor, functools.partial(func, *args, **kwargs)
+    )
+
+
+def endpoint(handler):
+    """
+    Turn a handler returning a JSON-serialisable object into an endpoint
+    with a request deadline and JSON error responses.
+    """
+
+    @functools.wraps(handler)
+    async def wrapper(request):
+        try:
+            result = await asyncio.wait_for(
+                handler(request), timeout=service_request_timeout
+            )
+        except ServiceError as e:
+            return JSONResponse({"error": str(e)}, status_code=e.status_code)
+        except (asyncio.TimeoutError, requests.exceptions.Timeout):
+            return JSONResponse(
+                {"error": "The request did not finish in time"}, status_code=504
+            )
+        except requests.exceptions.RequestException as e:
+            return JSONResponse(
+                {"error": f"Upstream request failed: {e}"}, status_code=502
+            )
+        return JSONResponse(result)
+
+    return wrapper
+
+
+def _number(params, name, default=None):
+    value = params.get(name, default)
+    if value is None:
+        raise ServiceError(400, f"Missing parameter: {name}")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = math.nan
+    if not math.isfinite(number):
+        raise ServiceError(400, f"Invalid number for {name}: {value}")
+    return number
+
+
+def _integer(params, name, default=None):
+    number = _number(params, name, default)
+    if number != int(number):
+        raise ServiceError(400, f"Invalid integer for {name}: {params.get(name)}")
+    return int(number)
+
+
+def _radius(params, name, default, scale=1):
+    """A search radius in meters, given in units of `scale` meters."""
+    radius = _number(params, name, default / scale) * scale
+    if not MIN_RADIUS <= radius <= MAX_RADIUS:
+        raise ServiceError(
+            400,
+            f"{name} must be between {MIN_RADIUS / scale:g} and "
+            f"{MAX_RADIUS / scale:g}: {params.get(name)}",
+        )
+    return radius
+
+
+def _subcategories(value):
+    """Subcategories from a list or a comma-separated string, None for all."""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list) or not all(
+        isinstance(subcategory, str) for subcategory in value
+    ):
+        raise ServiceError(400, f"Invalid subcategories: {value}")
+    return [subcategory.strip() for subcategory in value if subcategory.strip()]
+
+
+def _coordinate(params, name, limit):
+    value = _number(params, name)
+    if not -limit <= value <= limit:
+        raise ServiceError(400, f"{name} must be between {-limit} and {limit}: {value}")
+    return value
+
+
+async def _geocode(request, query):
+    if not query:
+        raise ServiceError(400, "Missing parameter: q")
+    location = await _run(request, geocode, query, timeout=geocode_timeout)
+    if location is None:
+        raise ServiceError(404, f"Location not found: {query}")
+    return location
+
+
+async def _places(request, query, radius, subcategories=None):
+    location = await _geocode(request, query)
+    places = await _run(
+        request,
+        fetch_places,
+        location["lat"],
+        location["lon"],
+        radius,
+        subcategories=subcategories,
+        timeout=overpass_timeout,
+    )
+    return location, places
+
+
+def _records(places_df):
+    # JSON has no NaN, unset tags become null
+    places_df = places_df.astype(object)
+    return places_df.where(places_df.notna(), None).to_dict("records")
+
+
+@endpoint
+async def geocode_location(request):
+    return await _geocode(request, request.query_params.get("q"))
+
+
+@endpoint
+async def search_pois(request):
+    params = request.query_params
+    radius = _radius(params, "radius", DEFAULT_RADIUS)
+    subcategories = _subcategories(params.get("subcategories"))
+    if "q" in params:
+        location, places = await _places(request, params["q"], radius, subcategories)
+    else:
+        location = {
+            "lat": _coordinate(params, "lat", 90),
+            "lon": _coordinate(params, "lon", 180),
+        }
+        places = await _run(
+            request,
+            fetch_places,
+            location["lat"],
+            location["lon"],
+            radius,
+            subcategories=subcategories,
+            timeout=overpass_timeout,
+        )
+    return {"location": location, "places": _records(places)}
+
+
+@endpoint
+async def itinerary(request):
+    """
+    Plan a trip. The JSON body has source, destination, start_date and
+    end_date (ISO dates), budget, and optionally radius_km and
+    source_radius_km (1 to 20, default 1 and 10), subcategories (default
+    all) and seed (an integer, default 0).
+    """
+    try:
+        trip = await request.json()
+        dates = (
+            date.fromisoformat(trip["start_date"]),
+            date.fromisoformat(trip["end_date"]),
+        )
+        source, destination = trip["source"], trip["destination"]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ServiceError(400, f"Invalid trip request: {e}")
+    if not isinstance(source, str) or not isinstance(destination, str):
+        raise ServiceError(400, "source and destination must be strings")
+    if (dates[1] - dates[0]).days < 1:
+        raise ServiceError(400, "Travel dates must span at least one full day.")
+    budget = _number(trip, "budget")
+    if budget < 0:
+        raise ServiceError(400, f"Invalid budget: {trip['budget']}")
+    radius = _radius(trip, "radius_km", DEFAULT_RADIUS, scale=1000)
+    source_radius = _radius(trip, "source_radius_km", DEFAULT_SOURCE_RADIUS, scale=1000)
+    subcategories = _subcategories(trip.get("subcategories"))
+    seed = _integer(trip, "seed", DEFAULT_SEED)
+
+    # Fetch the destination and the source concurrently
+    (location, places), (source_location, source_places) = await asyncio.gather(
+        _places(request, destination, radius, subcategories),
+        _places(request, source, source_radius, subcategories),
+    )
+    plan = await _run(
+        request,
+        plan_itinerary,
+        places,
+        source_places,
+        (location["lat"], location["lon"]),
+        (source_location["lat"], source_location["lon"]),
+        dates,
+        budget,
+        filters=subcategories,
+        seed=seed,
+    )
+    return {"destination": location, "source": source_location, "plan": plan}
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if poi_source == "snapshot":
+        # Map the snapshot as the worker starts, its pages are read on demand
+        get_poi_snapshot()
+    app.state.executor = ThreadPoolExecutor(
+        max_workers=service_max_outbound, thread_name_prefix="service"
+    )
+    try:
+        yield
+    finally:
+        app.state.executor.shutdown(wait=False, cancel_futures=True)
+
+
+app = Starlette(
+    routes=[
+        Route("/geocode", geocode_location),
+        Route("/pois", search_pois),
+        Route("/itinerary", itinerary, methods=["POST"]),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,129 @@
+import numpy as np
+from sklearn.neighbors import BallTree
+
+from geo import EARTH_RADIUS_KM
+
+
+class POISpatialIndex:
+    """
+    Ball tree over points of interest with the haversine metric, answering
+    k-nearest and within-radius queries in O(log n) instead of scanning the
+    whole places DataFrame.
+
+    Query results are row positions into the arrays (or DataFrame) the index
+    was built from.
+
+    Parameters:
+        lats (array-like): Latitudes of the places in degrees.
+        lons (array-like): Longitudes of the places in degrees.
+
+    Attributes:
+        tree (sklearn.neighbors.BallTree): The ball tree over the places.
+    """
+
+    def __init__(self, lats, lons):
+        self.points = np.radians(
+            np.column_stack(
+                [np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)]
+            )
+        )
+        self.tree = BallTree(self.points, metric="haversine")
+
+    @classmethod
+    def from_frame(cls, places_df):
+        return cls(places_df["Latitude"], places_df["Longitude"])
+
+    def __len__(self):
+        return len(self.points)
+
+    def _query_point(self, lat, lon):
+        return np.radians([[lat, lon]])
+
+    def nearest(self, lat, lon, k=1, candidates=None):
+        """
+        Find the `k` places nearest to a point.
+
+        Parameters:
+            lat (float): Latitude of the point in degrees.
+            lon (float): Longitude of the point in degrees.
+            k (int): The number of places to return.
+            candidates (np.ndarray): Optional boolean mask of the places that
+                may be returned, e.g. restaurants not visited yet.
+
+        Returns:
+            tuple: (positions, distances_km) arrays, nearest first. Fewer
+            than `k` are returned if there are not enough candidates.
+        """
+        n_candidates = len(self) if candidates is None else int(np.sum(candidates))
+        k = min(k, n_candidates)
+        if k == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+
+        # Ask the tree for more neighbours until enough of them are candidates
+        n_query = k
+        while True:
+            n_query = min(len(self), n_query)
+            distances, positions = self.tree.query(
+                self._query_point(lat, lon), k=n_query
+            )
+            distances, positions = distances[0], positions[0]
+            if candidates is not None:
+                keep = candidates[positions]
+                distances, positions = distances[keep], positions[keep]
+            if len(positions) >= k or n_query == len(self):
+                return positions[:k], distances[:k] * EARTH_RADIUS_KM
+            n_query *= 4
+
+    def within(self, lat, lon, radius_km, candidates=None):
+        """
+        Find the places within `radius_km` of a point.
+
+        Parameters:
+            lat (float): Latitude of the point in degrees.
+            lon (float): Longitude of the point in degrees.
+            radius_km (float): The radius in kilometers.
+            candidates (np.ndarray): Optional boolean mask of the places that
+                may be returned.
+
+        Returns:
+            tuple: (positions, distances_km) arrays, nearest first.
+        """
+        positions, distances = self.tree.query_radius(
+            self._query_point(lat, lon),
+            r=radius_km / EARTH_RADIUS_KM,
+            return_distance=True,
+            sort_results=True,
+        )
+        positions, distances = positions[0], distances[0]
+        if candidates is not None:
+            keep = candidates[positions]
+            positions, distances = positions[keep], distances[keep]
+        return positions, distances * EARTH_RADIUS_KM
+
+    def nearest_each(self, points, candidates=None):
+        """
+        Pick one distinct place near each point, in order, e.g. breakfast,
+        lunch and dinner near the stops they follow.
+
+        Parameters:
+            points (list): (lat, lon) tuples in degrees.
+            candidates (np.ndarray): Optional boolean mask of the places that
+                may be picked.
+
+        Returns:
+            list: Positions of the picked places, shorter than `points` if
+            the candidates run out.
+        """
+        available = (
+            np.ones(len(self), dtype=bool)
+            if candidates is None
+            else np.array(candidates, dtype=bool)
+        )
+        picked = []
+        for lat, lon in points:
+            positions, _ = self.nearest(lat, lon, k=1, candidates=available)
+            if len(positions) == 0:
+                break
+            picked.append(int(positions[0]))
+            available[positions[0]] = False
+        return picked
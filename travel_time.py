@@ -0,0 +1,403 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import requests
+
+from cache_backend import make_cache_backend
+from config import (
+    google_maps_api_key,
+    travel_time_cache_path,
+    travel_time_cache_precision,
+    travel_time_cache_size,
+    travel_time_cache_ttl,
+    travel_time_timeout,
+)
+from estimators import DEFAULT_SEED
+from geo import haversine_km
+from http_session import get_http_session
+from utils import calculate_travel_time
+
+DISTANCE_MATRIX_URL = "https://maps.googleapis.com/maps/api/distancematrix/json"
+
+
+def _points(points):
+    return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+
+class TravelTimeProvider:
+    """
+    Interface of travel-time sources. A provider answers a whole
+    origins x destinations matrix per call, so all legs of an itinerary can
+    be priced in one batched request instead of one call per leg.
+
+    Attributes:
+        seeded (bool): Whether the times depend on the seed of the call,
+            like estimates do, or are the same for every seed.
+    """
+
+    seeded = False
+
+    def matrix(self, origins, destinations, mode=None, seed=DEFAULT_SEED):
+        """
+        Travel times between every origin and every destination.
+
+        Parameters:
+            origins (array-like): (lat, lon) pairs in degrees.
+            destinations (array-like): (lat, lon) pairs in degrees.
+            mode (str): Travel mode, e.g. "driving" or "walking". None lets
+                the provider pick one by distance.
+            seed (int): The seed of estimated times, ignored by providers
+                of real times.
+
+        Returns:
+            np.ndarray: Minutes of shape (len(origins), len(destinations)),
+            NaN where the provider has no answer.
+        """
+        raise NotImplementedError
+
+    def legs(self, origins, destinations, mode=None, seed=DEFAULT_SEED):
+        """
+        Travel time of each leg origins[i] -> destinations[i], answered with
+        one matrix call over the distinct points.
+
+        Returns:
+            np.ndarray: Minutes of each leg, NaN where there is no answer.
+        """
+        origins, destinations = _points(origins), _points(destinations)
+        if len(origins) == 0:
+            return np.empty(0)
+        unique_origins, origin_index = np.unique(origins, axis=0, return_inverse=True)
+        unique_destinations, destination_index = np.unique(
+            destinations, axis=0, return_inverse=True
+        )
+        minutes = self.matrix(unique_origins, unique_destinations, mode, seed)
+        return minutes[origin_index.ravel(), destination_index.ravel()]
+
+
+class StubTravelTimeProvider(TravelTimeProvider):
+    """
+    The offline estimate of utils.calculate_travel_time: a time drawn from
+    the range of the distance bucket of each straight-line distance. The
+    draw is keyed by the leg and the seed, so a leg always gets the same
+    time for a seed.
+    """
+
+    seeded = True
+
+    def matrix(self, origins, destinations, mode=None, seed=DEFAULT_SEED):
+        origins, destinations = _points(origins), _points(destinations)
+        return self.legs(
+            np.repeat(origins, len(destinations), axis=0),
+            np.tile(destinations, (len(origins), 1)),
+            mode,
+            seed,
+        ).reshape(len(origins), len(destinations))
+
+    def legs(self, origins, destinations, mode=None, seed=DEFAULT_SEED):
+        origins, destinations = _points(origins), _points(destinations)
+        distances = haversine_km(
+            origins[:, 0], origins[:, 1], destinations[:, 0], destinations[:, 1]
+        )
+        minutes = [
+            calculate_travel_time(distance, key=tuple(leg) + (mode,), seed=seed)
+            for distance, leg in zip(
+                distances.tolist(),
+                np.round(np.hstack([origins, destinations]), 6).tolist(),
+            )
+        ]
+        return np.array(minutes, dtype=np.float64)
+
+
+class GoogleDistanceMatrixProvider(TravelTimeProvider):
+    """
+    Travel times from the Google Distance Matrix API. A matrix is split into
+    as few requests as the API limits allow (25 origins or destinations and
+    100 elements per request). Legs are requested pair by pair, as the API
+    bills every element of a request.
+
+    Parameters:
+        api_key (str): The Google Maps API key.
+        timeout (float): Timeout in seconds for each request.
+    """
+
+    max_side = 25
+    max_elements = 100
+
+    def __init__(self, api_key, timeout=travel_time_timeout):
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def matrix(self, origins, destinations, mode=None, seed=DEFAULT_SEED):
+        origins, destinations = _points(origins), _points(destinations)
+        minutes = np.full((len(origins), len(destinations)), np.nan)
+        columns = min(self.max_side, max(1, len(destinations)))
+        rows = min(self.max_side, max(1, self.max_elements // columns))
+        for i in range(0, len(origins), rows):
+            for j in range(0, len(destinations), columns):
+                minutes[i : i + rows, j : j + columns] = self._request(
+                    origins[i : i + rows], destinations[j : j + columns], mode
+                )
+        return minutes
+
+    def legs(self, origins, destinations, mode=None, seed=DEFAULT_SEED):
+        """
+        Travel time of each leg, requesting only the pairs of the legs
+        instead of the whole matrix of their points. The legs are grouped by
+        origin, or by destination if there are fewer of them, and each group
+        is sent as one row (column) of up to `max_side` elements.
+        """
+        origins, destinations = _points(origins), _points(destinations)
+        if len(origins) == 0:
+            return np.empty(0)
+        unique_origins, origin_index = np.unique(origins, axis=0, return_inverse=True)
+        unique_destinations, destination_index = np.unique(
+            destinations, axis=0, return_inverse=True
+        )
+        pairs, pair_index = np.unique(
+            np.column_stack([origin_index.ravel(), destination_index.ravel()]),
+            axis=0,
+            return_inverse=True,
+        )
+        by_destination = len(unique_destinations) < len(unique_origins)
+        group_of = pairs[:, 1] if by_destination else pairs[:, 0]
+        order = np.argsort(group_of, kind="stable")
+        groups = np.split(order, np.flatnonzero(np.diff(group_of[order])) + 1)
+
+        pair_minutes = np.full(len(pairs), np.nan)
+        for group in groups:
+            for start in range(0, len(group), self.max_side):
+                chunk = group[start : start + self.max_side]
+                chunk_origins = unique_origins[pairs[chunk, 0]]
+                chunk_destinations = unique_destinations[pairs[chunk, 1]]
+                if by_destination:
+                    pair_minutes[chunk] = self._request(
+                        chunk_origins, chunk_destinations[:1], mode
+                    )[:, 0]
+                else:
+                    pair_minutes[chunk] = self._request(
+                        chunk_origins[:1], chunk_destinations, mode
+                    )[0]
+        return pair_minutes[pair_index.ravel()]
+
+    def _request(self, origins, destinations, mode):
+        params = {
+            "origins": "|".join(f"{lat:.6f},{lon:.6f}" for lat, lon in origins),
+            "destinations": "|".join(
+                f"{lat:.6f},{lon:.6f}" for lat, lon in destinations
+            ),
+            "mode": mode or "driving",
+            "key": self.api_key,
+        }
+        response = get_http_session().get(
+            DISTANCE_MATRIX_URL, params=params, timeout=self.timeout
+        )
+        response.raise_for_status()
+        result = response.json()
+        if result.get("status") != "OK":
+            raise requests.exceptions.RequestException(
+                f"Distance Matrix request failed: {result.get('status')}"
+            )
+
+        minutes = np.full((len(origins), len(destinations)), np.nan)
+        for i, row in enumerate(result["rows"]):
+            for j, element in enumerate(row["elements"]):
+                if element.get("status") == "OK":
+                    minutes[i, j] = round(element["duration"]["value"] / 60)
+        return minutes
+
+
+class TravelTimeCache(TravelTimeProvider):
+    """
+    Caching front of a travel-time provider with a fallback.
+
+    Pairs are cached by their coordinates rounded to `precision` decimals,
+    so legs between (nearly) the same places are only requested once, and by
+    the seed of the call if the provider is seeded. The
+    missing pairs of a call are sent to the provider in one batch. Pairs it
+    cannot answer, or all of them if it fails, are estimated by the fallback,
+    whose answers are not cached so a later call can still get real times.
+
+    With a backend, pairs missing in memory are looked up there before the
+    provider is asked, and answers are written to it, so all the worker
+    processes of a host share the times of a paid API.
+
+    Parameters:
+        provider (TravelTimeProvider): The source of travel times.
+        fallback (TravelTimeProvider): Used where the provider has no answer.
+        precision (int): Decimals of the coordinates in cache keys.
+        max_entries (int): The number of pairs kept in the LRU.
+        backend (CacheBackend): The shared store, None to cache in memory
+            only.
+        ttl (int): Seconds a pair stays valid in the backend.
+
+    Attributes:
+        hits (int): Pairs answered from memory or the backend.
+        backend_hits (int): Pairs answered from the backend.
+        misses (int): Pairs sent to the provider.
+        fallbacks (int): Pairs answered by the fallback.
+    """
+
+    def __init__(
+        self,
+        provider,
+        fallback=None,
+        precision=travel_time_cache_precision,
+        max_entries=travel_time_cache_size,
+        backend=None,
+        ttl=travel_time_cache_ttl,
+    ):
+        self.provider = provider
+        self.fallback = fallback if fallback is not None else StubTravelTimeProvider()
+        self.precision = precision
+        self.max_entries = max_entries
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+        self._pairs = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def seeded(self):
+        return self.provider.seeded
+
+    def matrix(self, origins, destinations, mode=None, seed=DEFAULT_SEED):
+        origins, destinations = _points(origins), _points(destinations)
+        minutes = self.legs(
+            np.repeat(origins, len(destinations), axis=0),
+            np.tile(destinations, (len(origins), 1)),
+            mode,
+            seed,
+        )
+        return minutes.reshape(len(origins), len(destinations))
+
+    def legs(self, origins, destinations, mode=None, seed=DEFAULT_SEED):
+        origins = np.round(_points(origins), self.precision)
+        destinations = np.round(_points(destinations), self.precision)
+        # Real times are the same for every seed and shared by all of them
+        key_suffix = (mode, seed) if self.provider.seeded else (mode,)
+        keys = [
+            (o_lat, o_lon, d_lat, d_lon) + key_suffix
+            for (o_lat, o_lon), (d_lat, d_lon) in zip(
+                origins.tolist(), destinations.tolist()
+            )
+        ]
+
+        minutes = np.full(len(keys), np.nan)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._pairs.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._pairs.move_to_end(key)
+                    minutes[i] = cached
+
+        if missing and self.backend is not None:
+            backend_keys = [",".join(map(str, keys[i])) for i in missing]
+            found = self.backend.get_many(backend_keys)
+            still_missing = []
+            with self._lock:
+                for i, backend_key in zip(missing, backend_keys):
+                    value = found.get(backend_key)
+                    if value is None:
+                        still_missing.append(i)
+                    else:
+                        minutes[i] = float(value)
+                        self._remember(keys[i], minutes[i])
+                self.backend_hits += len(missing) - len(still_missing)
+            missing = still_missing
+
+        with self._lock:
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            try:
+                fetched = self.provider.legs(
+                    origins[missing], destinations[missing], mode, seed
+                )
+            except requests.exceptions.RequestException:
+                fetched = np.full(len(missing), np.nan)
+            minutes[missing] = fetched
+            answered = {
+                keys[i]: value
+                for i, value in zip(missing, fetched.tolist())
+                if not np.isnan(value)
+            }
+            with self._lock:
+                for key, value in answered.items():
+                    self._remember(key, value)
+            if self.backend is not None and answered:
+                self.backend.set_many(
+                    {
+                        ",".join(map(str, key)): str(value).encode("ascii")
+                        for key, value in answered.items()
+                    },
+                    self.ttl,
+                )
+
+        unanswered = np.flatnonzero(np.isnan(minutes))
+        if len(unanswered):
+            self.fallbacks += len(unanswered)
+            minutes[unanswered] = self.fallback.legs(
+                origins[unanswered], destinations[unanswered], mode, seed
+            )
+        return minutes
+
+    def _remember(self, key, value):
+        # Called with the lock held
+        self._pairs[key] = value
+        self._pairs.move_to_end(key)
+        while len(self._pairs) > self.max_entries:
+            self._pairs.popitem(last=False)
+
+    def stats(self):
+        """
+        Return hit/miss/fallback counters and the number of cached pairs.
+
+        Returns:
+            dict: Cache statistics.
+        """
+        with self._lock:
+            pairs = len(self._pairs)
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "backend_hits": self.backend_hits,
+            "misses": self.misses,
+            "fallbacks": self.fallbacks,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "pairs": pairs,
+        }
+
+
+_default_provider = None
+_default_provider_lock = threading.Lock()
+
+
+def get_travel_time_provider():
+    """
+    Return the process-wide travel-time provider, creating it on first use:
+    the Google Distance Matrix API if an API key is configured, else the
+    offline stub, behind a shared cache. API answers are also kept in the
+    configured backend, stub estimates are cheap and stay in memory.
+
+    Returns:
+        TravelTimeCache: The shared provider.
+    """
+    global _default_provider
+    with _default_provider_lock:
+        if _default_provider is None:
+            if google_maps_api_key:
+                _default_provider = TravelTimeCache(
+                    GoogleDistanceMatrixProvider(google_maps_api_key),
+                    backend=make_cache_backend(travel_time_cache_path, "travel_times"),
+                )
+            else:
+                _default_provider = TravelTimeCache(StubTravelTimeProvider())
+        return _default_provider
@@ -0,0 +1,425 @@
+from datetime import timedelta
+
+import numpy as np
+
+from attraction_selection import score_attractions, select_attractions
+from categories import main_category_mask
+from config import (
+    attraction_minutes_per_day,
+    attraction_selection_algorithm,
+    candidate_attractions_per_day,
+    day_end_time,
+    day_start_time,
+    min_travel_minutes,
+    travel_minutes_per_km,
+)
+from cost_engine import allocate_budget, estimate_costs
+from day_partition import partition_days
+from day_scheduler import schedule_stops
+from estimators import DEFAULT_SEED, stable_randint
+from geo import consecutive_distances, distances_from, haversine_km
+from opening_hours import earliest_visit, format_time, parse_opening_hours, parse_time
+from route_optimizer import optimize_route
+from spatial_index import POISpatialIndex
+from travel_time import get_travel_time_provider
+from utils import determine_transport_mode
+
+MAX_SOURCE_PLACES = 3
+MAX_EXTRA_PLACES = 3
+MEALS = ["Breakfast", "Lunch", "Dinner"]
+
+
+def _place(row):
+    return {
+        "name": str(row["Name"]),
+        "category": str(row["Category"]),
+        "lat": float(row["Latitude"]),
+        "lon": float(row["Longitude"]),
+    }
+
+
+def _leg(distance_km):
+    # The travel time is filled in once all legs of the plan are known
+    distance_km = float(distance_km)
+    return {
+        "distance_km": distance_km,
+        "travel_time": None,
+        "mode": determine_transport_mode(distance_km),
+    }
+
+
+def _point(row):
+    return (row["Latitude"], row["Longitude"])
+
+
+def _prepare_places(places_df, center, filters, ascending=True):
+    """
+    Keep the places in the selected subcategories, add their distance from
+    `center` and sort by it. The index is reset so labels are positions.
+    """
+    if filters is not None:
+        places_df = places_df[places_df["Category"].isin(filters)]
+    places_df = places_df.copy()
+    places_df["Distance_km"] = distances_from(
+        center[0], center[1], places_df["Latitude"], places_df["Longitude"]
+    )
+    return places_df.sort_values(
+        "Distance_km", ascending=ascending, kind="stable"
+    ).reset_index(drop=True)
+
+
+def plan_itinerary(
+    places_df,
+    source_df,
+    center,
+    source_center,
+    dates,
+    budget,
+    filters=None,
+    travel_times=None,
+    seed=DEFAULT_SEED,
+    selection_algorithm=attraction_selection_algorithm,
+):
+    """
+    Plan a trip without any UI: the journey from the source, places to visit
+    on the way, and for every day the stay, a routed list of attractions,
+    extra places nearby and meals.
+
+    Parameters:
+        places_df (pd.DataFrame): Places at the destination, with Name,
+            Category, Latitude, Longitude and Main Category.
+        source_df (pd.DataFrame): Places at the source, same columns.
+        center (tuple): (lat, lon) of the destination.
+        source_center (tuple): (lat, lon) of the source.
+        dates (tuple): (trip_start, trip_end) dates.
+        budget (float): The budget of the trip in Rupees.
+        filters (list): Subcategories to plan with, defaults to all places.
+        travel_times (TravelTimeProvider): Source of the travel times of the
+            legs, defaults to the shared provider.
+        seed (int): The seed of the estimated visit durations and travel
+            times. The same inputs and seed always give the same plan.
+        selection_algorithm (str): "dp" or "greedy", how the attractions of
+            each day are chosen, see attraction_selection.select_attractions.
+
+    Returns:
+        dict: The plan, made of JSON-serialisable dicts, lists, strings and
+        numbers. A day with no "stops" has no attraction open or
+        affordable on its date, the days stop once no attractions are left.
+        Without any place at the destination the plan has no days.
+        Stops are scheduled within the opening hours of their places on the
+        date of their day, with "arrival", "start" and "end" times; those
+        that do not fit are moved to the next day.
+        Every stay, stop and meal has an estimated cost, and "within_budget"
+        tells whether the total cost of the plan fits the budget.
+
+    Raises:
+        ValueError: If the dates do not span at least one full day.
+    """
+    trip_start, trip_end = dates
+    days = (trip_end - trip_start).days
+    if days < 1:
+        raise ValueError("Travel dates must span at least one full day.")
+
+    travel_times = (
+        travel_times if travel_times is not None else get_travel_time_provider()
+    )
+    places = _prepare_places(places_df, center, filters)
+    source_places = _prepare_places(source_df, source_center, filters, ascending=False)
+
+    journey_km = haversine_km(source_center[0], source_center[1], center[0], center[1])
+    plan = {
+        "center": [float(center[0]), float(center[1])],
+        "source_center": [float(source_center[0]), float(source_center[1])],
+        "trip_start": trip_start.isoformat(),
+        "trip_end": trip_end.isoformat(),
+        "number_of_days": days,
+        "budget": float(budget),
+        "seed": seed,
+        "journey": _leg(journey_km),
+        "source_places": [],
+        "days": [],
+        "total_cost": 0.0,
+        "within_budget": True,
+    }
+    # (leg record, origin, destination) of every leg that needs a travel time
+    timed_legs = [(plan["journey"], source_center, center)]
+
+    # Places of interest on the way, the farthest from the source centre first
+    is_attraction_source = main_category_mask(source_places, "Attractions")
+    for _, row in (
+        source_places[is_attraction_source].head(MAX_SOURCE_PLACES).iterrows()
+    ):
+        plan["source_places"].append(
+            dict(_place(row), distance_km=float(row["Distance_km"]))
+        )
+
+    # Split the budget into allowances
+    allowance = allocate_budget(budget, days)
+    plan["allowance"] = allowance
+
+    # A destination without places (or none left by the filters) gets an
+    # empty plan, the spatial index needs at least one place
+    if len(places) == 0:
+        return _finish_plan(plan, budget, travel_times, timed_legs, seed)
+
+    # Main category masks from the categories classified at ingest
+    is_attraction = main_category_mask(places, "Attractions")
+    is_stay = main_category_mask(places, "Accommodation")
+    is_meal = main_category_mask(places, "Food")
+    visited = np.zeros(len(places), dtype=bool)
+
+    # Price every place at once
+    costs = estimate_costs(places)
+
+    places_index = POISpatialIndex.from_frame(places)
+    lats = places["Latitude"].to_numpy()
+    lons = places["Longitude"].to_numpy()
+
+    # The nearest affordable stay, else the cheapest one
+    affordable_stays = np.flatnonzero(is_stay & (costs <= allowance["stay_per_night"]))
+    stay = None
+    if len(affordable_stays):
+        stay = places.iloc[affordable_stays[0]]
+    elif is_stay.any():
+        stay = places.iloc[np.flatnonzero(is_stay)[np.argmin(costs[is_stay])]]
+    stay_point = None if stay is None else (stay["Latitude"], stay["Longitude"])
+
+    # Candidate attractions of the whole trip, the nearest ones, split into
+    # one compact neighbourhood per day
+    candidates = np.flatnonzero(is_attraction)[: candidate_attractions_per_day * days]
+    candidate_days = partition_days(
+        lats[candidates], lons[candidates], days, center=center
+    )
+    scores = score_attractions(
+        places.iloc[candidates], places["Distance_km"].to_numpy()[candidates]
+    )
+    visit_minutes = np.array(
+        [
+            stable_randint(30, 120, "visit", name, lat, lon, seed=seed)
+            for name, lat, lon in zip(
+                places["Name"].to_numpy()[candidates],
+                lats[candidates],
+                lons[candidates],
+            )
+        ],
+        dtype=np.int64,
+    )
+    candidate_hours = [
+        parse_opening_hours(value)
+        for value in (
+            places["Opening Hours"].to_numpy()[candidates]
+            if "Opening Hours" in places
+            else [None] * len(candidates)
+        )
+    ]
+    visit_of = dict(zip(candidates.tolist(), visit_minutes.tolist()))
+    hours_of = dict(zip(candidates.tolist(), candidate_hours))
+    day_start, day_end = parse_time(day_start_time), parse_time(day_end_time)
+
+    # Choose the attractions of each day that are worth the most within the
+    # hours of the day and the attraction budget, whatever a day leaves
+    # unspent carries over to the next days
+    attraction_budget = 0.0
+    for day in range(1, days + 1):
+        if not (candidate_days >= day - 1).any():
+            # No attractions left for this or any later day
+            break
+        day_date = trip_start + timedelta(days=day - 1)
+        day_plan = {
+            "day": day,
+            "date": day_date.isoformat(),
+            "stay": None,
+            "stay_cost_per_day": None,
+            "stops": [],
+            "return_to_stay_km": None,
+            "extra_places": [],
+            "meals": [],
+            "cost": 0.0,
+        }
+        plan["days"].append(day_plan)
+        if stay is not None:
+            day_plan["stay"] = _place(stay)
+            day_plan["stay_cost_per_day"] = float(costs[stay.name])
+
+        # Only attractions open long enough for a visit on the day's date
+        members = np.array(
+            [
+                member
+                for member in np.flatnonzero(candidate_days == day - 1)
+                if earliest_visit(
+                    candidate_hours[member],
+                    day_date.weekday(),
+                    day_start,
+                    visit_minutes[member],
+                    day_end,
+                )
+                is not None
+            ],
+            dtype=np.intp,
+        )
+        attraction_budget += allowance["attractions_per_day"]
+        if len(members) == 0:
+            # Nothing open on this date, the trip goes on
+            continue
+        # Time of a visit plus the trip to it from the middle of the day
+        travel_km = distances_from(
+            lats[candidates[members]].mean(),
+            lons[candidates[members]].mean(),
+            lats[candidates[members]],
+            lons[candidates[members]],
+        )
+        minutes = visit_minutes[members] + np.maximum(
+            min_travel_minutes, travel_minutes_per_km * travel_km
+        )
+        chosen = members[
+            select_attractions(
+                scores[members],
+                minutes,
+                costs[candidates[members]],
+                attraction_minutes_per_day,
+                attraction_budget,
+                algorithm=selection_algorithm,
+            )
+        ]
+        attraction_budget -= costs[candidates[chosen]].sum()
+        if len(chosen) == 0:
+            # Nothing affordable on this date
+            continue
+
+        # Visit the day's attractions in a short round trip from the stay
+        route_order, leg_distances = optimize_route(
+            lats[candidates[chosen]],
+            lons[candidates[chosen]],
+            start=stay_point,
+            end=stay_point,
+        )
+        chosen = chosen[route_order]
+        attractions = candidates[chosen]
+
+        # Fit the visits into the opening hours of the day, with the travel
+        # times between the stay and the stops from one matrix request
+        points = np.column_stack([lats[attractions], lons[attractions]])
+        if stay_point is None:
+            leg_minutes = travel_times.matrix(points, points, seed=seed)
+            first_leg_minutes = np.zeros(len(attractions))
+        else:
+            points = np.vstack([stay_point, points])
+            leg_minutes = travel_times.matrix(points, points, seed=seed)
+            first_leg_minutes = leg_minutes[0, 1:]
+            leg_minutes = leg_minutes[1:, 1:]
+        schedule = schedule_stops(
+            first_leg_minutes,
+            leg_minutes,
+            [visit_of[position] for position in attractions.tolist()],
+            [hours_of[position] for position in attractions.tolist()],
+            day_date.weekday(),
+            day_start,
+            day_end,
+        )
+        scheduled = [stop for stop, _, _ in schedule]
+        # Stops that do not fit the day are refunded and offered the next day
+        dropped = np.delete(chosen, scheduled)
+        attraction_budget += costs[candidates[dropped]].sum()
+        candidate_days[dropped] = day
+        attractions = attractions[scheduled]
+        visited[attractions] = True
+        if len(attractions) == 0:
+            continue
+
+        route = attractions
+        if stay_point is not None:
+            route = np.concatenate([[stay.name], attractions, [stay.name]])
+        leg_distances = consecutive_distances(lats[route], lons[route])
+        if stay_point is None:
+            # Without a stay the first stop is reached directly
+            leg_distances = np.append(0.0, leg_distances)
+        else:
+            day_plan["return_to_stay_km"] = float(leg_distances[-1])
+        departure = day_start
+        for position, distance_km, (_, arrival, start) in zip(
+            attractions, leg_distances, schedule
+        ):
+            row = places.iloc[position]
+            stop = dict(_place(row), cost=float(costs[position]), **_leg(distance_km))
+            stop["travel_time"] = int(arrival - departure)
+            stop["visit_duration"] = int(visit_of[position])
+            departure = start + visit_of[position]
+            stop["arrival"] = format_time(arrival)
+            stop["start"] = format_time(start)
+            stop["end"] = format_time(departure)
+            opening_hours = row.get("Opening Hours")
+            stop["opening_hours"] = (
+                opening_hours if isinstance(opening_hours, str) else None
+            )
+            day_plan["stops"].append(stop)
+
+        # Additional places near the last attraction of the day, keeping the
+        # candidates of the next days for them
+        last = places.iloc[attractions[-1]]
+        is_later_candidate = np.zeros(len(places), dtype=bool)
+        is_later_candidate[candidates[candidate_days >= day]] = True
+        extra_positions, _ = places_index.nearest(
+            last["Latitude"],
+            last["Longitude"],
+            k=MAX_EXTRA_PLACES,
+            candidates=is_attraction & ~is_later_candidate & ~visited,
+        )
+        route = np.append(attractions[-1], extra_positions)
+        extra_legs = consecutive_distances(lats[route], lons[route])
+        for position, distance_km in zip(extra_positions, extra_legs):
+            day_plan["extra_places"].append(
+                dict(_place(places.iloc[position]), distance_km=float(distance_km))
+            )
+        visited[extra_positions] = True
+
+        # Meals near the stops they follow: breakfast near the stay, lunch
+        # near the middle of the day and dinner near the last attraction
+        anchors = [
+            stay if stay is not None else places.iloc[attractions[0]],
+            places.iloc[attractions[len(attractions) // 2]],
+            last,
+        ]
+        meal_candidates = is_meal & ~visited & (costs <= allowance["meal"])
+        if meal_candidates.sum() < len(anchors):
+            # Not enough affordable meals, pick from all of them
+            meal_candidates = is_meal & ~visited
+        meal_positions = places_index.nearest_each(
+            [(anchor["Latitude"], anchor["Longitude"]) for anchor in anchors],
+            candidates=meal_candidates,
+        )
+        for meal, anchor, position in zip(MEALS, anchors, meal_positions):
+            row = places.iloc[position]
+            distance_km = haversine_km(
+                anchor["Latitude"],
+                anchor["Longitude"],
+                row["Latitude"],
+                row["Longitude"],
+            )
+            meal_plan = dict(
+                _place(row), meal=meal, cost=float(costs[position]), **_leg(distance_km)
+            )
+            day_plan["meals"].append(meal_plan)
+            timed_legs.append((meal_plan, _point(anchor), _point(row)))
+        visited[meal_positions] = True
+
+    return _finish_plan(plan, budget, travel_times, timed_legs, seed)
+
+
+def _finish_plan(plan, budget, travel_times, timed_legs, seed):
+    """Add up the costs of the days and time the journey and the meals."""
+    for day_plan in plan["days"]:
+        day_plan["cost"] = float(
+            (day_plan["stay_cost_per_day"] or 0)
+            + sum(item["cost"] for item in day_plan["stops"] + day_plan["meals"])
+        )
+        plan["total_cost"] += day_plan["cost"]
+
+    # Reject plans whose costs exceed the budget
+    plan["within_budget"] = plan["total_cost"] <= budget
+
+    # Time the journey and the meals with one batched travel-time request
+    legs, origins, destinations = zip(*timed_legs)
+    minutes = travel_times.legs(origins, destinations, seed=seed)
+    for leg, leg_minutes in zip(legs, minutes.tolist()):
+        leg["travel_time"] = int(leg_minutes)
+    return plan
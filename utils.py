@@ -1,8 +1,9 @@
 from data_fetch import fetch_google_travel_time
+from estimators import DEFAULT_SEED
 
 
 # Function to fetch travel time based on distance
-def calculate_travel_time(distance_km):
+def calculate_travel_time(distance_km, key=(), seed=DEFAULT_SEED):
     """
     Calculate the travel time based on the distance in kilometers.
 
@@ -19,37 +20,46 @@ def calculate_travel_time(distance_km):
 
     Parameters:
         distance_km (float): The distance in kilometers.
+        key (tuple): The leg being timed. The same leg and seed always get
+            the same time.
+        seed (int): The seed of the estimate.
 
     Returns:
         str: A string representing the estimated travel time.
     """
     if distance_km < 1:
         return fetch_google_travel_time(
-            min_distance=5, max_distance=15
+            min_distance=5, max_distance=15, key=key, seed=seed
         )  # Walking time in minutes
     elif distance_km < 3:
         return fetch_google_travel_time(
-            min_distance=10, max_distance=30
+            min_distance=10, max_distance=30, key=key, seed=seed
         )  # Short taxi/bike rides in minutes
     elif distance_km < 10:
         return fetch_google_travel_time(
-            min_distance=20, max_distance=60
+            min_distance=20, max_distance=60, key=key, seed=seed
         )  # Longer taxi/public transport times
     elif distance_km < 30:
         return fetch_google_travel_time(
-            min_distance=60, max_distance=120
+            min_distance=60, max_distance=120, key=key, seed=seed
         )  # Public transport or intercity travel in minutes
     elif distance_km < 100:
-        return fetch_google_travel_time(min_distance=120, max_distance=180)
+        return fetch_google_travel_time(
+            min_distance=120, max_distance=180, key=key, seed=seed
+        )
     # Longer intercity travel times in minutes
     elif distance_km < 200:
-        return fetch_google_travel_time(min_distance=180, max_distance=240)
+        return fetch_google_travel_time(
+            min_distance=180, max_distance=240, key=key, seed=seed
+        )
     else:  # Very long distances, consider flying or long-distance trains
         # This is a placeholder; actual implementation may vary based on the API used.
         # For example, you might want to fetch flight times or long-distance train times.
         # Here we assume a long-distance travel time of 240 minutes (4 hours).
         # You can adjust this based on your requirements or API capabilities.
-        return fetch_google_travel_time(min_distance=240, max_distance=300)
+        return fetch_google_travel_time(
+            min_distance=240, max_distance=300, key=key, seed=seed
+        )
 
 
 # Function to determine transport mode